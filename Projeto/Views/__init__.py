@@ -1,13 +1,43 @@
-import tkinter as tk
-
-class SystemView:
-    def __init__(self, master):
-        self.master = master
-        self.frame = tk.Frame(master)
-        self.frame.pack()
-        tk.Label(self.frame, text="Sistema Loja Desportiva").pack()
-
-# Adicionar estes imports no final
-from .login_view import LoginView
-from .client_view import ClientView
-from .admin_view import AdminView
\ No newline at end of file
+"""
+Módulo das views da aplicação.
+Exporta as views sem as importar: cada módulo só é carregado quando a
+view é usada pela primeira vez (PEP 562), para que o arranque carregue
+apenas o ecrã de login.
+"""
+
+# Views disponíveis: nome -> módulo que a define
+_VIEWS = {
+    "LoginView": "login_view",
+    "ClientView": "client_view",
+    "AdminView": "admin_view",
+}
+
+__all__ = list(_VIEWS)
+
+
+def __getattr__(name: str):
+    """
+    Importa uma view na primeira utilização.
+
+    Args:
+        name: Nome da view (ex: "LoginView")
+
+    Returns:
+        type: Classe da view
+
+    Raises:
+        AttributeError: Se não existir uma view com esse nome
+    """
+    module_name = _VIEWS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Importação relativa pelo mecanismo normal (visível em -X importtime)
+    module = __import__(module_name, globals(), level=1, fromlist=(name,))
+    view = getattr(module, name)
+    globals()[name] = view   # próximas consultas não passam por aqui
+    return view
+
+
+def __dir__():
+    """Lista os nomes do módulo, incluindo as views ainda não importadas."""
+    return sorted(set(globals()) | set(__all__))
@@ -7,7 +7,10 @@ onde o administrador pode realizar operações CRUD sobre os recursos do sistema
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, simpledialog
+
+from .background import BackgroundLoader
+from .virtual_table import VirtualTable
 
 
 class AdminView:
@@ -24,9 +27,10 @@ class AdminView:
         user:  Objeto Administrator com os dados do admin autenticado
         frame: Frame principal que contém toda a interface
         notebook: Widget de abas para organizar as diferentes secções
-        items_tree: Treeview para listar artigos
+        loader: Carregador que executa as consultas em segundo plano
+        items_tree: Tabela virtualizada para listar artigos
         categories_tree:  Treeview para listar categorias
-        reservations_tree:  Treeview para listar reservas
+        reservations_tree:  Tabela virtualizada para listar reservas
         state_var:  Variável para o filtro de estado das reservas
     """
     
@@ -47,9 +51,58 @@ class AdminView:
         self.frame = tk. Frame(master)
         self.frame.pack(fill="both", expand=True)
         
+        # Consultas às listagens em segundo plano (a interface não bloqueia)
+        self.loader = BackgroundLoader(self.frame)
+        
         # Construir os componentes da interface
         self._create_header()
         self._create_notebook()
+        
+        # Atualizar só as linhas afetadas quando os modelos mudam
+        self._subscribe()
+    
+    # ==================== NOTIFICAÇÕES ====================
+    
+    def _subscribe(self):
+        """Subscreve as alterações de artigos e reservas."""
+        from models import SportsItem, Reservation, events
+        events.subscribe(SportsItem, self._on_item_changed)
+        events.subscribe(Reservation, self._on_reservation_changed)
+    
+    def _unsubscribe(self):
+        """Cancela as subscrições (ao sair da view)."""
+        from models import SportsItem, Reservation, events
+        events.unsubscribe(SportsItem, self._on_item_changed)
+        events.unsubscribe(Reservation, self._on_reservation_changed)
+    
+    def _on_item_changed(self, event, item):
+        """
+        Atualiza, acrescenta ou retira a linha de um artigo alterado.
+        
+        Args:
+            event: Evento publicado (events.SAVED ou events.DELETED)
+            item: Artigo alterado
+        """
+        from models import events
+        if event == events.DELETED:
+            self.items_tree.remove_row(item.id)
+        else:
+            self.items_tree.update_row(item.id)
+    
+    def _on_reservation_changed(self, event, reservation):
+        """
+        Atualiza a linha de uma reserva alterada, respeitando o filtro de estado.
+        
+        Args:
+            event: Evento publicado (events.SAVED ou events.DELETED)
+            reservation: Reserva alterada
+        """
+        from models import events
+        state = self._state_filter()
+        if event == events.DELETED or (state and reservation.state != state):
+            self.reservations_tree.remove_row(reservation.id)
+        else:
+            self.reservations_tree.update_row(reservation.id)
     
     # ==================== CONSTRUÇÃO DA INTERFACE ====================
     
@@ -111,14 +164,16 @@ class AdminView:
         tk.Button(btn_frame, text="➕ Novo Artigo", command=self.new_item).pack(side="left")
         tk.Button(btn_frame, text="✏️ Alterar Disponibilidade", 
                   command=self.toggle_availability).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="💶 Alterar Preço",
+                  command=self.change_price).pack(side="left", padx=(0, 5))
         tk.Button(btn_frame, text="🗑️ Remover", command=self.remove_item).pack(side="left")
         
         # Botão de atualizar alinhado à direita
         tk.Button(btn_frame, text="🔄 Atualizar", command=self.load_items).pack(side="right")
         
-        # ===== Tabela de artigos (Treeview) =====
+        # ===== Tabela de artigos (só as linhas visíveis são criadas) =====
         columns = ("ID", "Nome", "Marca", "Preço/Hora", "Categoria", "Estado")
-        self.items_tree = ttk.Treeview(frame, columns=columns, show="headings", height=18)
+        self.items_tree = VirtualTable(frame, columns, height=18)
         
         # Configurar cabeçalhos e larguras das colunas
         for col in columns:
@@ -137,28 +192,42 @@ class AdminView:
         """
         Carrega os artigos na tabela. 
         
-        Obtém todos os artigos da base de dados e popula a Treeview.
-        Para cada artigo, mostra:  ID, nome, marca, preço, categoria e estado.
+        Os IDs dos artigos são obtidos em segundo plano e passados à tabela;
+        os artigos só são carregados quando as respetivas linhas ficam visíveis.
         """
         from models import SportsItem
         
-        # Limpar todos os itens existentes na tabela
-        for item in self. items_tree.get_children():
-            self.items_tree. delete(item)
+        self.loader.submit("items", SportsItem.get_ids,
+                           lambda ids: self.items_tree.set_rows(ids, self._item_rows))
+    
+    def _item_rows(self, item_ids: list) -> list:
+        """
+        Cria as linhas da tabela de artigos visíveis.
+        
+        Para cada artigo, mostra:  ID, nome, marca, preço, categoria e estado.
         
-        # Carregar e inserir cada artigo
-        for item in SportsItem.get_all():
+        Args:
+            item_ids: IDs dos artigos visíveis
+            
+        Returns:
+            list: Pares (ID, valores da linha)
+        """
+        from models import SportsItem
+        
+        rows = []
+        for item in SportsItem.find_many(item_ids):
             # Obter nome da categoria (ou "-" se não tiver)
-            cat_name = item.category. name if item.category else "-"
+            category = item.category
+            cat_name = category.name if category else "-"
             
             # Formatar estado de disponibilidade
             status = "✓ Disponível" if item. available else "✗ Indisponível"
             
-            # Inserir linha na tabela
-            self.items_tree. insert("", "end", values=(
+            rows.append((item.id, (
                 item.id, item. name, item.brand,
                 f"€{item.price_per_hour:.2f}", cat_name, status
-            ))
+            )))
+        return rows
     
     def new_item(self):
         """
@@ -249,11 +318,10 @@ class AdminView:
             # Encontrar ID da categoria selecionada
             category_id = next((c.id for c in categories if c.name == cat_var.get()), None)
             
-            # Criar artigo e atualizar interface
+            # Criar artigo (a tabela é atualizada pela notificação)
             SportsItem.create(name, brand, price, category_id)
             messagebox.showinfo("Sucesso", "Artigo criado!")
             dialog.destroy()
-            self.load_items()
         
         # Botão de submissão
         tk.Button(frame, text="Criar", command=create, font=("Arial", 10),
@@ -270,7 +338,7 @@ class AdminView:
         
         Requer que um artigo esteja selecionado na tabela.
         """
-        from models import SportsItem
+        from models import ConflictError, SportsItem
         
         # Verificar se há seleção
         selection = self.items_tree.selection()
@@ -285,12 +353,61 @@ class AdminView:
         if item:  
             # Inverter disponibilidade
             item.set_available(not item.available)
-            item.save()
+            try:
+                item.save()
+            except ConflictError as e:
+                # Artigo alterado noutro posto: mostrar o estado atual
+                messagebox.showerror("Erro", str(e))
+                self.load_items()
+                return
             
-            # Feedback ao utilizador
+            # Feedback ao utilizador (a linha é atualizada pela notificação)
             state_str = "disponível" if item.available else "indisponível"
             messagebox.showinfo("Sucesso", f"Artigo marcado como {state_str}!")
+    
+    def change_price(self):
+        """
+        Altera o preço por hora do artigo selecionado.
+        
+        Os totais das reservas ativas que ainda não começaram são
+        recalculados ao gravar; as linhas afetadas são atualizadas pelas
+        notificações.
+        
+        Requer que um artigo esteja selecionado na tabela.
+        """
+        from models import ConflictError, SportsItem
+        
+        # Verificar se há seleção
+        selection = self.items_tree.selection()
+        if not selection:
+            messagebox.showwarning("Aviso", "Selecione um artigo!")
+            return
+        
+        item_id = self.items_tree.item(selection[0])["values"][0]
+        item = SportsItem.find_by_id(item_id)
+        if not item:
+            return
+        
+        # Pedir o novo preço (aceita vírgula decimal)
+        answer = simpledialog.askstring(
+            "Alterar Preço", f"Novo preço por hora de {item.name} (€):",
+            initialvalue=f"{item.price_per_hour:.2f}", parent=self.master)
+        if answer is None:
+            return
+        try:
+            item.set_price_per_hour(float(answer.replace(",", ".")))
+        except ValueError:
+            messagebox.showerror("Erro", "Preço inválido!")
+            return
+        
+        try:
+            item.save()
+        except ConflictError as e:
+            # Artigo ou reserva alterados noutro posto: mostrar o estado atual
+            messagebox.showerror("Erro", str(e))
             self.load_items()
+            return
+        messagebox.showinfo("Sucesso", "Preço atualizado!")
     
     def remove_item(self):
         """
@@ -314,7 +431,6 @@ class AdminView:
             if item:
                 item.delete()
                 messagebox.showinfo("Sucesso", "Artigo removido!")
-                self. load_items()
     
     # ==================== ABA CATEGORIAS ====================
     
@@ -501,9 +617,9 @@ class AdminView:
         tk.Button(filter_frame, text="🔄 Atualizar", 
                   command=self.load_reservations).pack(side="right")
         
-        # ===== Tabela de reservas (Treeview) =====
+        # ===== Tabela de reservas (só as linhas visíveis são criadas) =====
         columns = ("ID", "Cliente", "Data Início", "Data Fim", "Artigos", "Total", "Estado")
-        self.reservations_tree = ttk. Treeview(frame, columns=columns, show="headings", height=18)
+        self.reservations_tree = VirtualTable(frame, columns, height=18)
         
         # Configurar cabeçalhos
         for col in columns: 
@@ -527,39 +643,65 @@ class AdminView:
         """
         Carrega as reservas na tabela.
         
-        Aplica o filtro de estado selecionado e mostra: 
+        Aplica o filtro de estado selecionado e obtém em segundo plano os
+        IDs das reservas; as reservas só são carregadas quando as respetivas
+        linhas ficam visíveis. Mudar o filtro antes de o resultado chegar
+        cancela o pedido anterior.
+        """
+        from models import Reservation
+        
+        state = self._state_filter()
+        self.loader.submit("reservations", lambda: Reservation.get_ids(state=state),
+                           lambda ids: self.reservations_tree.set_rows(
+                               ids, self._reservation_rows))
+    
+    def _state_filter(self):
+        """
+        Obtém o estado selecionado no filtro de reservas.
+        
+        Returns:
+            str: Estado a mostrar, ou None para todos
+        """
+        state_filter = self.state_var. get()
+        return None if state_filter == "Todos" else state_filter
+    
+    def _reservation_rows(self, reservation_ids: list) -> list:
+        """
+        Cria as linhas da tabela de reservas visíveis.
+        
+        Mostra: 
         - ID da reserva
         - Nome do cliente
         - Datas de início e fim
         - Artigos reservados
         - Valor total
         - Estado atual
+        
+        Args:
+            reservation_ids: IDs das reservas visíveis
+            
+        Returns:
+            list: Pares (ID, valores da linha)
         """
         from models import Reservation
         
-        # Limpar tabela
-        for item in self. reservations_tree.get_children():
-            self.reservations_tree.delete(item)
-        
-        # Aplicar filtro de estado (None = todos)
-        state_filter = self.state_var. get()
-        state = None if state_filter == "Todos" else state_filter
-        
-        # Carregar e inserir cada reserva
-        for res in Reservation.get_all(state=state):
+        rows = []
+        # Clientes e artigos de todas as linhas carregados de uma só vez
+        for res in Reservation.find_many(reservation_ids, prefetch=("client", "items")):
             # Obter nome do cliente (ou "Desconhecido" se não encontrado)
-            client_name = res.client.name if res.client else "Desconhecido"
+            client = res.client
+            client_name = client.name if client else "Desconhecido"
             
             # Formatar lista de artigos como string
             items_str = ", ".join([i.name for i in res.items if i])
             
-            # Inserir linha na tabela
-            self.reservations_tree.insert("", "end", values=(
+            rows.append((res.id, (
                 res. id, client_name,
                 res.start_date. strftime("%Y-%m-%d %H:%M"),
                 res.end_date. strftime("%Y-%m-%d %H:%M"),
                 items_str, f"€{res.total_value:.2f}", res.state
-            ))
+            )))
+        return rows
     
     def cancel_reservation(self):
         """
@@ -572,7 +714,7 @@ class AdminView:
         
         Ao cancelar, os artigos são libertados automaticamente.
         """
-        from models import Reservation
+        from models import ConflictError, Reservation
         
         # Verificar se há seleção
         selection = self.reservations_tree.selection()
@@ -593,12 +735,15 @@ class AdminView:
         if messagebox. askyesno("Confirmar", f"Cancelar reserva #{res_id}?"):
             reservation = Reservation.find_by_id(res_id)
             if reservation:
-                reservation.cancel()
+                try:
+                    reservation.cancel()
+                except ConflictError as e:
+                    # Reserva alterada noutro posto: mostrar o estado atual
+                    messagebox.showerror("Erro", str(e))
+                    self.load_reservations()
+                    return
+                # A linha da reserva é atualizada pela notificação
                 messagebox.showinfo("Sucesso", "Reserva cancelada!")
-                
-                # Atualizar ambas as tabelas (reservas e artigos)
-                self. load_reservations()
-                self.load_items()  # Artigos foram libertados
     
     # ==================== LOGOUT ====================
     
@@ -609,6 +754,8 @@ class AdminView:
         Destrói o frame atual e instancia uma nova LoginView,
         permitindo que outro utilizador faça login.
         """
+        self._unsubscribe()
+        self.loader.shutdown()
         self.frame.destroy()
         from . login_view import LoginView
         LoginView(self.master)
\ No newline at end of file
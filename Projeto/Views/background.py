@@ -0,0 +1,119 @@
+"""
+Carregamento de dados em segundo plano.
+
+Este módulo permite executar consultas aos modelos numa thread de fundo,
+sem bloquear a interface, e entregar os resultados aos widgets na thread
+do Tkinter.
+"""
+
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundLoader:
+    """
+    Executa consultas em threads de fundo e entrega os resultados ao Tkinter.
+
+    As consultas correm num conjunto de threads; os resultados são colocados
+    numa fila que é consultada periodicamente com after(), pelo que as
+    funções de retorno são sempre chamadas na thread do Tkinter (a única
+    que pode alterar widgets).
+
+    Cada pedido tem uma chave (ex: "items"). Um novo pedido com a mesma
+    chave substitui o anterior: se ainda não começou é cancelado, e se já
+    terminou o seu resultado é ignorado.
+
+    Attributes:
+        widget: Widget usado para agendar a consulta da fila (after)
+    """
+
+    # Intervalo (ms) entre consultas da fila enquanto há pedidos pendentes
+    POLL_INTERVAL = 30
+
+    def __init__(self, widget, workers: int = 2):
+        """
+        Inicializa o carregador.
+
+        Args:
+            widget: Widget Tkinter da view (usado para after)
+            workers: Número de threads de fundo
+        """
+        self.widget = widget
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="loader")
+        self._results = queue.Queue()
+        self._latest = {}       # chave -> (número do pedido, future)
+        self._counter = 0
+        self._polling = False
+
+    def submit(self, key: str, query, on_done, on_error=None):
+        """
+        Executa uma consulta em segundo plano.
+
+        Args:
+            key: Identifica o tipo de pedido; substitui o pedido anterior
+                com a mesma chave
+            query: Função sem argumentos executada na thread de fundo (não
+                pode aceder a widgets)
+            on_done: Função chamada na thread do Tkinter com o resultado
+            on_error: Função chamada na thread do Tkinter com a exceção, se
+                a consulta falhar (default: report_callback_exception)
+        """
+        previous = self._latest.get(key)
+        if previous is not None:
+            previous[1].cancel()
+
+        self._counter += 1
+        request = self._counter
+        future = self._executor.submit(self._run, key, request, query, (on_done, on_error))
+        self._latest[key] = (request, future)
+
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.POLL_INTERVAL, self._poll)
+
+    def _run(self, key: str, request: int, query, callbacks: tuple):
+        """
+        Executa a consulta (thread de fundo) e coloca o resultado na fila.
+
+        Args:
+            key: Chave do pedido
+            request: Número do pedido
+            query: Função a executar
+            callbacks: (on_done, on_error) do pedido
+        """
+        try:
+            self._results.put((key, request, callbacks, query(), None))
+        except Exception:
+            self._results.put((key, request, callbacks, None, sys.exc_info()))
+
+    def _poll(self):
+        """Entrega os resultados disponíveis (thread do Tkinter)."""
+        while True:
+            try:
+                key, request, (on_done, on_error), result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            latest = self._latest.get(key)
+            if latest is None or latest[0] != request:
+                continue    # pedido substituído por um mais recente
+            del self._latest[key]
+
+            if error is not None and on_error is not None:
+                on_error(error[1])
+            elif error is not None:
+                self.widget.report_callback_exception(*error)
+            else:
+                on_done(result)
+
+        if self._latest:
+            self.widget.after(self.POLL_INTERVAL, self._poll)
+        else:
+            self._polling = False
+
+    def shutdown(self):
+        """Cancela os pedidos pendentes e termina as threads (ao sair da view)."""
+        self._latest = {}
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -11,6 +11,9 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 
+from .background import BackgroundLoader
+from .virtual_table import VirtualTable
+
 
 class ClientView:
     """
@@ -27,8 +30,9 @@ class ClientView:
         selected_items: Lista de artigos selecionados para a reserva atual
         frame: Frame principal que contém toda a interface
         notebook: Widget de abas para organizar as diferentes secções
-        items_tree: Treeview para listar artigos na aba de visualização
-        history_tree:  Treeview para listar histórico de reservas
+        loader: Carregador que executa as consultas em segundo plano
+        items_tree: Tabela virtualizada para listar artigos na aba de visualização
+        history_tree:  Tabela virtualizada para listar histórico de reservas
         available_listbox: Listbox com artigos disponíveis para reserva
         selected_listbox: Listbox com artigos selecionados para reserva
         category_var: Variável para filtro de categoria (aba artigos)
@@ -60,6 +64,9 @@ class ClientView:
         self.frame = tk.Frame(master)
         self.frame.pack(fill="both", expand=True)
 
+        # Consultas às listagens em segundo plano (a interface não bloqueia)
+        self.loader = BackgroundLoader(self.frame)
+
         # ===== Cabeçalho =====
         header = tk.Frame(self.frame)
         header.pack(fill="x", padx=10, pady=10)
@@ -80,6 +87,54 @@ class ClientView:
         self.create_reservation_tab()
         self.create_history_tab()
 
+        # Atualizar só as linhas afetadas quando os modelos mudam
+        self._subscribe()
+
+    # ==================== NOTIFICAÇÕES ====================
+
+    def _subscribe(self):
+        """Subscreve as alterações de artigos e reservas."""
+        from models import SportsItem, Reservation, events
+        events.subscribe(SportsItem, self._on_item_changed)
+        events.subscribe(Reservation, self._on_reservation_changed)
+
+    def _unsubscribe(self):
+        """Cancela as subscrições (ao sair da view)."""
+        from models import SportsItem, Reservation, events
+        events.unsubscribe(SportsItem, self._on_item_changed)
+        events.unsubscribe(Reservation, self._on_reservation_changed)
+
+    def _on_item_changed(self, event, item):
+        """
+        Atualiza a linha de um artigo alterado, respeitando o filtro de categoria.
+
+        Args:
+            event: Evento publicado (events.SAVED ou events.DELETED)
+            item: Artigo alterado
+        """
+        from models import events
+        category_id = self._category_filter()
+        if event == events.DELETED or (category_id and item.category_id != category_id):
+            self.items_tree.remove_row(item.id)
+        else:
+            self.items_tree.update_row(item.id)
+
+    def _on_reservation_changed(self, event, reservation):
+        """
+        Atualiza a linha do histórico de uma reserva do cliente.
+
+        Args:
+            event: Evento publicado (events.SAVED ou events.DELETED)
+            reservation: Reserva alterada
+        """
+        from models import events
+        if reservation.client_id != self.user.id:
+            return
+        if event == events.DELETED:
+            self.history_tree.remove_row(reservation.id)
+        else:
+            self.history_tree.update_row(reservation.id)
+
     # ==================== ABA ARTIGOS ====================
     
     def create_items_tab(self):
@@ -109,9 +164,9 @@ class ClientView:
         # Botão de atualização manual
         tk.Button(filter_frame, text="Atualizar", command=self.load_items).pack(side="right")
 
-        # ===== Tabela de artigos (Treeview) =====
+        # ===== Tabela de artigos (só as linhas visíveis são criadas) =====
         columns = ("ID", "Nome", "Marca", "Preço/Hora", "Categoria", "Estado")
-        self.items_tree = ttk.Treeview(frame, columns=columns, show="headings", height=15)
+        self.items_tree = VirtualTable(frame, columns, height=15)
 
         # Configurar cabeçalhos e larguras das colunas
         for col in columns:  
@@ -123,10 +178,6 @@ class ClientView:
         self.items_tree.column("Nome", width=150)
         self.items_tree.pack(fill="both", expand=True, padx=10, pady=5)
 
-        # Scrollbar vertical (configurada mas não empacotada visualmente)
-        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self. items_tree.yview)
-        self.items_tree.configure(yscrollcommand=scrollbar.set)
-
         # Carregar dados iniciais
         self.load_categories()
         self.load_items()
@@ -149,40 +200,60 @@ class ClientView:
         Carrega os artigos na tabela de visualização.
         
         Aplica o filtro de categoria selecionado e mostra todos os artigos
-        (disponíveis e indisponíveis) para informação do cliente.
+        (disponíveis e indisponíveis) para informação do cliente. Só os
+        artigos das linhas visíveis são carregados.
         """
-        from models import SportsItem, Category
+        from models import SportsItem
+
+        # Obter IDs dos artigos em segundo plano (com ou sem filtro de categoria);
+        # mudar de categoria antes do resultado chegar cancela o pedido anterior
+        category_id = self._category_filter()
+        self.loader.submit("items", lambda: SportsItem.get_ids(category_id=category_id),
+                           lambda ids: self.items_tree.set_rows(ids, self._item_rows))
+
+    def _category_filter(self):
+        """
+        Obtém o ID da categoria selecionada no filtro de artigos.
 
-        # Limpar tabela existente
-        for item in self.items_tree. get_children():
-            self.items_tree.delete(item)
+        Returns:
+            int: ID da categoria, ou None para "Todas"
+        """
+        from models import Category
 
-        # Determinar filtro de categoria
         category_name = self.category_var.get()
-        category_id = None
 
         # Encontrar ID da categoria se não for "Todas"
         if category_name != "Todas": 
             categories = Category.get_all()
             for cat in categories:  
                 if cat.name == category_name:
-                    category_id = cat.id
-                    break
+                    return cat.id
+        return None
 
-        # Obter artigos (com ou sem filtro de categoria)
-        items = SportsItem.get_all(category_id=category_id)
+    def _item_rows(self, item_ids: list) -> list:
+        """
+        Cria as linhas da tabela de artigos visíveis.
 
-        # Inserir cada artigo na tabela
-        for item in items:
+        Args:
+            item_ids: IDs dos artigos visíveis
+
+        Returns:
+            list: Pares (ID, valores da linha)
+        """
+        from models import SportsItem
+
+        rows = []
+        for item in SportsItem.find_many(item_ids):
             cat = item.category
             cat_name = cat.name if cat else "-"
             # Indicador visual de disponibilidade
             status = "✓ Disponível" if item.available else "✗ Indisponível"
 
-            self.items_tree.insert("", "end", values=(
+            rows.append((item.id, (
                 item.id, item.name, item.brand,
                 f"€{item. price_per_hour:.2f}", cat_name, status
-            ))
+            )))
+        return rows
 
     # ==================== ABA RESERVA ====================
     
@@ -237,19 +308,22 @@ class ClientView:
         # Spinbox para o dia (1-31)
         tk.Label(date_row, text="Dia:").pack(side="left")
         self.day_var = tk.StringVar(value=datetime.now().strftime("%d"))
-        day_spin = ttk.Spinbox(date_row, from_=1, to=31, width=4, textvariable=self.day_var)
+        day_spin = ttk.Spinbox(date_row, from_=1, to=31, width=4, textvariable=self.day_var,
+                               command=self.on_period_change)
         day_spin.pack(side="left", padx=(2, 10))
 
         # Spinbox para o mês (1-12)
         tk.Label(date_row, text="Mês:").pack(side="left")
         self.month_var = tk. StringVar(value=datetime.now().strftime("%m"))
-        month_spin = ttk. Spinbox(date_row, from_=1, to=12, width=4, textvariable=self.month_var)
+        month_spin = ttk. Spinbox(date_row, from_=1, to=12, width=4, textvariable=self.month_var,
+                                  command=self.on_period_change)
         month_spin.pack(side="left", padx=(2, 10))
 
         # Spinbox para o ano (2024-2030)
         tk.Label(date_row, text="Ano:").pack(side="left")
         self.year_var = tk.StringVar(value=datetime.now().strftime("%Y"))
-        year_spin = ttk.Spinbox(date_row, from_=2024, to=2030, width=6, textvariable=self. year_var)
+        year_spin = ttk.Spinbox(date_row, from_=2024, to=2030, width=6, textvariable=self. year_var,
+                                command=self.on_period_change)
         year_spin.pack(side="left", padx=2)
 
         # ========== Secção: HORÁRIO ==========
@@ -265,13 +339,13 @@ class ClientView:
         # Spinbox para hora de início (8-22)
         self.start_hour_var = tk.StringVar(value="10")
         ttk. Spinbox(start_row, from_=8, to=22, width=4, textvariable=self.start_hour_var,
-                    command=self.calculate_total).pack(side="left")
+                    command=self.on_period_change).pack(side="left")
         tk.Label(start_row, text=":").pack(side="left")
 
         # Spinbox para minutos de início (intervalos de 15 min)
         self.start_min_var = tk.StringVar(value="00")
         ttk.Spinbox(start_row, values=("00", "15", "30", "45"), width=4,
-                    textvariable=self.start_min_var, command=self.calculate_total).pack(side="left")
+                    textvariable=self.start_min_var, command=self.on_period_change).pack(side="left")
         tk.Label(start_row, text="h").pack(side="left")
 
         # Linha da hora de fim
@@ -283,13 +357,13 @@ class ClientView:
         # Spinbox para hora de fim (8-22)
         self.end_hour_var = tk. StringVar(value="12")
         ttk.Spinbox(end_row, from_=8, to=22, width=4, textvariable=self.end_hour_var,
-                    command=self.calculate_total).pack(side="left")
+                    command=self.on_period_change).pack(side="left")
         tk.Label(end_row, text=":").pack(side="left")
 
         # Spinbox para minutos de fim (intervalos de 15 min)
         self.end_min_var = tk.StringVar(value="00")
         ttk.Spinbox(end_row, values=("00", "15", "30", "45"), width=4,
-                    textvariable=self.end_min_var, command=self.calculate_total).pack(side="left")
+                    textvariable=self.end_min_var, command=self.on_period_change).pack(side="left")
         tk.Label(end_row, text="h").pack(side="left")
 
         # Label que mostra a duração calculada
@@ -347,14 +421,15 @@ class ClientView:
         
         Mostra apenas artigos: 
         - Da categoria selecionada
-        - Que estejam disponíveis (not reserved)
+        - Que estejam livres no horário escolhido (motor de disponibilidade)
         - Que ainda não foram adicionados à reserva atual
+        
+        Se o horário for inválido, mostra todos os artigos em serviço.
+        A consulta corre em segundo plano; um novo pedido (ex: mudança rápida
+        de categoria ou de horário) substitui o anterior.
         """
         from models import SportsItem, Category
 
-        # Limpar lista
-        self.available_listbox. delete(0, tk.END)
-
         # Encontrar ID da categoria selecionada
         category_name = self.res_category_var.get()
         category_id = None
@@ -365,8 +440,24 @@ class ClientView:
                 category_id = cat.id
                 break
 
-        # Obter apenas artigos disponíveis da categoria
-        items = SportsItem.get_all(category_id=category_id, available_only=True)
+        # Obter apenas artigos livres no horário escolhido
+        start_date, end_date = self.get_reservation_dates()
+        if start_date and end_date and end_date > start_date:
+            query = lambda: SportsItem.get_free(start_date, end_date, category_id=category_id)
+        else:
+            query = lambda: SportsItem.get_all(category_id=category_id, available_only=True)
+
+        self.loader.submit("available", query, self._show_available_items)
+
+    def _show_available_items(self, items: list):
+        """
+        Mostra na lista os artigos livres obtidos por load_available_items.
+
+        Args:
+            items: Artigos livres no horário escolhido
+        """
+        # Limpar lista
+        self.available_listbox. delete(0, tk.END)
 
         # Filtrar artigos já selecionados e adicionar à lista
         for item in items:
@@ -462,6 +553,15 @@ class ClientView:
             # Retornar None se houver erro na conversão (data inválida)
             return None, None
 
+    def on_period_change(self):
+        """
+        Reage a uma alteração da data ou do horário da reserva.
+        
+        Recalcula o total e atualiza a lista de artigos livres no novo período.
+        """
+        self.calculate_total()
+        self.load_available_items()
+
     def calculate_total(self):
         """
         Calcula e atualiza o total da reserva.
@@ -473,6 +573,8 @@ class ClientView:
         Atualiza também o label de duração.
         Chamado automaticamente quando o horário ou artigos mudam.
         """
+        from models import SportsItem
+
         start_date, end_date = self.get_reservation_dates()
 
         # Verificar se as datas são válidas e fim > início
@@ -485,8 +587,8 @@ class ClientView:
             m = int((hours - h) * 60)
             self.duration_label.config(text=f"Duração: {h}h {m: 02d}min", fg="gray")
 
-            # Calcular valor total (soma dos preços * horas)
-            total = sum(item.price_per_hour * hours for item in self.selected_items)
+            # Calcular valor total (soma dos preços * horas, tabela de preços)
+            total = SportsItem.quote([item.id for item in self.selected_items], hours)
             self.total_label.config(text=f"Total: €{total:.2f} ({hours:.1f}h)")
         else:
             # Indicar duração inválida
@@ -502,6 +604,7 @@ class ClientView:
         - Data e hora devem ser válidas
         - Hora de fim deve ser posterior à hora de início
         - Não permite reservas no passado
+        - Todos os artigos devem estar livres no horário escolhido
         
         Após criar a reserva: 
         - Cria o objeto Reservation
@@ -509,8 +612,11 @@ class ClientView:
         - Confirma a reserva
         - Limpa o formulário
         - Atualiza todas as listas
+        
+        A criação decorre numa transação: cada ficheiro é escrito uma única
+        vez no fim, e nada é gravado se algum artigo falhar.
         """
-        from models import Reservation
+        from models import ConflictError, Reservation, ReservationError, transaction
 
         # Validar:  pelo menos um artigo selecionado
         if not self.selected_items:
@@ -534,19 +640,35 @@ class ClientView:
             messagebox.showerror("Erro", "Não pode fazer reservas no passado!")
             return
 
-        # ===== Criar a reserva =====
-        reservation = Reservation. create(self.user. id, start_date, end_date)
-
-        # Adicionar todos os artigos selecionados
-        for item in self.selected_items:
-            reservation.add_item(item)
+        # Validar: artigos livres no horário escolhido
+        busy = [item.name for item in self.selected_items
+                if not item.is_free(start_date, end_date)]
+        if busy:
+            messagebox.showerror("Erro", "Artigos já reservados neste horário:\n"
+                                 + "\n".join(busy))
+            return
 
-        # Confirmar a reserva (muda estado para "Confirmed")
-        reservation.confirm()
+        # ===== Criar a reserva (transação) =====
+        try:
+            with transaction():
+                reservation = Reservation. create(self.user. id, start_date, end_date)
+
+                # Adicionar todos os artigos selecionados
+                for item in self.selected_items:
+                    if not reservation.add_item(item):
+                        # Outro utilizador reservou o artigo entretanto
+                        raise ReservationError(f"O artigo {item.name} deixou de estar livre!")
+
+                # Confirmar a reserva (muda estado para "Confirmed")
+                reservation.confirm()
+        except (ReservationError, ConflictError) as e:
+            messagebox.showerror("Erro", str(e))
+            self.load_available_items()
+            return
 
         # Calcular valores para mensagem de confirmação
         hours = (end_date - start_date).total_seconds() / 3600
-        total = sum(item.price_per_hour * hours for item in self.selected_items)
+        total = reservation.total_value
 
         # Mostrar mensagem de sucesso com detalhes
         messagebox.showinfo("Sucesso",
@@ -561,10 +683,8 @@ class ClientView:
         self.selected_listbox.delete(0, tk. END)
         self.calculate_total()
         
-        # Atualizar todas as listas
+        # Atualizar os artigos livres (o histórico é atualizado pela notificação)
         self.load_available_items()
-        self.load_items()
-        self.load_history()
 
     # ==================== ABA HISTÓRICO ====================
     
@@ -586,9 +706,9 @@ class ClientView:
         tk.Button(btn_frame, text="Atualizar", command=self.load_history).pack(side="left")
         tk.Button(btn_frame, text="Cancelar Reserva", command=self.cancel_reservation).pack(side="left", padx=5)
 
-        # ===== Tabela de histórico (Treeview) =====
+        # ===== Tabela de histórico (só as linhas visíveis são criadas) =====
         columns = ("ID", "Data Início", "Data Fim", "Artigos", "Total", "Estado")
-        self.history_tree = ttk.Treeview(frame, columns=columns, show="headings", height=15)
+        self.history_tree = VirtualTable(frame, columns, height=15)
 
         # Configurar cabeçalhos
         for col in columns:  
@@ -611,32 +731,43 @@ class ClientView:
         """
         Carrega o histórico de reservas do cliente.
         
-        Obtém todas as reservas associadas ao cliente autenticado
-        e popula a tabela de histórico. 
+        Obtém em segundo plano os IDs das reservas associadas ao cliente
+        autenticado; as reservas só são carregadas quando as respetivas linhas ficam visíveis.
         """
         from models import Reservation
 
-        # Limpar tabela
-        for item in self.history_tree. get_children():
-            self.history_tree.delete(item)
+        client_id = self.user.id
+        self.loader.submit("history", lambda: Reservation.get_ids(client_id=client_id),
+                           lambda ids: self.history_tree.set_rows(ids, self._history_rows))
 
-        # Obter reservas do cliente atual
-        reservations = Reservation.find_by_client(self.user.id)
+    def _history_rows(self, reservation_ids: list) -> list:
+        """
+        Cria as linhas da tabela de histórico visíveis.
 
-        # Inserir cada reserva na tabela
-        for res in reservations:
+        Args:
+            reservation_ids: IDs das reservas visíveis
+
+        Returns:
+            list: Pares (ID, valores da linha)
+        """
+        from models import Reservation
+
+        rows = []
+        # Artigos de todas as linhas carregados de uma só vez
+        for res in Reservation.find_many(reservation_ids, prefetch=("items",)):
             # Formatar lista de artigos como string
             items = res.items
             items_str = ", ".join([i.name for i in items if i])
 
-            self.history_tree.insert("", "end", values=(
+            rows.append((res.id, (
                 res.id,
                 res.start_date.strftime("%Y-%m-%d %H:%M"),
                 res.end_date. strftime("%Y-%m-%d %H:%M"),
                 items_str,
                 f"€{res.total_value:.2f}",
                 res.state
-            ))
+            )))
+        return rows
 
     def cancel_reservation(self):
         """
@@ -649,7 +780,7 @@ class ClientView:
         
         Ao cancelar, os artigos são automaticamente libertados.
         """
-        from models import Reservation
+        from models import ConflictError, Reservation
 
         # Verificar se há seleção
         selection = self.history_tree.selection()
@@ -671,12 +802,16 @@ class ClientView:
         if messagebox. askyesno("Confirmar", f"Cancelar reserva #{res_id}?"):
             reservation = Reservation.find_by_id(res_id)
             if reservation:
-                reservation.cancel()
+                try:
+                    reservation.cancel()
+                except ConflictError as e:
+                    # Reserva alterada noutro posto: mostrar o estado atual
+                    messagebox.showerror("Erro", str(e))
+                    self.load_history()
+                    return
                 messagebox.showinfo("Sucesso", "Reserva cancelada!")
                 
-                # Atualizar todas as listas (artigos foram libertados)
-                self.load_history()
-                self.load_items()
+                # Artigos foram libertados (o histórico é atualizado pela notificação)
                 self.load_available_items()
 
     # ==================== LOGOUT ====================
@@ -688,6 +823,8 @@ class ClientView:
         Destrói o frame atual e instancia uma nova LoginView,
         permitindo que outro utilizador faça login.
         """
+        self._unsubscribe()
+        self.loader.shutdown()
         self.frame.destroy()
         from . login_view import LoginView
         LoginView(self.master)
\ No newline at end of file
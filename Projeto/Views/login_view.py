@@ -26,6 +26,8 @@ class LoginView:
         frame: Frame que contém o formulário de login
         email_entry: Campo de entrada para o email
         password_entry: Campo de entrada para a password
+        login_button: Botão "Entrar" (desativado durante a verificação)
+        loader: Carregador que verifica as credenciais em segundo plano
     """
     
     def __init__(self, master):
@@ -59,8 +61,12 @@ class LoginView:
         self.password_entry.pack(pady=5)
         
         # ===== Botões =====
-        tk. Button(self.frame, text="Entrar", command=self. login, width=20).pack(pady=10)
+        self.login_button = tk.Button(self.frame, text="Entrar", command=self.login, width=20)
+        self.login_button.pack(pady=10)
         tk.Button(self.frame, text="Registar", command=self. open_register, width=20).pack(pady=5)
+        
+        # Criado no primeiro login, para não atrasar o arranque
+        self.loader = None
     
     # ==================== AUTENTICAÇÃO ====================
         
@@ -71,13 +77,15 @@ class LoginView:
         Fluxo:
         1. Obtém email e password dos campos
         2. Valida se os campos estão preenchidos
-        3. Procura utilizador pelo email
-        4. Verifica credenciais
-        5. Redireciona para AdminView ou ClientView conforme o tipo de utilizador
+        3. Procura utilizador pelo email e verifica credenciais, numa thread
+           de fundo (o hash da password é lento por definição)
+        4. Redireciona para AdminView ou ClientView conforme o tipo de utilizador
+           (ver _on_login_checked)
         
         Em caso de erro, mostra mensagem apropriada.
         """
         from models import User
+        from .background import BackgroundLoader
         
         # Obter valores dos campos (strip remove espaços)
         email = self.email_entry.get().strip()
@@ -88,12 +96,26 @@ class LoginView:
             messagebox.showwarning("Aviso", "Preencha todos os campos!")
             return
         
-        # Procurar utilizador pelo email
-        user = User.find_by_email(email)
+        # Procurar utilizador e verificar a password sem bloquear a interface
+        if self.loader is None:
+            self.loader = BackgroundLoader(self.frame, workers=1)
+        self.login_button.config(state="disabled")
+        self.loader.submit("login", lambda: User.authenticate(email, password),
+                           self._on_login_checked, self._on_login_failed)
+    
+    def _on_login_checked(self, user):
+        """
+        Conclui o login com o resultado da verificação (thread do Tkinter).
+        
+        Args:
+            user: Utilizador autenticado, ou None se as credenciais forem inválidas
+        """
+        self.login_button.config(state="normal")
         
         # Verificar se existe e se a password está correta
-        if user and user.login(email, password):
+        if user is not None:
             # Destruir o frame de login
+            self.loader.shutdown()
             self.frame.destroy()
             
             # Redirecionar baseado no tipo de utilizador
@@ -109,6 +131,18 @@ class LoginView:
             # Credenciais inválidas
             messagebox. showerror("Erro", "Email ou password inválidos!")
     
+    def _on_login_failed(self, error):
+        """
+        Mostra um erro da verificação das credenciais (thread do Tkinter).
+        
+        Reativa o botão "Entrar" para o utilizador poder tentar de novo.
+        
+        Args:
+            error: Exceção lançada pela verificação (ex: erro de leitura)
+        """
+        self.login_button.config(state="normal")
+        messagebox.showerror("Erro", f"Não foi possível verificar as credenciais:\n{error}")
+    
     # ==================== REGISTO ====================
     
     def open_register(self):
@@ -334,7 +368,7 @@ class LoginView:
             
             Em caso de erro em qualquer validação, mostra mensagem e interrompe. 
             """
-            from models import Client, User
+            from models import Client, EmailInUseError, User
             
             # Obter valores dos campos
             name = name_entry.get().strip()
@@ -382,7 +416,12 @@ class LoginView:
                 return
             
             # ===== Criar cliente =====
-            Client.create(name, email, password, address, phone)
+            # A gravação volta a verificar o email sob bloqueio (registos simultâneos)
+            try:
+                Client.create(name, email, password, address, phone)
+            except EmailInUseError:
+                messagebox.showerror("Erro", "Este email já está registado!")
+                return
             messagebox.showinfo("Sucesso", "Conta criada com sucesso!")
             
             # Fechar janela de registo (volta ao login)
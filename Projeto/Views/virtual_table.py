@@ -0,0 +1,266 @@
+"""
+Tabela virtualizada para listagens grandes.
+
+Este módulo implementa um widget que mostra uma Treeview com muitas linhas
+sem as inserir todas: só as linhas visíveis são criadas, e os dados de cada
+linha só são obtidos quando ela entra no ecrã.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTable(tk.Frame):
+    """
+    Treeview virtualizada com barra de deslocamento própria.
+
+    A tabela recebe apenas a lista de IDs a mostrar e uma função que cria as
+    linhas de um conjunto de IDs. Ao deslocar (barra, roda do rato ou
+    teclado), as linhas visíveis são substituídas pelas da nova janela, pelo
+    que o número de linhas da Treeview, a memória e o tempo de atualização
+    não dependem do número total de registos.
+
+    O identificador (iid) de cada linha é o ID do registo, pelo que
+    selection() e item() funcionam como numa Treeview normal. A linha
+    selecionada volta a ser selecionada quando regressa ao ecrã.
+
+    Alterações individuais (update_row/remove_row) só redesenham a linha
+    afetada, ou a janela visível se as linhas tiverem de se deslocar.
+
+    Attributes:
+        tree: Treeview que mostra as linhas visíveis
+        scrollbar: Barra de deslocamento vertical
+    """
+
+    # Linhas deslocadas por cada passo da roda do rato
+    WHEEL_STEP = 3
+
+    def __init__(self, master, columns, height: int = 15):
+        """
+        Inicializa a tabela virtualizada.
+
+        Args:
+            master: Widget onde a tabela é colocada
+            columns: Nomes das colunas (como na Treeview)
+            height: Número inicial de linhas visíveis
+        """
+        super().__init__(master)
+        self.tree = ttk.Treeview(self, columns=columns, show="headings",
+                                 height=height, selectmode="browse")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self._ids = []          # IDs de todas as linhas, pela ordem de apresentação
+        self._id_set = set()    # os mesmos IDs, para pesquisa em O(1)
+        self._fetch = None      # função IDs -> [(ID, valores)]
+        self._top = 0           # posição da primeira linha visível
+        self._rows = height     # número de linhas que cabem no ecrã
+        self._selected = None   # ID da linha selecionada (mesmo fora do ecrã)
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-self.WHEEL_STEP))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(self.WHEEL_STEP))
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda e: self._scroll_by(-self._rows))
+        self.tree.bind("<Next>", lambda e: self._scroll_by(self._rows))
+
+    # ==================== INTERFACE DA TREEVIEW ====================
+
+    def heading(self, column, **options):
+        """Configura o cabeçalho de uma coluna (ver ttk.Treeview.heading)."""
+        return self.tree.heading(column, **options)
+
+    def column(self, column, **options):
+        """Configura uma coluna (ver ttk.Treeview.column)."""
+        return self.tree.column(column, **options)
+
+    def selection(self):
+        """Obtém as linhas selecionadas (ver ttk.Treeview.selection)."""
+        return self.tree.selection()
+
+    def item(self, iid, **options):
+        """Obtém ou altera uma linha visível (ver ttk.Treeview.item)."""
+        return self.tree.item(iid, **options)
+
+    # ==================== DADOS ====================
+
+    def set_rows(self, ids: list, fetch):
+        """
+        Define as linhas da tabela e mostra as que estão visíveis.
+
+        A posição de deslocamento é mantida (dentro dos novos limites), para
+        que atualizar a tabela não volte ao início.
+
+        Args:
+            ids: IDs dos registos a mostrar, pela ordem pretendida
+            fetch: Função que recebe uma lista de IDs e devolve pares
+                (ID, valores das colunas); IDs inexistentes podem ser omitidos
+        """
+        self._ids = list(ids)
+        self._id_set = set(self._ids)
+        self._fetch = fetch
+        self._render()
+
+    def refresh(self):
+        """Volta a obter os dados das linhas visíveis."""
+        self._render()
+
+    def update_row(self, record_id):
+        """
+        Atualiza ou acrescenta (no fim) a linha de um registo.
+
+        Só a própria linha é redesenhada, e apenas se estiver visível. Antes
+        do primeiro set_rows (dados ainda a carregar) só o ID é registado.
+
+        Args:
+            record_id: ID do registo gravado
+        """
+        if self._fetch is None:
+            if record_id not in self._id_set:
+                self._ids.append(record_id)
+                self._id_set.add(record_id)
+            return
+        if record_id not in self._id_set:
+            self._ids.append(record_id)
+            self._id_set.add(record_id)
+            if len(self._ids) - self._top <= self._rows:
+                self._render()
+            else:
+                self._update_scrollbar(len(self.tree.get_children()))
+        elif self.tree.exists(record_id):
+            for _, values in self._fetch([record_id]):
+                self.tree.item(record_id, values=values)
+
+    def remove_row(self, record_id):
+        """
+        Retira a linha de um registo (sem efeito se não existir).
+
+        Args:
+            record_id: ID do registo removido ou que deixou de passar no filtro
+        """
+        if record_id not in self._id_set:
+            return
+        self._ids.remove(record_id)
+        self._id_set.discard(record_id)
+        if self._fetch is None:
+            return      # dados ainda a carregar: nada desenhado
+        if self.tree.exists(record_id):
+            # As linhas seguintes sobem: redesenhar a janela visível
+            self._render()
+        else:
+            self._update_scrollbar(len(self.tree.get_children()))
+
+    def _render(self):
+        """Substitui as linhas da Treeview pelas da janela visível."""
+        total = len(self._ids)
+        self._top = max(0, min(self._top, total - self._rows))
+        window = self._ids[self._top:self._top + self._rows]
+        rows = self._fetch(window) if window and self._fetch is not None else []
+
+        self.tree.delete(*self.tree.get_children())
+        for record_id, values in rows:
+            self.tree.insert("", "end", iid=record_id, values=values)
+
+        if self._selected is not None and self.tree.exists(self._selected):
+            self.tree.selection_set(self._selected)
+            self.tree.focus(self._selected)
+
+        self._update_scrollbar(len(window))
+
+    def _update_scrollbar(self, shown: int):
+        """
+        Atualiza a barra de deslocamento com a posição da janela visível.
+
+        Args:
+            shown: Número de linhas atualmente na Treeview
+        """
+        total = len(self._ids)
+        if total:
+            self.scrollbar.set(self._top / total, (self._top + shown) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    # ==================== DESLOCAMENTO ====================
+
+    def _scroll_by(self, rows: int):
+        """
+        Desloca a janela visível um número de linhas.
+
+        Args:
+            rows: Linhas a deslocar (negativo para cima)
+
+        Returns:
+            str: "break", para a Treeview não processar o evento
+        """
+        top = max(0, min(self._top + rows, len(self._ids) - self._rows))
+        if top != self._top:
+            self._top = top
+            self._render()
+        return "break"
+
+    def _on_scrollbar(self, action, value, unit=None):
+        """
+        Trata os comandos da barra de deslocamento.
+
+        Args:
+            action: "moveto" (arrastar) ou "scroll" (setas/páginas)
+            value: Fração da lista ("moveto") ou número de passos ("scroll")
+            unit: "units" ou "pages" (apenas com "scroll")
+        """
+        if action == "moveto":
+            self._scroll_by(int(float(value) * len(self._ids)) - self._top)
+        else:
+            step = self._rows if unit == "pages" else 1
+            self._scroll_by(int(value) * step)
+
+    def _on_mousewheel(self, event):
+        """Desloca a tabela com a roda do rato (Windows e macOS)."""
+        direction = -1 if event.delta > 0 else 1
+        return self._scroll_by(direction * self.WHEEL_STEP)
+
+    def _on_arrow(self, direction: int):
+        """
+        Continua a navegação por teclado para lá da primeira/última linha visível.
+
+        Args:
+            direction: -1 (seta para cima) ou 1 (seta para baixo)
+
+        Returns:
+            str: "break" se a tabela foi deslocada, None caso contrário
+        """
+        children = self.tree.get_children()
+        if not children or self.tree.focus() != children[-1 if direction > 0 else 0]:
+            return None
+        before = self._top
+        self._scroll_by(direction)
+        if self._top == before:
+            return "break"
+        children = self.tree.get_children()
+        target = children[-1 if direction > 0 else 0]
+        self.tree.selection_set(target)
+        self.tree.focus(target)
+        return "break"
+
+    def _on_configure(self, event):
+        """Ajusta o número de linhas visíveis ao tamanho da tabela."""
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else None
+        if not bbox:
+            return
+        # bbox da primeira linha: y = altura do cabeçalho, altura = altura da linha
+        _, header, _, row_height = bbox
+        rows = max(1, (event.height - header) // row_height)
+        if rows != self._rows:
+            self._rows = rows
+            self._render()
+
+    def _on_select(self, event):
+        """Memoriza a linha selecionada pelo utilizador."""
+        selection = self.tree.selection()
+        # A seleção fica vazia quando a linha sai do ecrã; manter a anterior
+        if selection:
+            self._selected = selection[0]
@@ -0,0 +1,91 @@
+"""
+Benchmark da verificação de passwords.
+
+Mede o tempo de verificação de uma password para vários valores de custo
+do algoritmo (N do scrypt ou iterações do PBKDF2), para escolher o custo
+adequado ao equipamento onde a aplicação corre. Mostra também o tempo de
+uma verificação repetida (memorizada).
+
+O custo escolhido é definido com BOOKING_SCRYPT_COST ou
+BOOKING_PBKDF2_ITERATIONS (ver models/config.py).
+
+Utilização (a partir da pasta do repositório):
+    python Projeto/benchmarks/passwords.py [--scheme scrypt] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import config, passwords  # noqa: E402
+
+# Custos medidos por defeito, por algoritmo
+DEFAULT_COSTS = {
+    "scrypt": [2 ** 12, 2 ** 13, 2 ** 14, 2 ** 15, 2 ** 16],
+    "pbkdf2": [100_000, 200_000, 400_000, 600_000, 1_000_000],
+}
+
+# Password usada nas medições
+SAMPLE_PASSWORD = "Cliente123"
+
+
+def measure(function, runs: int) -> float:
+    """
+    Mede a mediana do tempo de execução de uma função.
+
+    Args:
+        function: Função sem argumentos
+        runs: Número de execuções
+
+    Returns:
+        float: Tempo mediano em milissegundos
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main(argv=None):
+    """
+    Executa o benchmark e mostra uma tabela com os tempos por custo.
+
+    Args:
+        argv: Argumentos da linha de comandos (default: sys.argv)
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scheme", choices=sorted(DEFAULT_COSTS),
+                        default=passwords.current_scheme())
+    parser.add_argument("--costs", type=int, nargs="+",
+                        help="custos a medir (default: valores típicos do algoritmo)")
+    parser.add_argument("--runs", type=int, default=5, help="execuções por custo")
+    args = parser.parse_args(argv)
+
+    configured = config.SCRYPT_COST if args.scheme == "scrypt" else config.PBKDF2_ITERATIONS
+    print(f"Algoritmo: {args.scheme} (custo configurado: {configured})")
+    print(f"{'custo':>10}  {'hash':>10}  {'verificação':>12}  {'memorizada':>11}")
+
+    for cost in args.costs or DEFAULT_COSTS[args.scheme]:
+        stored = passwords.hash_password(SAMPLE_PASSWORD, args.scheme, cost)
+        hash_ms = measure(lambda: passwords.hash_password(SAMPLE_PASSWORD, args.scheme, cost),
+                          args.runs)
+        # Verificação completa: cada execução usa um valor guardado novo (sem memória)
+        samples = [passwords.hash_password(SAMPLE_PASSWORD, args.scheme, cost)
+                   for _ in range(args.runs)]
+        verify_ms = measure(lambda: passwords.verify_password(SAMPLE_PASSWORD, samples.pop()),
+                            args.runs)
+        passwords.verify_password(SAMPLE_PASSWORD, stored)
+        cached_ms = measure(lambda: passwords.verify_password(SAMPLE_PASSWORD, stored),
+                            args.runs)
+        marker = "  <- configurado" if cost == configured else ""
+        print(f"{cost:>10}  {hash_ms:>8.1f}ms  {verify_ms:>10.1f}ms  {cached_ms:>9.3f}ms{marker}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark do tempo de arranque da aplicação.
+
+Executa o arranque num processo novo com "python -X importtime" várias
+vezes e resume o tempo de importação: total, módulos mais lentos e os
+módulos do projeto carregados antes da primeira janela.
+
+Utilização (a partir da pasta do repositório, onde está data/):
+    python Projeto/benchmarks/startup.py [--runs 10] [--top 15] [--scenario startup]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Pasta do projeto (onde estão main.py, models e Views)
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pasta de onde a aplicação é executada (contém data/)
+ROOT_DIR = os.path.dirname(PROJECT_DIR)
+
+# Código executado em cada cenário (sem abrir janelas)
+SCENARIOS = {
+    # Até ao ecrã de login: o que main.py importa
+    "startup": "import main",
+    # Arranque seguido do primeiro login (modelo User)
+    "login": "import main; from models import User; User.find_by_email('')",
+    # Todos os modelos e views (referência: arranque sem carregamento diferido)
+    "full": "import main, models, Views; "
+            "[getattr(models, n) for n in models.__all__]; "
+            "[getattr(Views, n) for n in Views.__all__]",
+}
+
+# Prefixos dos módulos do projeto
+PROJECT_MODULES = ("main", "models", "Views")
+
+
+def parse_importtime(output: str) -> dict:
+    """
+    Lê o relatório de "python -X importtime".
+
+    Args:
+        output: Texto escrito no stderr pelo interpretador
+
+    Returns:
+        dict: Nome do módulo -> (tempo próprio, tempo acumulado, nível),
+            com os tempos em microssegundos
+    """
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        level = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), level)
+    return modules
+
+
+def run_once(code: str) -> tuple:
+    """
+    Executa um cenário num processo novo.
+
+    Args:
+        code: Código Python do cenário
+
+    Returns:
+        tuple: (tempo total do processo em segundos, módulos importados)
+
+    Raises:
+        RuntimeError: Se o processo terminar com erro
+    """
+    # Como em "python Projeto/main.py": a pasta do projeto no sys.path
+    env = dict(os.environ, PYTHONPATH=PROJECT_DIR)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return elapsed, parse_importtime(result.stderr)
+
+
+def main(argv=None):
+    """
+    Executa o benchmark e mostra o resumo.
+
+    Args:
+        argv: Argumentos da linha de comandos (default: sys.argv)
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="número de execuções")
+    parser.add_argument("--top", type=int, default=15, help="módulos mais lentos a mostrar")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="startup")
+    args = parser.parse_args(argv)
+
+    code = SCENARIOS[args.scenario]
+    run_once(code)  # aquecimento: compila os .pyc e carrega a cache do disco
+
+    wall_times, import_totals = [], []
+    cumulative = {}
+    for _ in range(args.runs):
+        elapsed, modules = run_once(code)
+        wall_times.append(elapsed)
+        import_totals.append(sum(c for _, c, level in modules.values() if level == 0))
+        for name, (_, c, _) in modules.items():
+            cumulative.setdefault(name, []).append(c)
+
+    print(f"Cenário: {args.scenario} ({args.runs} execuções, mediana)")
+    print(f"  Processo completo:   {statistics.median(wall_times) * 1000:8.1f} ms")
+    print(f"  Importações:         {statistics.median(import_totals) / 1000:8.1f} ms")
+
+    print("\nMódulos mais lentos (tempo acumulado):")
+    slowest = sorted(cumulative.items(), key=lambda m: statistics.median(m[1]), reverse=True)
+    for name, times in slowest[:args.top]:
+        print(f"  {statistics.median(times) / 1000:8.1f} ms  {name}")
+
+    project = sorted(n for n in cumulative if n.split(".")[0] in PROJECT_MODULES)
+    print(f"\nMódulos do projeto carregados ({len(project)}):")
+    for name in project:
+        print(f"  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,16 @@ Inicializa a janela principal e carrega a view de login.
 """
 
 import tkinter as tk
-from views import LoginView
+from tkinter import messagebox
+from Views import LoginView
 
 
 class App(tk.Tk):
     """Classe principal da aplicação."""
     
+    # Intervalo (ms) entre verificações do fim do pré-carregamento
+    WARM_UP_POLL = 100
+    
     def __init__(self):
         super().__init__()
         
@@ -23,6 +27,28 @@ class App(tk.Tk):
         
         # Iniciar com a view de login
         LoginView(self)
+        
+        # Ler os ficheiros de dados em segundo plano enquanto o login é
+        # mostrado; as views usam depois os dados já carregados
+        self.warm_up = None
+        self.after_idle(self._start_warm_up)
+    
+    def _start_warm_up(self):
+        """Inicia o pré-carregamento dos dados (ver models.warmup)."""
+        from models import warmup
+        self.warm_up = warmup.start()
+        self.after(self.WARM_UP_POLL, self._check_warm_up)
+    
+    def _check_warm_up(self):
+        """Aguarda o fim do pré-carregamento e mostra um eventual erro."""
+        if not self.warm_up.done():
+            self.after(self.WARM_UP_POLL, self._check_warm_up)
+            return
+        error = self.warm_up.exception()
+        if error is not None:
+            self.report_callback_exception(type(error), error, error.__traceback__)
+            messagebox.showerror(
+                "Erro", f"Não foi possível carregar os dados da aplicação:\n{error}")
     
     def _center_window(self, width:  int, height: int):
         """Centraliza a janela no ecrã."""
@@ -1,9 +1,52 @@
 """
-Módulo de modelos da aplicação. 
+Módulo de modelos da aplicação.
 Exporta todas as classes de modelo para fácil importação.
+
+Os módulos dos modelos só são importados quando um dos seus nomes é usado
+pela primeira vez (PEP 562): o ecrã de login carrega apenas User, e os
+artigos, reservas e o motor de preços só são carregados depois.
 """
 
-from .user import User, Client, Administrator
-from .category import Category
-from .sports_item import SportsItem
-from .reservation import Reservation
\ No newline at end of file
+# Nomes exportados: nome -> módulo que o define
+_EXPORTS = {
+    "User": "user",
+    "Client": "user",
+    "Administrator": "user",
+    "EmailInUseError": "user",
+    "Category": "category",
+    "SportsItem": "sports_item",
+    "Reservation": "reservation",
+    "ReservationError": "reservation",
+    "ConflictError": "repository",
+    "transaction": "unit_of_work",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """
+    Importa o módulo de um nome exportado na primeira utilização.
+
+    Args:
+        name: Nome exportado (ex: "User")
+
+    Returns:
+        Classe ou função correspondente
+
+    Raises:
+        AttributeError: Se o nome não for exportado pelo pacote
+    """
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Importação relativa pelo mecanismo normal (visível em -X importtime)
+    module = __import__(module_name, globals(), level=1, fromlist=(name,))
+    value = getattr(module, name)
+    globals()[name] = value   # próximas consultas não passam por aqui
+    return value
+
+
+def __dir__():
+    """Lista os nomes do pacote, incluindo os ainda não importados."""
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,361 @@
+"""
+Arquivo das reservas encerradas (concluídas ou canceladas).
+
+As reservas encerradas já não mudam, por isso saem do ficheiro de reservas
+(que fica só com as reservas ativas e é lido por inteiro) para um arquivo
+só de leitura, aberto com mmap:
+
+    data/reservations.archive           registos em JSON, um por linha, só acrescentados
+    data/reservations.archive.idx       índice no formato binário em colunas
+    data/reservations.archive.idx.log   linhas do índice ainda não juntadas ao .idx
+
+O índice guarda, por ID, a posição e o tamanho de cada registo, o cliente
+e o estado, e uma segunda ordenação por cliente. As consultas por ID ou por
+cliente são pesquisas binárias no índice, e só os registos pedidos (ex: as
+linhas visíveis de uma tabela) são descodificados.
+
+Cada arquivamento acrescenta as linhas novas do índice ao ficheiro .log
+(linhas de largura fixa); o .idx só é reescrito quando o .log passa de uma
+fração do índice (ver TAIL_RATIO), pelo que o custo de arquivar é
+proporcional às reservas arquivadas e não ao tamanho do arquivo.
+"""
+
+import json
+import os
+import struct
+import threading
+from bisect import bisect_left, bisect_right
+
+from .columnar import ColumnTable, encode, map_file
+from .storage import FileLock, append_bytes, atomic_write
+
+# Estados das reservas guardadas no arquivo (o índice guarda a posição)
+CLOSED_STATES = ("Completed", "Cancelled")
+
+# Colunas do índice (uma linha por reserva, ordenadas pelo ID)
+INDEX_SCHEMA = (
+    ("id", "q"),
+    ("offset", "q"),        # posição do registo no ficheiro de dados
+    ("length", "q"),        # tamanho do registo em bytes
+    ("client_id", "q"),
+    ("state", "q"),         # posição em CLOSED_STATES
+    ("client_key", "q"),    # IDs de cliente por ordem crescente...
+    ("client_row", "q"),    # ...e a linha (ordem por ID) de cada um
+)
+
+# Linha do ficheiro .log: ID, posição, tamanho, cliente, estado
+_TAIL_ROW = struct.Struct("<5q")
+
+# O .log é juntado ao índice quando tiver mais do que TAIL_MIN linhas e
+# mais do que 1/TAIL_RATIO das linhas do índice
+TAIL_MIN = 1024
+TAIL_RATIO = 8
+
+
+def _stamp(path: str):
+    """Obtém (mtime, tamanho) de um ficheiro, ou None se não existir."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ReservationArchive:
+    """
+    Arquivo só de leitura das reservas encerradas.
+
+    O índice é relido quando o ficheiro muda (ex: outro processo arquivou
+    reservas). Os objetos criados a partir do arquivo são memorizados por
+    ID, como no mapa de identidade dos repositórios.
+
+    Attributes:
+        path (str): Caminho do ficheiro de dados do arquivo
+        index_path (str): Caminho do índice
+        tail_path (str): Caminho das linhas do índice ainda não juntadas
+    """
+
+    # Arquivos partilhados, um por caminho
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        """
+        Inicializa o arquivo.
+
+        Args:
+            path: Caminho do ficheiro de dados (ex: data/reservations.archive)
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self.tail_path = self.index_path + ".log"
+        self.lock = threading.RLock()
+        self._file_lock = FileLock(path + ".lock")
+        self._stamp = None
+        self._table = None      # índice (ColumnTable), ou None se vazio
+        self._tail = {}         # ID -> linha do .log (ID, posição, tamanho, cliente, estado)
+        self._data = None       # conteúdo do ficheiro de dados (mmap)
+        self._identity = {}     # ID -> objeto já criado
+
+    @classmethod
+    def for_file(cls, path: str) -> 'ReservationArchive':
+        """
+        Obtém o arquivo partilhado de um caminho.
+
+        Args:
+            path: Caminho do ficheiro de dados
+
+        Returns:
+            ReservationArchive: Instância única associada ao caminho
+        """
+        with cls._instances_lock:
+            archive = cls._instances.get(path)
+            if archive is None:
+                archive = cls._instances[path] = cls(path)
+            return archive
+
+    # ==================== LEITURA ====================
+
+    def _open(self):
+        """Abre (ou reabre, se mudou) o índice e os dados do arquivo."""
+        stamp = (_stamp(self.index_path), _stamp(self.tail_path))
+        if stamp == self._stamp:
+            return
+        table = ColumnTable.open(self.index_path) if stamp[0] is not None else None
+        if table is not None and table.rows == 0:
+            table = None
+        self._table = table
+        self._tail = {}
+        if stamp[1] is not None:
+            with open(self.tail_path, "rb") as f:
+                content = f.read()
+            # Uma linha incompleta no fim (escrita interrompida) é ignorada
+            size = len(content) - len(content) % _TAIL_ROW.size
+            for row in _TAIL_ROW.iter_unpack(content[:size]):
+                # Linhas já juntadas ao índice (junção interrompida) são ignoradas
+                if self._row(row[0]) is None:
+                    self._tail[row[0]] = row
+        # O índice é escrito depois dos dados: o mapeamento cobre todos os registos
+        has_rows = table is not None or self._tail
+        self._data = map_file(self.path) if has_rows else None
+        self._identity = {}
+        self._stamp = stamp
+
+    def _row(self, record_id: int):
+        """
+        Procura a linha do índice de uma reserva (pesquisa binária).
+
+        Args:
+            record_id: ID da reserva
+
+        Returns:
+            int: Linha no índice, ou None se não estiver no índice
+        """
+        if self._table is None:
+            return None
+        ids = self._table.column("id")
+        row = bisect_left(ids, record_id)
+        if row < len(ids) and ids[row] == record_id:
+            return row
+        return None
+
+    def _locate(self, record_id: int):
+        """
+        Obtém a posição de uma reserva no ficheiro de dados.
+
+        Args:
+            record_id: ID da reserva
+
+        Returns:
+            tuple: (posição, tamanho), ou None se não estiver arquivada
+        """
+        row = self._row(record_id)
+        if row is not None:
+            return self._table.column("offset")[row], self._table.column("length")[row]
+        tail = self._tail.get(record_id)
+        return (tail[1], tail[2]) if tail is not None else None
+
+    def _decode(self, location: tuple) -> dict:
+        """
+        Descodifica o registo numa posição do ficheiro de dados.
+
+        Args:
+            location: (posição, tamanho), ver _locate
+
+        Returns:
+            dict: Registo da reserva
+        """
+        offset, length = location
+        return json.loads(bytes(self._data[offset:offset + length]))
+
+    def get(self, record_id: int):
+        """
+        Obtém o registo de uma reserva arquivada.
+
+        Args:
+            record_id: ID da reserva
+
+        Returns:
+            dict: Registo da reserva, ou None se não estiver arquivada
+        """
+        with self.lock:
+            self._open()
+            location = self._locate(record_id)
+            return self._decode(location) if location is not None else None
+
+    def find_many(self, record_ids, factory) -> list:
+        """
+        Obtém os objetos de várias reservas arquivadas.
+
+        Só os registos pedidos são descodificados; os objetos são memorizados.
+
+        Args:
+            record_ids: IDs das reservas, pela ordem pretendida
+            factory: Função que cria o objeto a partir do registo (from_dict)
+
+        Returns:
+            list: Objetos das reservas arquivadas (as restantes são ignoradas)
+        """
+        with self.lock:
+            self._open()
+            result = []
+            for record_id in record_ids:
+                obj = self._identity.get(record_id)
+                if obj is None:
+                    location = self._locate(record_id)
+                    if location is None:
+                        continue
+                    record = self._decode(location)
+                    obj = self._identity[record_id] = factory(record)
+                    obj._version = record.get("version", 0)
+                result.append(obj)
+            return result
+
+    def ids(self, client_id: int = None, state: str = None) -> list:
+        """
+        Obtém os IDs das reservas arquivadas, sem descodificar registos.
+
+        Args:
+            client_id: Filtrar por ID do cliente (opcional)
+            state: Filtrar por estado (opcional)
+
+        Returns:
+            list[int]: IDs por ordem crescente
+        """
+        with self.lock:
+            self._open()
+            if state and state not in CLOSED_STATES:
+                return []
+            code = CLOSED_STATES.index(state) if state else None
+            result = self._table_ids(client_id, code) if self._table is not None else []
+            tail = sorted(row[0] for row in self._tail.values()
+                          if (not client_id or row[3] == client_id)
+                          and (code is None or row[4] == code))
+            return sorted(result + tail) if tail else result
+
+    def _table_ids(self, client_id: int, code: int) -> list:
+        """
+        Obtém os IDs das reservas do índice, sem descodificar registos.
+
+        Args:
+            client_id: Filtrar por ID do cliente (opcional)
+            code: Filtrar pela posição do estado em CLOSED_STATES (opcional)
+
+        Returns:
+            list[int]: IDs por ordem crescente
+        """
+        ids = self._table.column("id")
+        if client_id:
+            keys = self._table.column("client_key")
+            first, last = bisect_left(keys, client_id), bisect_right(keys, client_id)
+            rows = sorted(self._table.column("client_row")[first:last].tolist())
+        else:
+            rows = range(len(ids))
+        if code is not None:
+            states = self._table.column("state")
+            rows = [row for row in rows if states[row] == code]
+        if isinstance(rows, range):
+            return ids.tolist()
+        return [ids[row] for row in rows]
+
+    # ==================== ESCRITA ====================
+
+    def append(self, records: list) -> int:
+        """
+        Acrescenta reservas encerradas ao arquivo.
+
+        Os registos são acrescentados ao ficheiro de dados numa só escrita e
+        as suas linhas do índice ao ficheiro .log depois. Quando o .log fica
+        grande, é juntado ao índice, reescrito de forma atómica (ver
+        TAIL_RATIO). Reservas que já estão no arquivo são ignoradas (ex:
+        repetição após uma interrupção).
+
+        Args:
+            records: Registos das reservas (estado em CLOSED_STATES)
+
+        Returns:
+            int: Número de reservas acrescentadas
+
+        Raises:
+            ValueError: Se uma reserva não estiver encerrada
+        """
+        with self.lock, self._file_lock:
+            self._open()
+            records = [r for r in records if self._locate(r["id"]) is None]
+            if not records:
+                return 0
+            for record in records:
+                if record.get("state") not in CLOSED_STATES:
+                    raise ValueError(f"A reserva {record['id']} não está encerrada")
+
+            lines = [json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n"
+                     for r in records]
+            data = b"".join(lines)
+            offset = append_bytes(self.path, data) - len(data)
+
+            rows = []
+            for record, line in zip(records, lines):
+                rows.append((record["id"], offset, len(line) - 1,
+                             record["client_id"], CLOSED_STATES.index(record["state"])))
+                offset += len(line)
+
+            indexed = self._table.rows if self._table is not None else 0
+            if len(self._tail) + len(rows) > max(TAIL_MIN, indexed // TAIL_RATIO):
+                self._write_index(self._rows() + rows)
+            else:
+                append_bytes(self.tail_path, b"".join(_TAIL_ROW.pack(*row) for row in rows))
+            return len(records)
+
+    def _write_index(self, rows: list):
+        """
+        Reescreve o índice com todas as linhas e esvazia o ficheiro .log.
+
+        Se a escrita for interrompida entre os dois ficheiros, as linhas que
+        ficam repetidas no .log são ignoradas na leitura (ver _open).
+
+        Args:
+            rows: Linhas (ID, posição, tamanho, cliente, estado) de todas as reservas
+        """
+        rows.sort()
+        order = sorted(range(len(rows)), key=lambda i: (rows[i][3], rows[i][0]))
+        index = [
+            {"id": row[0], "offset": row[1], "length": row[2], "client_id": row[3],
+             "state": row[4], "client_key": rows[i][3], "client_row": i}
+            for row, i in zip(rows, order)
+        ]
+        atomic_write(self.index_path, encode(index, INDEX_SCHEMA))
+        atomic_write(self.tail_path, b"")
+
+    def _rows(self) -> list:
+        """
+        Obtém as linhas atuais do índice e do ficheiro .log.
+
+        Returns:
+            list[tuple]: (ID, posição, tamanho, cliente, estado) por linha
+        """
+        rows = list(self._tail.values())
+        if self._table is None:
+            return rows
+        columns = [self._table.column(field).tolist()
+                   for field in ("id", "offset", "length", "client_id", "state")]
+        return list(zip(*columns)) + rows
@@ -0,0 +1,460 @@
+"""
+Módulo do motor de disponibilidade dos artigos.
+Mantém, para cada artigo, os intervalos de tempo já reservados e responde
+a consultas do tipo "o artigo X está livre em [início, fim)?".
+
+As consultas dentro do horário de funcionamento usam um mapa de bits por
+artigo e por dia (slots de 15 minutos); as restantes usam os intervalos.
+"""
+
+import math
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+
+class SlotBitmap:
+    """
+    Mapa de bits da ocupação de cada artigo por dia.
+
+    O horário de reservas (08:00-22:00, em passos de 15 minutos) tem 56 slots
+    por dia. Cada par (dia, artigo) é representado por um inteiro de 56 bits,
+    onde o bit i indica que o slot i está ocupado. Verificar se N artigos
+    estão livres num período resume-se a N operações AND com a máscara do
+    período.
+
+    Só são guardadas as linhas de dias com reservas, pelo que a memória cresce
+    linearmente com o número de pares (artigo, dia) efetivamente reservados.
+
+    Reservas com horas fora da grelha de 15 minutos marcam os slots por
+    excesso; essas linhas ficam assinaladas como inexatas e a consulta
+    recorre aos intervalos.
+
+    Attributes:
+        OPEN_MINUTE (int): Minuto do dia em que abre o horário (08:00)
+        CLOSE_MINUTE (int): Minuto do dia em que fecha o horário (22:00)
+        SLOT_MINUTES (int): Duração de cada slot em minutos
+        SLOTS_PER_DAY (int): Número de slots por dia
+    """
+
+    OPEN_MINUTE = 8 * 60
+    CLOSE_MINUTE = 22 * 60
+    SLOT_MINUTES = 15
+    SLOTS_PER_DAY = (CLOSE_MINUTE - OPEN_MINUTE) // SLOT_MINUTES
+
+    def __init__(self):
+        """Inicializa um mapa vazio."""
+        self._rows = {}      # dia -> {ID do artigo: bits ocupados}
+        self._owners = {}    # (dia, ID do artigo) -> {ID da reserva: bits}
+        self._inexact = set()  # (dia, ID do artigo) com slots marcados por excesso
+
+    # ==================== MÁSCARAS ====================
+
+    @classmethod
+    def _day_masks(cls, start: datetime, end: datetime):
+        """
+        Decompõe o intervalo [start, end) em máscaras de slots por dia.
+
+        Args:
+            start: Início do intervalo
+            end: Fim do intervalo
+
+        Returns:
+            list: Tuplos (dia, máscara, exata) para cada dia com slots no horário
+        """
+        masks = []
+        day = start.date()
+        while datetime.combine(day, datetime.min.time()) < end:
+            midnight = datetime.combine(day, datetime.min.time())
+            low = max((start - midnight).total_seconds() / 60, cls.OPEN_MINUTE)
+            high = min((end - midnight).total_seconds() / 60, cls.CLOSE_MINUTE)
+            if low < high:
+                first = int((low - cls.OPEN_MINUTE) // cls.SLOT_MINUTES)
+                last = math.ceil((high - cls.OPEN_MINUTE) / cls.SLOT_MINUTES)
+                exact = low % cls.SLOT_MINUTES == 0 and high % cls.SLOT_MINUTES == 0
+                masks.append((day, ((1 << (last - first)) - 1) << first, exact))
+            day += timedelta(days=1)
+        return masks
+
+    @classmethod
+    def query_mask(cls, start: datetime, end: datetime):
+        """
+        Obtém a máscara de uma consulta, se o mapa a conseguir responder.
+
+        Só são aceites períodos de um único dia, dentro do horário e
+        alinhados com a grelha de 15 minutos.
+
+        Args:
+            start: Início do período
+            end: Fim do período
+
+        Returns:
+            tuple: (dia, máscara), ou None se for preciso usar os intervalos
+        """
+        if start >= end or start.date() != end.date():
+            return None
+        masks = cls._day_masks(start, end)
+        if len(masks) != 1:
+            return None
+        day, mask, exact = masks[0]
+        start_minute = start.hour * 60 + start.minute
+        end_minute = end.hour * 60 + end.minute
+        if (not exact or start_minute < cls.OPEN_MINUTE
+                or end_minute > cls.CLOSE_MINUTE):
+            return None
+        return day, mask
+
+    # ==================== MANUTENÇÃO ====================
+
+    def clear(self):
+        """Remove todas as linhas do mapa."""
+        self._rows = {}
+        self._owners = {}
+        self._inexact = set()
+
+    def add(self, item_id: int, start: datetime, end: datetime, reservation_id: int):
+        """
+        Marca os slots de uma reserva de um artigo.
+
+        Args:
+            item_id: ID do artigo
+            start: Início da reserva
+            end: Fim da reserva
+            reservation_id: ID da reserva
+        """
+        for day, mask, exact in self._day_masks(start, end):
+            key = (day, item_id)
+            self._owners.setdefault(key, {})[reservation_id] = mask
+            row = self._rows.setdefault(day, {})
+            row[item_id] = row.get(item_id, 0) | mask
+            if not exact:
+                self._inexact.add(key)
+
+    def remove(self, item_id: int, start: datetime, end: datetime, reservation_id: int):
+        """
+        Liberta os slots de uma reserva de um artigo.
+
+        A linha é recalculada a partir das restantes reservas do mesmo dia,
+        para não libertar slots ocupados por outra reserva sobreposta.
+
+        Args:
+            item_id: ID do artigo
+            start: Início da reserva
+            end: Fim da reserva
+            reservation_id: ID da reserva
+        """
+        for day, _, _ in self._day_masks(start, end):
+            key = (day, item_id)
+            owners = self._owners.get(key)
+            if owners is None:
+                continue
+            owners.pop(reservation_id, None)
+            row = self._rows[day]
+            if owners:
+                bits = 0
+                for mask in owners.values():
+                    bits |= mask
+                row[item_id] = bits
+            else:
+                del self._owners[key]
+                self._inexact.discard(key)
+                row.pop(item_id, None)
+                if not row:
+                    del self._rows[day]
+
+    # ==================== CONSULTAS ====================
+
+    def is_free(self, item_id: int, day, mask: int):
+        """
+        Verifica se os slots de uma máscara estão livres para um artigo.
+
+        Args:
+            item_id: ID do artigo
+            day: Dia da consulta (date)
+            mask: Máscara de slots (ver query_mask)
+
+        Returns:
+            bool: True/False, ou None se a linha for inexata
+        """
+        if (day, item_id) in self._inexact:
+            return None
+        return not self._rows.get(day, {}).get(item_id, 0) & mask
+
+
+class AvailabilityIndex:
+    """
+    Índice de intervalos reservados por artigo.
+
+    Para cada artigo guarda a lista de intervalos (início, fim, ID da reserva)
+    ordenada pelo início, e um vetor com o máximo acumulado dos fins. Assim,
+    saber se um intervalo [início, fim) está livre é uma pesquisa binária:
+    os intervalos que começam antes do fim pedido são um prefixo da lista,
+    e basta comparar o maior fim desse prefixo com o início pedido.
+
+    As consultas de um único dia alinhadas com o horário de reservas são
+    respondidas pelo mapa de bits (SlotBitmap), mantido em paralelo.
+
+    Só as reservas em estados ativos ocupam os artigos. O índice é mantido
+    pelo repositório de reservas (ver JsonRepository.attach).
+
+    Attributes:
+        ACTIVE_STATES (tuple): Estados de reserva que ocupam os artigos
+    """
+
+    # Reservas canceladas ou concluídas libertam os artigos
+    ACTIVE_STATES = ("Pending", "Confirmed")
+
+    def __init__(self):
+        """Inicializa um índice vazio."""
+        self._intervals = {}   # ID do artigo -> [(início, fim, ID da reserva)]
+        self._max_ends = {}    # ID do artigo -> máximo acumulado dos fins
+        self._slots = SlotBitmap()
+
+    # ==================== MANUTENÇÃO (REPOSITÓRIO) ====================
+
+    def reset(self, records):
+        """
+        Reconstrói o índice a partir de todos os registos de reservas.
+
+        Args:
+            records: Iterável de dicionários de reservas
+        """
+        self._intervals = {}
+        self._slots.clear()
+        for record in records:
+            for item_id, interval in self._record_intervals(record):
+                self._intervals.setdefault(item_id, []).append(interval)
+                self._slots.add(item_id, *interval)
+        self._max_ends = {}
+        for item_id, intervals in self._intervals.items():
+            intervals.sort()
+            self._rebuild_max_ends(item_id)
+
+    def update(self, old, new):
+        """
+        Aplica a alteração de uma reserva ao índice.
+
+        Cada intervalo é encontrado por pesquisa binária, e o máximo
+        acumulado dos fins só é recalculado a partir da posição alterada,
+        até deixar de mudar (ver _propagate).
+
+        Args:
+            old: Registo antes da alteração (ou None se é nova)
+            new: Registo depois da alteração (ou None se foi removida)
+        """
+        if old is not None:
+            for item_id, interval in self._record_intervals(old):
+                if self._remove(item_id, interval):
+                    self._slots.remove(item_id, *interval)
+        if new is not None:
+            for item_id, interval in self._record_intervals(new):
+                self._insert(item_id, interval)
+                self._slots.add(item_id, *interval)
+
+    def _insert(self, item_id: int, interval: tuple):
+        """
+        Insere um intervalo de um artigo, mantendo a ordem pelo início.
+
+        Args:
+            item_id: ID do artigo
+            interval: (início, fim, ID da reserva)
+        """
+        intervals = self._intervals.setdefault(item_id, [])
+        max_ends = self._max_ends.setdefault(item_id, [])
+        position = bisect_left(intervals, interval)
+        intervals.insert(position, interval)
+        previous = max_ends[position - 1] if position else None
+        end = interval[1]
+        current = end if previous is None or end > previous else previous
+        max_ends.insert(position, current)
+        self._propagate(item_id, position + 1, current)
+
+    def _remove(self, item_id: int, interval: tuple) -> bool:
+        """
+        Remove um intervalo de um artigo.
+
+        Args:
+            item_id: ID do artigo
+            interval: (início, fim, ID da reserva)
+
+        Returns:
+            bool: True se o intervalo existia
+        """
+        intervals = self._intervals.get(item_id)
+        if not intervals:
+            return False
+        position = bisect_left(intervals, interval)
+        if position == len(intervals) or intervals[position] != interval:
+            return False
+        max_ends = self._max_ends[item_id]
+        del intervals[position]
+        del max_ends[position]
+        if not intervals:
+            del self._intervals[item_id]
+            del self._max_ends[item_id]
+            return True
+        self._propagate(item_id, position, max_ends[position - 1] if position else None)
+        return True
+
+    def _propagate(self, item_id: int, position: int, current):
+        """
+        Atualiza o máximo acumulado dos fins a partir de uma posição.
+
+        O máximo numa posição só depende do máximo anterior e do fim do
+        intervalo: quando o valor recalculado é igual ao guardado, as
+        posições seguintes também não mudam e a atualização termina.
+
+        Args:
+            item_id: ID do artigo
+            position: Primeira posição a recalcular
+            current: Máximo acumulado na posição anterior (None se não houver)
+        """
+        intervals = self._intervals[item_id]
+        max_ends = self._max_ends[item_id]
+        for i in range(position, len(intervals)):
+            end = intervals[i][1]
+            value = end if current is None or end > current else current
+            if max_ends[i] == value:
+                return
+            max_ends[i] = value
+            current = value
+
+    def _record_intervals(self, record: dict):
+        """
+        Obtém os intervalos que uma reserva ocupa, um por artigo.
+
+        Args:
+            record: Dicionário da reserva
+
+        Returns:
+            list: Pares (ID do artigo, (início, fim, ID da reserva))
+        """
+        if record.get("state", "Pending") not in self.ACTIVE_STATES:
+            return []
+        start = datetime.fromisoformat(record["start_date"])
+        end = datetime.fromisoformat(record["end_date"])
+        interval = (start, end, record["id"])
+        return [(item_id, interval) for item_id in record.get("item_ids", [])]
+
+    def _rebuild_max_ends(self, item_id: int):
+        """
+        Recalcula o máximo acumulado dos fins de um artigo.
+
+        Args:
+            item_id: ID do artigo
+        """
+        intervals = self._intervals.get(item_id)
+        if not intervals:
+            self._intervals.pop(item_id, None)
+            self._max_ends.pop(item_id, None)
+            return
+        max_ends = []
+        current = None
+        for _, end, _ in intervals:
+            current = end if current is None or end > current else current
+            max_ends.append(current)
+        self._max_ends[item_id] = max_ends
+
+    # ==================== CONSULTAS ====================
+
+    def is_free(self, item_id: int, start: datetime, end: datetime,
+                ignore_reservation: int = None) -> bool:
+        """
+        Verifica se um artigo está livre no intervalo [start, end).
+
+        Args:
+            item_id: ID do artigo
+            start: Início do intervalo pretendido
+            end: Fim do intervalo pretendido
+            ignore_reservation: ID de uma reserva a ignorar (ex: a própria)
+
+        Returns:
+            bool: True se nenhuma reserva ativa se sobrepõe ao intervalo
+        """
+        if ignore_reservation is None:
+            query = SlotBitmap.query_mask(start, end)
+            if query is not None:
+                free = self._slots.is_free(item_id, *query)
+                if free is not None:
+                    return free
+        return self._is_free_interval(item_id, start, end, ignore_reservation)
+
+    def _is_free_interval(self, item_id: int, start: datetime, end: datetime,
+                          ignore_reservation: int = None) -> bool:
+        """
+        Verifica a disponibilidade pela lista de intervalos (pesquisa binária).
+
+        Args:
+            item_id: ID do artigo
+            start: Início do intervalo pretendido
+            end: Fim do intervalo pretendido
+            ignore_reservation: ID de uma reserva a ignorar (opcional)
+
+        Returns:
+            bool: True se nenhuma reserva ativa se sobrepõe ao intervalo
+        """
+        intervals = self._intervals.get(item_id)
+        if not intervals:
+            return True
+
+        # Intervalos que começam antes do fim pedido: prefixo [0, count)
+        count = bisect_left(intervals, (end,))
+        if count == 0 or self._max_ends[item_id][count - 1] <= start:
+            return True
+        if ignore_reservation is None:
+            return False
+
+        # Ignorar a própria reserva obriga a ver os intervalos sobrepostos
+        return all(res_id == ignore_reservation
+                   for _, other_end, res_id in intervals[:count]
+                   if other_end > start)
+
+    def free_items(self, item_ids, start: datetime, end: datetime) -> list:
+        """
+        Filtra os artigos que estão livres no intervalo [start, end).
+
+        Args:
+            item_ids: IDs dos artigos candidatos
+            start: Início do intervalo pretendido
+            end: Fim do intervalo pretendido
+
+        Returns:
+            list: IDs dos artigos livres, pela ordem recebida
+        """
+        return [item_id for item_id in item_ids if self.is_free(item_id, start, end)]
+
+    def all_free(self, item_ids, start: datetime, end: datetime) -> bool:
+        """
+        Verifica se todos os artigos estão livres no intervalo [start, end).
+
+        Args:
+            item_ids: IDs dos artigos
+            start: Início do intervalo pretendido
+            end: Fim do intervalo pretendido
+
+        Returns:
+            bool: True se nenhum artigo tem reservas ativas no intervalo
+        """
+        return all(self.is_free(item_id, start, end) for item_id in item_ids)
+
+    def reservations_of(self, item_ids, since: datetime = None) -> set:
+        """
+        Obtém as reservas ativas que incluem algum dos artigos.
+
+        Os intervalos de cada artigo estão ordenados pelo início, pelo que
+        as reservas que começam a partir de uma data são um sufixo da lista
+        (pesquisa binária), sem percorrer as anteriores.
+
+        Args:
+            item_ids: IDs dos artigos
+            since: Considerar só as reservas que começam nesta data ou
+                depois (opcional)
+
+        Returns:
+            set[int]: IDs das reservas ativas encontradas
+        """
+        reservation_ids = set()
+        for item_id in item_ids:
+            intervals = self._intervals.get(item_id, ())
+            first = bisect_left(intervals, (since,)) if since is not None else 0
+            reservation_ids.update(res_id for _, _, res_id in intervals[first:])
+        return reservation_ids
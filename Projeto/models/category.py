@@ -6,6 +6,62 @@ Implementa persistência em ficheiro JSON.
 import json
 import os
 
+from . import events
+from .repository import Repository
+
+
+class CategoryLookup:
+    """
+    Memória das categorias já resolvidas por ID.
+
+    Estrutura derivada do repositório de categorias (ver Repository.attach):
+    uma categoria é procurada uma única vez e as seguintes consultas não
+    verificam o ficheiro. A entrada é descartada quando a categoria é
+    gravada ou removida, e tudo é descartado quando as categorias são
+    recarregadas.
+    """
+
+    def __init__(self):
+        """Inicializa a memória vazia."""
+        self._by_id = {}
+
+    def reset(self, records):
+        """
+        Descarta todas as categorias memorizadas.
+
+        Args:
+            records: Registos atuais (não usados)
+        """
+        self._by_id = {}
+
+    def update(self, old, new):
+        """
+        Descarta a categoria alterada.
+
+        Args:
+            old: Registo antes da alteração (ou None)
+            new: Registo depois da alteração (ou None)
+        """
+        for record in (old, new):
+            if record is not None:
+                self._by_id.pop(record["id"], None)
+
+    def get(self, category_id: int):
+        """
+        Obtém uma categoria, procurando-a apenas na primeira vez.
+
+        Args:
+            category_id: ID da categoria
+
+        Returns:
+            Category: Objeto da categoria, ou None se não existir
+        """
+        try:
+            return self._by_id[category_id]
+        except KeyError:
+            category = self._by_id[category_id] = Category.find_by_id(category_id)
+            return category
+
 
 class Category:
     """
@@ -83,6 +139,16 @@ class Category:
             with open(Category.DATA_FILE, "w", encoding="utf-8") as f:
                 json.dump([], f)
     
+    @staticmethod
+    def _repository() -> Repository:
+        """
+        Obtém o repositório partilhado do ficheiro de categorias.
+        
+        Returns:
+            Repository: Cache em memória das categorias
+        """
+        return Repository.for_file(Category.DATA_FILE)
+    
     @staticmethod
     def _load_all() -> list:
         """
@@ -92,8 +158,7 @@ class Category:
             list: Lista de dicionários com os dados das categorias
         """
         Category._ensure_file()
-        with open(Category.DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return Category._repository().load()
     
     @staticmethod
     def _save_all(categories:  list):
@@ -104,8 +169,7 @@ class Category:
             categories: Lista de dicionários com os dados das categorias
         """
         Category._ensure_file()
-        with open(Category.DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(categories, f, indent=4, ensure_ascii=False)
+        Category._repository().save(categories)
     
     # ==================== OPERAÇÕES CRUD ====================
     
@@ -116,43 +180,47 @@ class Category:
         Se a categoria já existir (mesmo ID), atualiza os seus dados.
         Caso contrário, adiciona como nova categoria.
         """
-        categories = Category._load_all()
-        
-        # Procurar categoria existente para atualizar
-        for i, c in enumerate(categories):
-            if c["id"] == self._id:
-                categories[i] = self. to_dict()
-                Category._save_all(categories)
-                return
-        
-        # Se não existe, adicionar nova categoria
-        categories.append(self.to_dict())
-        Category._save_all(categories)
+        Category._repository().upsert(self.to_dict(), self)
+        events.publish(events.SAVED, self)
     
     def delete(self):
         """
         Remove esta categoria do ficheiro JSON. 
         
-        Filtra a lista de categorias removendo a que tem o mesmo ID.
+        Remove o registo com o mesmo ID do repositório.
         """
-        categories = Category._load_all()
-        categories = [c for c in categories if c["id"] != self._id]
-        Category._save_all(categories)
+        Category._repository().remove(self._id)
+        events.publish(events.DELETED, self)
     
     # ==================== MÉTODOS ESTÁTICOS ====================
     
+    @staticmethod
+    def warm_up() -> int:
+        """
+        Lê o ficheiro de categorias para a cache partilhada.
+        
+        Prepara também a memória de categorias (CategoryLookup). Usado
+        pelo pré-carregamento dos dados (ver models.warmup).
+        
+        Returns:
+            int: Número de categorias carregadas
+        """
+        Category._ensure_file()
+        repository = Category._repository()
+        with repository.lock:
+            repository.refresh()
+            repository.attach("lookup", CategoryLookup)
+            return len(repository.ids())
+    
     @staticmethod
     def get_next_id() -> int:
         """
-        Obtém o próximo ID disponível para uma nova categoria.
+        Reserva o próximo ID para uma nova categoria.
         
         Returns:
-            int:  Próximo ID (máximo atual + 1, ou 1 se não existirem categorias)
+            int:  Próximo ID da sequência (1 se não existirem categorias)
         """
-        categories = Category._load_all()
-        if not categories: 
-            return 1
-        return max(c["id"] for c in categories) + 1
+        return Category._repository().next_ids()[0]
     
     @staticmethod
     def get_all() -> list:
@@ -162,8 +230,7 @@ class Category:
         Returns:
             list[Category]: Lista de objetos Category
         """
-        categories_data = Category._load_all()
-        return [Category.from_dict(c) for c in categories_data]
+        return Category._repository().all(Category.from_dict)
     
     @staticmethod
     def find_by_id(category_id:  int):
@@ -176,11 +243,23 @@ class Category:
         Returns: 
             Category:  Objeto Category se encontrado, None caso contrário
         """
-        categories = Category._load_all()
-        for c in categories:
-            if c["id"] == category_id:
-                return Category.from_dict(c)
-        return None
+        return Category._repository().find(category_id, Category.from_dict)
+    
+    @staticmethod
+    def lookup(category_id: int):
+        """
+        Procura uma categoria pelo ID através da memória de categorias.
+        
+        Ao contrário de find_by_id, não verifica se o ficheiro mudou: usado
+        em listagens, onde cada linha resolve a categoria do artigo.
+        
+        Args:
+            category_id: ID da categoria a procurar
+            
+        Returns: 
+            Category:  Objeto Category se encontrado, None caso contrário
+        """
+        return Category._repository().attach("lookup", CategoryLookup).get(category_id)
     
     @staticmethod
     def from_dict(data: dict) -> 'Category':
@@ -0,0 +1,524 @@
+"""
+Formato binário em colunas para catálogos grandes (ex: artigos).
+
+Em vez de uma lista JSON com as chaves repetidas em cada registo, o
+ficheiro guarda cada campo numa coluna de largura fixa (inteiros e reais
+de 8 bytes, booleanos de 1 byte) e os textos numa tabela de strings sem
+repetições (as colunas de texto guardam o índice na tabela). O ficheiro é
+aberto com mmap e os valores só são descodificados quando são lidos: ao
+carregar o catálogo, os índices e a tabela de preços leem apenas as
+colunas numéricas, e os nomes e marcas só são descodificados para os
+artigos efetivamente criados (ver Repository.find).
+
+Estrutura do ficheiro (little-endian):
+
+    MAGIC (8 bytes) | tamanho do cabeçalho (uint32) | cabeçalho JSON
+    colunas e tabela de strings, cada secção alinhada a 8 bytes
+
+Conversão a partir da pasta do projeto:
+    python -m models.columnar to-binary data/sports_items.json [data/sports_items.bin]
+    python -m models.columnar to-json data/sports_items.bin [data/sports_items.json]
+
+Para a aplicação usar o formato binário: BOOKING_BINARY=sports_items. Depois
+da conversão, o ficheiro JSON (e o diário e a sequência) passam a
+<nome>.migrated; a aplicação recusa arrancar se BOOKING_BINARY não
+corresponder ao ficheiro que existe (ver storage.create_storage).
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+from .storage import JournalStorage, JsonFileStorage, atomic_write, retire
+
+MAGIC = b"BKCOL\x00\x01\x00"
+
+# Tipos de coluna: código do array/memoryview de cada tipo
+# "q": inteiro de 64 bits, "d": real de 64 bits, "?": booleano, "s": texto
+_CODES = {"q": "q", "d": "d", "?": "B", "s": "I"}
+
+# Valores que representam um campo em falta (None)
+NULL_INT = -2 ** 63
+NULL_BOOL = 255
+NULL_STRING = 2 ** 32 - 1
+_NULLS = {"q": NULL_INT, "?": NULL_BOOL, "s": NULL_STRING}
+
+# Colunas de cada entidade guardada em formato binário (nome do ficheiro)
+SCHEMAS = {
+    "sports_items": (
+        ("id", "q"),
+        ("name", "s"),
+        ("brand", "s"),
+        ("price_per_hour", "d"),
+        ("available", "?"),
+        ("category_id", "q"),
+        ("version", "q"),
+    ),
+}
+
+
+def _align(offset: int) -> int:
+    """Arredonda uma posição para o múltiplo de 8 seguinte."""
+    return (offset + 7) & ~7
+
+
+def _to_disk(values: array) -> bytes:
+    """Converte um array para bytes little-endian."""
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def map_file(path: str):
+    """
+    Abre um ficheiro só para leitura, mapeado em memória.
+
+    Em POSIX o ficheiro é mapeado (mmap) e o mapeamento continua válido
+    mesmo depois de o ficheiro ser substituído por uma nova versão. Em
+    Windows um ficheiro mapeado não pode ser substituído, por isso é lido
+    para memória.
+
+    Args:
+        path: Caminho do ficheiro (não vazio)
+
+    Returns:
+        mmap | bytes: Conteúdo do ficheiro
+    """
+    with open(path, "rb") as f:
+        if os.name == "nt":
+            return f.read()
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# ==================== ESCRITA ====================
+
+def _check(record, schema: tuple):
+    """
+    Verifica se os valores de um registo cabem nas colunas do esquema.
+
+    As colunas de reais não têm valor nulo: o campo tem de existir.
+
+    Args:
+        record: Dicionário do registo
+        schema: Colunas ((campo, tipo), ...)
+
+    Raises:
+        ValueError: Se um valor não puder ser guardado na sua coluna
+    """
+    for field, kind in schema:
+        value = record.get(field)
+        if kind == "d":
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        elif kind == "q":
+            valid = value is None or (isinstance(value, int) and not isinstance(value, bool))
+        elif kind == "s":
+            valid = value is None or isinstance(value, str)
+        else:
+            valid = True
+        if not valid:
+            raise ValueError(f"O registo #{record.get('id')} tem um valor inválido em "
+                             f"'{field}' para o formato binário: {value!r}")
+
+
+def encode(records, schema: tuple) -> bytes:
+    """
+    Codifica registos no formato binário em colunas.
+
+    Args:
+        records: Dicionários dos registos
+        schema: Colunas ((campo, tipo), ...), ver SCHEMAS
+
+    Returns:
+        bytes: Conteúdo do ficheiro
+
+    Raises:
+        ValueError: Se um registo tiver um campo que não existe no esquema,
+            ou um valor que não pode ser guardado na coluna (ex: preço em falta)
+    """
+    records = list(records)
+    fields = {field for field, _ in schema}
+    for record in records:
+        unknown = set(record) - fields
+        if unknown:
+            raise ValueError(f"Campos sem coluna no formato binário: {', '.join(sorted(unknown))}")
+        _check(record, schema)
+
+    strings = {}    # texto -> posição na tabela de strings
+    sections = []   # (nome da secção, bytes)
+    for field, kind in schema:
+        values = [record.get(field) for record in records]
+        if kind == "s":
+            column = array("I", (NULL_STRING if v is None else strings.setdefault(v, len(strings))
+                                 for v in values))
+        elif kind == "q":
+            column = array("q", (NULL_INT if v is None else int(v) for v in values))
+        elif kind == "d":
+            column = array("d", (float(v) for v in values))
+        elif kind == "?":
+            column = array("B", (NULL_BOOL if v is None else int(bool(v)) for v in values))
+        else:
+            raise ValueError(f"Tipo de coluna desconhecido: {kind}")
+        sections.append((field, _to_disk(column)))
+
+    encoded = [text.encode("utf-8") for text in strings]
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    sections.append(("string_offsets", _to_disk(offsets)))
+    sections.append(("string_data", b"".join(encoded)))
+
+    # As posições das secções são relativas ao fim do cabeçalho
+    positions = {}
+    position = 0
+    for name, data in sections:
+        positions[name] = position
+        position = _align(position + len(data))
+    header = json.dumps({
+        "rows": len(records),
+        "columns": [[field, kind, positions[field]] for field, kind in schema],
+        "strings": [len(encoded), positions["string_offsets"],
+                    positions["string_data"], len(sections[-1][1])],
+    }).encode("utf-8")
+
+    parts = [MAGIC, struct.pack("<I", len(header)), header]
+    start = _align(len(MAGIC) + 4 + len(header))
+    parts.append(b"\0" * (start - len(MAGIC) - 4 - len(header)))
+    for name, data in sections:
+        parts.append(data)
+        parts.append(b"\0" * (_align(len(data)) - len(data)))
+    return b"".join(parts)
+
+
+# ==================== LEITURA ====================
+
+class ColumnTable:
+    """
+    Vista sobre o conteúdo de um ficheiro binário em colunas.
+
+    As colunas são memoryviews sobre o ficheiro mapeado em memória (sem
+    cópia); cada valor só é convertido para Python quando é pedido.
+
+    Attributes:
+        rows (int): Número de registos
+        fields (tuple): Nomes dos campos, pela ordem do esquema
+    """
+
+    def __init__(self, buffer):
+        """
+        Interpreta o cabeçalho de um ficheiro.
+
+        Args:
+            buffer: Conteúdo do ficheiro (mmap ou bytes)
+
+        Raises:
+            ValueError: Se o conteúdo não estiver no formato binário
+        """
+        view = memoryview(buffer)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Ficheiro não está no formato binário em colunas")
+        (header_size,) = struct.unpack_from("<I", view, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(bytes(view[header_start:header_start + header_size]))
+        data = view[_align(header_start + header_size):]
+
+        self._buffer = buffer   # mantém o mapeamento aberto enquanto houver registos
+        self.rows = header["rows"]
+        self.fields = tuple(field for field, _, _ in header["columns"])
+        self._columns = {}      # campo -> (tipo, valores, valor nulo)
+        for field, kind, position in header["columns"]:
+            values = self._cast(data, position, self.rows, _CODES[kind])
+            self._columns[field] = (kind, values, _NULLS.get(kind))
+        count, offsets_position, data_position, data_size = header["strings"]
+        self._string_offsets = self._cast(data, offsets_position, count + 1, "I")
+        self._string_data = data[data_position:data_position + data_size]
+
+    @staticmethod
+    def _cast(data: memoryview, position: int, count: int, code: str):
+        """
+        Obtém uma secção como sequência de valores de um tipo.
+
+        Args:
+            data: Secções do ficheiro
+            position: Início da secção
+            count: Número de valores
+            code: Código do tipo (como no módulo array)
+
+        Returns:
+            memoryview | array: Valores da secção (sem cópia em little-endian)
+        """
+        size = array(code).itemsize * count
+        section = data[position:position + size]
+        if sys.byteorder == "little":
+            return section.cast(code)
+        values = array(code, bytes(section))
+        values.byteswap()
+        return values
+
+    @classmethod
+    def open(cls, path: str) -> 'ColumnTable':
+        """
+        Abre um ficheiro binário em colunas (ver map_file).
+
+        Args:
+            path: Caminho do ficheiro
+
+        Returns:
+            ColumnTable: Vista sobre o ficheiro
+        """
+        return cls(map_file(path))
+
+    def column(self, field: str):
+        """
+        Obtém os valores em bruto de uma coluna numérica, sem os converter.
+
+        A sequência aceita len(), índices e pesquisa binária (bisect).
+
+        Args:
+            field: Nome do campo
+
+        Returns:
+            memoryview | array: Valores da coluna (nulos pelo valor de NULL_*)
+        """
+        return self._columns[field][1]
+
+    def has(self, field: str, row: int) -> bool:
+        """
+        Verifica se um registo tem valor num campo (não nulo).
+
+        Args:
+            field: Nome do campo
+            row: Posição do registo
+
+        Returns:
+            bool: False se o campo não existir ou estiver em falta
+        """
+        column = self._columns.get(field)
+        return column is not None and column[1][row] != column[2]
+
+    def value(self, field: str, row: int):
+        """
+        Descodifica o valor de um campo de um registo.
+
+        Args:
+            field: Nome do campo
+            row: Posição do registo
+
+        Returns:
+            Valor do campo
+
+        Raises:
+            KeyError: Se o campo não existir ou estiver em falta no registo
+        """
+        # Chamado para cada campo lido: sem chamadas auxiliares
+        kind, values, null = self._columns[field]
+        value = values[row]
+        if value == null:
+            raise KeyError(field)
+        if kind == "s":
+            offsets = self._string_offsets
+            return str(self._string_data[offsets[value]:offsets[value + 1]], "utf-8")
+        if kind == "?":
+            return value == 1
+        return value
+
+    def records(self) -> list:
+        """
+        Obtém os registos como mapeamentos preguiçosos.
+
+        Returns:
+            list[ColumnarRecord]: Um registo por linha, pela ordem do ficheiro
+        """
+        return [ColumnarRecord(self, row) for row in range(self.rows)]
+
+
+class ColumnarRecord(Mapping):
+    """
+    Registo lido de um ficheiro binário em colunas.
+
+    Comporta-se como o dicionário do registo (record["name"], get, dict),
+    mas cada campo só é descodificado quando é lido. Campos em falta (None
+    no registo original) não aparecem no mapeamento.
+    """
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: ColumnTable, row: int):
+        """
+        Associa o registo a uma linha da tabela.
+
+        Args:
+            table: Tabela do ficheiro
+            row: Posição do registo
+        """
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, field: str):
+        """Descodifica um campo do registo (KeyError se estiver em falta)."""
+        return self._table.value(field, self._row)
+
+    def get(self, field: str, default=None):
+        """Obtém um campo, ou default se estiver em falta (sem passar por Mapping.get)."""
+        try:
+            return self._table.value(field, self._row)
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        """Percorre os nomes dos campos com valor."""
+        return (f for f in self._table.fields if self._table.has(f, self._row))
+
+    def __len__(self):
+        """Número de campos com valor."""
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        """Representação com os valores descodificados."""
+        return f"ColumnarRecord({dict(self)!r})"
+
+
+# ==================== ARMAZENAMENTO ====================
+
+class ColumnarStorage(JsonFileStorage):
+    """
+    Armazenamento de uma entidade no formato binário em colunas.
+
+    Tal como o JSON, cada gravação reescreve o ficheiro completo (escrita
+    atómica); a leitura é que deixa de interpretar todos os registos. O
+    bloqueio, a deteção de alterações e a sequência de IDs são os do
+    armazenamento JSON, aplicados ao ficheiro binário.
+
+    Attributes:
+        schema (tuple): Colunas da entidade (ver SCHEMAS)
+    """
+
+    def __init__(self, path: str, schema: tuple):
+        """
+        Inicializa o armazenamento de um ficheiro binário.
+
+        Args:
+            path: Caminho do ficheiro binário (ex: data/sports_items.bin)
+            schema: Colunas da entidade
+        """
+        super().__init__(path)
+        self.schema = schema
+
+    def read(self) -> list:
+        """
+        Abre o ficheiro, criando-o vazio se não existir.
+
+        Returns:
+            list[ColumnarRecord]: Registos descodificados à medida que são lidos
+        """
+        if not os.path.exists(self.path):
+            self.write_all([])
+        return ColumnTable.open(self.path).records()
+
+    def write_all(self, records: list):
+        """
+        Escreve todos os registos no ficheiro binário (escrita atómica).
+
+        Args:
+            records: Registos a gravar (dicionários ou ColumnarRecord)
+        """
+        atomic_write(self.path, encode(records, self.schema))
+
+
+# ==================== CONVERSÃO ====================
+
+def binary_of(json_path: str) -> str:
+    """
+    Obtém o caminho do ficheiro binário de uma entidade.
+
+    Args:
+        json_path: Ficheiro JSON da entidade (ex: data/sports_items.json)
+
+    Returns:
+        str: Caminho do ficheiro binário (ex: data/sports_items.bin)
+    """
+    return os.path.splitext(json_path)[0] + ".bin"
+
+
+def json_to_binary(json_path: str, binary_path: str = None) -> int:
+    """
+    Converte um ficheiro JSON de registos para o formato binário.
+
+    As entradas do diário (<ficheiro>.journal), se existir, são aplicadas
+    e a sequência de IDs (<ficheiro>.seq) é copiada. No fim, o ficheiro, o
+    diário e a sequência passam a <ficheiro>.migrated, para que a aplicação
+    sem BOOKING_BINARY não volte a ler o JSON antigo.
+
+    Args:
+        json_path: Ficheiro JSON (ex: data/sports_items.json)
+        binary_path: Ficheiro binário a criar (default: mesmo nome, .bin)
+
+    Returns:
+        int: Número de registos convertidos
+
+    Raises:
+        KeyError: Se a entidade não tiver esquema binário
+        ValueError: Se um registo não puder ser guardado no formato binário
+    """
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    binary_path = binary_path or binary_of(json_path)
+    source = JournalStorage(json_path)
+    target = ColumnarStorage(binary_path, SCHEMAS[name])
+    with source.lock(), target.lock():
+        records = source.read()
+        target.write_all(records)
+        sequence = source.read_sequence()
+        if sequence is not None:
+            target.write_sequence(sequence)
+        retire(json_path, source.journal_path, json_path + ".seq")
+    return len(records)
+
+
+def binary_to_json(binary_path: str, json_path: str = None) -> int:
+    """
+    Converte um ficheiro binário em colunas para JSON.
+
+    A sequência de IDs é copiada. No fim, o ficheiro binário e a sua
+    sequência passam a <ficheiro>.migrated.
+
+    Args:
+        binary_path: Ficheiro binário (ex: data/sports_items.bin)
+        json_path: Ficheiro JSON a criar (default: mesmo nome, .json)
+
+    Returns:
+        int: Número de registos convertidos
+    """
+    json_path = json_path or os.path.splitext(binary_path)[0] + ".json"
+    source = ColumnarStorage(binary_path, schema=())
+    target = JsonFileStorage(json_path)
+    with source.lock(), target.lock():
+        records = [dict(record) for record in source.read()]
+        target.write_all(records)
+        sequence = source.read_sequence()
+        if sequence is not None:
+            target.write_sequence(sequence)
+        retire(binary_path, binary_path + ".seq")
+    return len(records)
+
+
+def main(argv=None):
+    """
+    Converte ficheiros entre JSON e o formato binário (linha de comandos).
+
+    Args:
+        argv: Argumentos (default: sys.argv[1:])
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    conversions = {"to-binary": json_to_binary, "to-json": binary_to_json}
+    if len(argv) not in (2, 3) or argv[0] not in conversions:
+        print(__doc__)
+        sys.exit(1)
+    count = conversions[argv[0]](*argv[1:])
+    print(f"{count} registos convertidos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Módulo de configuração da camada de persistência.
+Os valores podem ser definidos por variáveis de ambiente, permitindo
+escolher o armazenamento sem alterar o código.
+"""
+
+import os
+
+
+# Tipo de armazenamento dos modelos: "json" (ficheiros em data/) ou "sqlite"
+STORAGE_BACKEND = os.environ.get("BOOKING_STORAGE", "json").lower()
+
+# Caminho da base de dados SQLite (usado apenas com STORAGE_BACKEND = "sqlite")
+SQLITE_PATH = os.environ.get("BOOKING_SQLITE_PATH", "data/booking.db")
+
+# Entidades gravadas com diário append-only (nomes dos ficheiros, sem extensão)
+JOURNAL_ENTITIES = tuple(
+    name.strip()
+    for name in os.environ.get("BOOKING_JOURNAL", "reservations").split(",")
+    if name.strip()
+)
+
+# Entidades guardadas no formato binário em colunas (ver models/columnar.py),
+# num ficheiro .bin em vez do .json (ex: "sports_items")
+BINARY_ENTITIES = tuple(
+    name.strip()
+    for name in os.environ.get("BOOKING_BINARY", "").split(",")
+    if name.strip()
+)
+
+# Mover as reservas concluídas e canceladas para o arquivo ao iniciar
+# (ver models/archive.py)
+ARCHIVE_CLOSED = os.environ.get("BOOKING_ARCHIVE", "1") != "0"
+
+# Entidades guardadas em partições mensais (ver models/partitions.py), numa
+# pasta com o nome da entidade (ex: "reservations" -> data/reservations/)
+PARTITIONED_ENTITIES = tuple(
+    name.strip()
+    for name in os.environ.get("BOOKING_PARTITIONED", "").split(",")
+    if name.strip()
+)
+
+# Número de entradas no diário a partir do qual é escrito um novo snapshot
+JOURNAL_COMPACT_EVERY = int(os.environ.get("BOOKING_JOURNAL_COMPACT_EVERY", "200"))
+
+# Sincronizar os ficheiros com o disco (fsync) antes de os substituir
+FSYNC = os.environ.get("BOOKING_FSYNC", "1") != "0"
+
+# Sincronizar também a pasta após substituir um ficheiro (apenas POSIX)
+FSYNC_DIRECTORY = os.environ.get("BOOKING_FSYNC_DIR", "0") == "1"
+
+# Algoritmo de hash das passwords: "scrypt" ou "pbkdf2" (PBKDF2-HMAC-SHA256)
+PASSWORD_SCHEME = os.environ.get("BOOKING_PASSWORD_SCHEME", "scrypt").lower()
+
+# Custo do scrypt (N, potência de 2): cada duplicação duplica tempo e memória
+SCRYPT_COST = int(os.environ.get("BOOKING_SCRYPT_COST", str(2 ** 14)))
+
+# Número de iterações do PBKDF2 (usado com PASSWORD_SCHEME = "pbkdf2")
+PBKDF2_ITERATIONS = int(os.environ.get("BOOKING_PBKDF2_ITERATIONS", "600000"))
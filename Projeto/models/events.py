@@ -0,0 +1,75 @@
+"""
+Módulo de notificação de alterações dos modelos.
+Permite que as views sejam avisadas quando um registo é gravado ou
+removido, para atualizarem apenas as linhas afetadas.
+"""
+
+from .unit_of_work import UnitOfWork
+
+# Eventos publicados pelos modelos
+SAVED = "saved"
+DELETED = "deleted"
+
+# Subscritores por modelo: classe -> lista de funções
+_subscribers = {}
+
+
+def subscribe(model, callback):
+    """
+    Regista uma função a chamar quando um objeto do modelo muda.
+
+    A função recebe o evento (SAVED ou DELETED) e o objeto alterado.
+    Os eventos são entregues a quem subscreveu a própria classe do objeto
+    ou uma classe base (ex: User recebe os eventos de Client).
+
+    Args:
+        model: Classe do modelo (ex: Reservation)
+        callback: Função callback(evento, objeto)
+    """
+    _subscribers.setdefault(model, []).append(callback)
+
+
+def unsubscribe(model, callback):
+    """
+    Remove uma função registada com subscribe (sem efeito se não existir).
+
+    Args:
+        model: Classe do modelo
+        callback: Função a remover
+    """
+    callbacks = _subscribers.get(model, [])
+    if callback in callbacks:
+        callbacks.remove(callback)
+
+
+def publish(event: str, obj):
+    """
+    Notifica os subscritores de uma alteração.
+
+    Dentro de uma transação a notificação só é entregue após o commit (e
+    é descartada no rollback). Várias alterações do mesmo objeto na mesma
+    transação resultam numa única notificação, com o último evento.
+
+    Args:
+        event: SAVED ou DELETED
+        obj: Objeto gravado ou removido
+    """
+    unit = UnitOfWork.current()
+    if unit is not None:
+        unit.defer(lambda: _dispatch(event, obj), key=(type(obj), obj.id))
+    else:
+        _dispatch(event, obj)
+
+
+def _dispatch(event: str, obj):
+    """
+    Entrega uma notificação aos subscritores da classe do objeto e das bases.
+
+    Args:
+        event: SAVED ou DELETED
+        obj: Objeto gravado ou removido
+    """
+    for cls in type(obj).__mro__:
+        # Cópia da lista: um subscritor pode cancelar a subscrição
+        for callback in list(_subscribers.get(cls, ())):
+            callback(event, obj)
@@ -0,0 +1,69 @@
+"""
+Migração dos ficheiros JSON para a base de dados SQLite.
+
+Utilização (a partir da pasta do projeto):
+    python -m models.migrate [caminho_da_base_de_dados]
+
+Depois da migração, basta definir BOOKING_STORAGE=sqlite para a aplicação
+passar a usar a base de dados.
+"""
+
+import sys
+
+from . import config
+from .category import Category
+from .repository import Repository
+from .reservation import Reservation
+from .sports_item import SportsItem
+from .storage import create_storage
+from .user import User
+
+# Modelos migrados (a ordem não é relevante: não há chaves estrangeiras)
+MODELS = (User, Category, SportsItem, Reservation)
+
+
+def migrate_json_to_sqlite(db_path: str = None) -> dict:
+    """
+    Copia todos os registos dos ficheiros JSON para a base de dados SQLite.
+
+    Os registos são lidos pelo armazenamento JSON configurado para cada
+    entidade (com diário, partições ou formato binário), e a sequência de
+    IDs é copiada: os IDs já atribuídos (ex: reservas arquivadas) não são
+    reutilizados. Cada tabela é substituída numa única transação, pelo que
+    a migração pode ser repetida sem duplicar registos. Os repositórios são
+    recriados no fim, já a usar a base de dados.
+
+    Args:
+        db_path: Caminho da base de dados (default: config.SQLITE_PATH)
+
+    Returns:
+        dict: Número de registos migrados por ficheiro
+    """
+    if db_path:
+        config.SQLITE_PATH = db_path
+
+    # Ler os ficheiros JSON antes de mudar o armazenamento
+    config.STORAGE_BACKEND = "json"
+    data = {}
+    for model in MODELS:
+        source = create_storage(model.DATA_FILE)
+        data[model] = ([dict(r) for r in source.read()], source.read_sequence())
+
+    config.STORAGE_BACKEND = "sqlite"
+    Repository.reset_instances()
+
+    counts = {}
+    for model, (records, sequence) in data.items():
+        repository = model._repository()
+        repository.save(records)
+        if sequence is not None:
+            with repository.storage.lock():
+                current = repository.storage.read_sequence()
+                repository.storage.write_sequence(max(sequence, current or 0))
+        counts[model.DATA_FILE] = len(records)
+    return counts
+
+
+if __name__ == "__main__":
+    for path, count in migrate_json_to_sqlite(*sys.argv[1:2]).items():
+        print(f"{path}: {count} registos migrados")
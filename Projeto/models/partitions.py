@@ -0,0 +1,462 @@
+"""
+Armazenamento de uma entidade em partições mensais (ex: reservas).
+
+Os registos são divididos pelo mês do início do período (ex: start_date)
+em ficheiros JSON separados, numa pasta com o nome da entidade:
+
+    data/reservations/2026-10.json      reservas que começam em outubro de 2026
+    data/reservations/2026-11.json
+    data/reservations/manifest.json     lista das partições
+
+Gravar um registo reescreve apenas a partição do seu mês (e a antiga, se
+o mês mudou), e não o histórico completo. O manifesto guarda, por
+partição, o fim mais tardio dos seus registos, para que uma consulta por
+período abra só as partições que o intersetam (ver read_range). Guarda
+também um contador de gerações, alterado a cada gravação, que serve para
+outros processos detetarem alterações (ver stamp).
+
+Conversão a partir da pasta do projeto:
+    python -m models.partitions split data/reservations.json [data/reservations]
+    python -m models.partitions merge data/reservations [data/reservations.json]
+
+Para a aplicação usar as partições: BOOKING_PARTITIONED=reservations. Na
+primeira leitura, se a pasta ainda não tiver manifesto, os registos do
+ficheiro JSON da entidade são divididos automaticamente. Depois da divisão,
+o ficheiro JSON (e o diário e a sequência) passam a <nome>.migrated, para
+não serem usados por engano; sem BOOKING_PARTITIONED, a aplicação recusa
+então arrancar até as partições serem juntadas (merge).
+
+A leitura só das partições de um período (read_range) serve consultas
+"a frio", antes de os registos estarem em memória (ex: relatórios ou
+scripts); a aplicação lê todas as partições no pré-carregamento e passa
+a consultar a cache (ver Repository.find_overlapping).
+"""
+
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+from .storage import JournalStorage, JsonFileStorage, atomic_write, retire
+
+# Campos (início, fim) do período dos registos de cada entidade
+FIELDS = {
+    "reservations": ("start_date", "end_date"),
+}
+
+# Nome do manifesto dentro da pasta das partições
+MANIFEST = "manifest.json"
+
+# Ficheiros de partição: <ano>-<mês>.json
+_PARTITION_FILE = re.compile(r"^(\d{4}-\d{2})\.json$")
+
+def _file_stamp(path: str):
+    """Obtém (mtime, tamanho) de um ficheiro, ou None se não existir."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def manifest_of(json_path: str) -> str:
+    """
+    Obtém o caminho do manifesto das partições de uma entidade.
+
+    Args:
+        json_path: Ficheiro JSON da entidade (ex: data/reservations.json)
+
+    Returns:
+        str: Caminho do manifesto (ex: data/reservations/manifest.json)
+    """
+    return os.path.join(os.path.splitext(json_path)[0], MANIFEST)
+
+
+def _month_start(key: str) -> datetime:
+    """Obtém o início do mês de uma partição (ex: "2026-10")."""
+    return datetime.strptime(key, "%Y-%m")
+
+
+class PartitionedStorage(JsonFileStorage):
+    """
+    Armazenamento de uma entidade em ficheiros JSON mensais.
+
+    Cada partição lida fica em memória com a assinatura do seu ficheiro:
+    após uma alteração externa, só as partições que mudaram são relidas.
+    O bloqueio e a sequência de IDs são os do armazenamento JSON, aplicados
+    à pasta (<pasta>.lock e <pasta>.seq).
+
+    Attributes:
+        path (str): Pasta das partições (ex: data/reservations)
+        field (str): Campo de início do período (define a partição)
+        end_field (str): Campo de fim do período
+        manifest_path (str): Caminho do manifesto
+    """
+
+    def __init__(self, path: str, field: str, end_field: str, lenient: bool = False):
+        """
+        Inicializa o armazenamento de uma pasta de partições.
+
+        Args:
+            path: Pasta das partições (ex: data/reservations)
+            field: Campo de início do período (ex: "start_date")
+            end_field: Campo de fim do período (ex: "end_date")
+            lenient: Tratar JSON inválido como partição vazia (default: False)
+        """
+        super().__init__(path, lenient)
+        self.field = field
+        self.end_field = end_field
+        self.manifest_path = os.path.join(path, MANIFEST)
+        self._partitions = {}   # mês -> (assinatura do ficheiro, {ID: registo})
+        self._where = {}        # ID -> mês da partição onde está gravado
+
+    # ==================== MANIFESTO ====================
+
+    def stamp(self):
+        """
+        Obtém a assinatura atual do manifesto (alterado a cada gravação).
+
+        Returns:
+            tuple: (mtime em nanossegundos, tamanho), ou None se não existir
+        """
+        return _file_stamp(self.manifest_path)
+
+    def _read_manifest(self) -> dict:
+        """
+        Lê o manifesto das partições.
+
+        Returns:
+            dict: {"generation": int, "partitions": {mês: {"last_end": str}}}
+        """
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"generation": 0, "partitions": {}}
+
+    def _write_manifest(self, manifest: dict):
+        """
+        Escreve o manifesto (escrita atómica).
+
+        Args:
+            manifest: Conteúdo do manifesto
+        """
+        manifest["field"] = self.field
+        content = json.dumps(manifest, indent=4, sort_keys=True)
+        atomic_write(self.manifest_path, content.encode("utf-8"))
+
+    def partition_of(self, record) -> str:
+        """
+        Obtém a partição de um registo (mês do início do período).
+
+        Args:
+            record: Dicionário do registo
+
+        Returns:
+            str: Mês no formato "AAAA-MM"
+        """
+        return str(record[self.field])[:7]
+
+    def _partition_path(self, key: str) -> str:
+        """Obtém o caminho do ficheiro de uma partição."""
+        return os.path.join(self.path, key + ".json")
+
+    def _keys(self, manifest: dict) -> list:
+        """
+        Obtém as partições existentes, por ordem cronológica.
+
+        Inclui os ficheiros de partição ainda não registados no manifesto
+        (gravação interrompida antes de o atualizar).
+
+        Args:
+            manifest: Manifesto atual
+
+        Returns:
+            list[str]: Meses das partições
+        """
+        keys = set(manifest["partitions"])
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            match = _PARTITION_FILE.match(name)
+            if match:
+                keys.add(match.group(1))
+        return sorted(keys)
+
+    # ==================== LEITURA ====================
+
+    def _load_partition(self, key: str) -> dict:
+        """
+        Obtém os registos de uma partição, relendo-a só se o ficheiro mudou.
+
+        Args:
+            key: Mês da partição
+
+        Returns:
+            dict: ID -> registo
+        """
+        path = self._partition_path(key)
+        stamp = _file_stamp(path)
+        cached = self._partitions.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        records = {}
+        if stamp is not None:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+            try:
+                records = {r["id"]: r for r in json.loads(content)} if content else {}
+            except json.JSONDecodeError:
+                if not self.lenient:
+                    raise
+        self._partitions[key] = (stamp, records)
+        return records
+
+    def read(self) -> list:
+        """
+        Lê os registos de todas as partições.
+
+        Na primeira utilização, divide o ficheiro JSON da entidade (se
+        existir) pelas partições.
+
+        Returns:
+            list: Lista de dicionários, por mês e pela ordem de cada partição
+        """
+        if not os.path.exists(self.manifest_path):
+            self._import_legacy()
+        keys = self._keys(self._read_manifest())
+        for key in set(self._partitions) - set(keys):
+            del self._partitions[key]
+        self._where = {}
+        result = []
+        for key in keys:
+            records = self._load_partition(key)
+            self._where.update(dict.fromkeys(records, key))
+            result.extend(records.values())
+        return result
+
+    def read_range(self, start: datetime, end: datetime) -> list:
+        """
+        Lê apenas as partições que podem ter registos no período [start, end[.
+
+        Uma partição é aberta se o seu mês começa antes de end e o fim mais
+        tardio dos seus registos (guardado no manifesto) é depois de start.
+        Os registos devolvidos devem ainda ser filtrados pelo período.
+
+        Args:
+            start: Início do período
+            end: Fim do período
+
+        Returns:
+            list: Registos das partições que intersetam o período
+        """
+        if not os.path.exists(self.manifest_path):
+            self._import_legacy()
+        manifest = self._read_manifest()
+        result = []
+        for key in self._keys(manifest):
+            if _month_start(key) >= end:
+                break
+            last_end = manifest["partitions"].get(key, {}).get("last_end")
+            if last_end is not None and datetime.fromisoformat(last_end) <= start:
+                continue
+            result.extend(self._load_partition(key).values())
+        return result
+
+    def _import_legacy(self):
+        """
+        Cria o manifesto na primeira utilização.
+
+        Divide o ficheiro JSON da entidade pelas partições e retira-o (ver
+        retire). Sem ficheiro JSON, o manifesto é reconstruído a partir
+        das partições existentes, sem as alterar.
+        """
+        # O diário, se existir, é aplicado ao ficheiro (ver JournalStorage)
+        legacy = JournalStorage(self.path + ".json", self.lenient)
+        with legacy.lock(), self.lock():
+            if os.path.exists(self.manifest_path):
+                return
+            if not os.path.exists(legacy.path):
+                self.write_all([record for key in self._keys({"partitions": {}})
+                                for record in self._load_partition(key).values()])
+                return
+            self.write_all(legacy.read())
+            sequence = legacy.read_sequence()
+            if self.read_sequence() is None and sequence is not None:
+                self.write_sequence(sequence)
+            retire(legacy.path, legacy.journal_path, legacy.path + ".seq")
+
+    # ==================== ESCRITA ====================
+
+    def _write_partition(self, key: str, records: dict):
+        """
+        Escreve uma partição (escrita atómica) e atualiza a sua cópia em memória.
+
+        Args:
+            key: Mês da partição
+            records: ID -> registo
+        """
+        path = self._partition_path(key)
+        content = json.dumps(list(records.values()), indent=4, ensure_ascii=False, default=str)
+        atomic_write(path, content.encode("utf-8"))
+        self._partitions[key] = (_file_stamp(path), records)
+
+    def write_all(self, records: list):
+        """
+        Reescreve todas as partições e o manifesto.
+
+        As partições que ficaram vazias são removidas.
+
+        Args:
+            records: Lista de dicionários a gravar
+        """
+        os.makedirs(self.path, exist_ok=True)
+        manifest = self._read_manifest()
+        partitions = {}
+        for record in records:
+            partitions.setdefault(self.partition_of(record), {})[record["id"]] = record
+        for key in self._keys(manifest):
+            if key not in partitions:
+                try:
+                    os.remove(self._partition_path(key))
+                except FileNotFoundError:
+                    pass
+        self._partitions = {}
+        self._where = {}
+        bounds = {}
+        for key, partition in sorted(partitions.items()):
+            self._write_partition(key, partition)
+            self._where.update(dict.fromkeys(partition, key))
+            bounds[key] = {"last_end": max(str(r[self.end_field]) for r in partition.values())}
+        self._write_manifest({"generation": manifest["generation"] + 1, "partitions": bounds})
+
+    def write_changes(self, changes: list, records):
+        """
+        Grava um lote de alterações, reescrevendo só as partições afetadas.
+
+        Se um registo passa a terminar depois do fim guardado da sua
+        partição, o manifesto é alargado antes de escrever a partição, para
+        que uma consulta por período nunca a ignore. O manifesto é sempre
+        reescrito no fim (nova geração), depois das partições, para que os
+        outros processos só releiam dados já gravados.
+
+        Args:
+            changes: Lista de alterações a gravar
+            records: Todos os registos atuais (usados se o lote substituir tudo)
+        """
+        if any(op == "all" for op, _ in changes):
+            self.write_all(list(records))
+            return
+
+        manifest = self._read_manifest()
+        bounds = manifest["partitions"]
+        touched = set()
+        widened = False
+        for op, data in changes:
+            record_id = data["id"] if op == "put" else data
+            old_key = self._where.pop(record_id, None)
+            if old_key is not None:
+                self._load_partition(old_key).pop(record_id, None)
+                touched.add(old_key)
+            if op == "put":
+                key = self.partition_of(data)
+                self._load_partition(key)[record_id] = data
+                self._where[record_id] = key
+                touched.add(key)
+                end = str(data[self.end_field])
+                last_end = bounds.get(key, {}).get("last_end")
+                if last_end is None or end > last_end:
+                    bounds[key] = {"last_end": end}
+                    widened = True
+
+        if widened:
+            self._write_manifest(manifest)
+        for key in sorted(touched):
+            self._write_partition(key, self._partitions[key][1])
+        manifest["generation"] += 1
+        self._write_manifest(manifest)
+
+
+# ==================== CONVERSÃO ====================
+
+def split(json_path: str, directory: str = None) -> int:
+    """
+    Divide um ficheiro JSON de registos em partições mensais.
+
+    As entradas do diário (<ficheiro>.journal), se existir, são aplicadas
+    ao ficheiro; a sequência de IDs (<ficheiro>.seq) é copiada. No fim, o
+    ficheiro, o diário e a sequência passam a <ficheiro>.migrated.
+
+    Args:
+        json_path: Ficheiro JSON (ex: data/reservations.json)
+        directory: Pasta das partições (default: mesmo nome, sem extensão)
+
+    Returns:
+        int: Número de registos convertidos
+
+    Raises:
+        KeyError: Se a entidade não tiver campos de período (ver FIELDS)
+    """
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    directory = directory or os.path.splitext(json_path)[0]
+    source = JournalStorage(json_path)
+    target = PartitionedStorage(directory, *FIELDS[name])
+    with source.lock(), target.lock():
+        records = source.read()
+        target.write_all(records)
+        sequence = source.read_sequence()
+        if sequence is not None:
+            target.write_sequence(sequence)
+        retire(json_path, source.journal_path, json_path + ".seq")
+    return len(records)
+
+
+def merge(directory: str, json_path: str = None) -> int:
+    """
+    Junta as partições mensais num único ficheiro JSON.
+
+    No fim, o manifesto passa a manifest.json.migrated: se as partições
+    voltarem a ser usadas, o ficheiro JSON é de novo dividido.
+
+    Args:
+        directory: Pasta das partições (ex: data/reservations)
+        json_path: Ficheiro JSON a criar (default: mesmo nome, .json)
+
+    Returns:
+        int: Número de registos convertidos
+    """
+    name = os.path.basename(os.path.normpath(directory))
+    json_path = json_path or os.path.normpath(directory) + ".json"
+    source = PartitionedStorage(directory, *FIELDS[name])
+    target = JsonFileStorage(json_path)
+    with source.lock(), target.lock():
+        records = sorted(source.read(), key=lambda r: r["id"])
+        target.write_all(records)
+        sequence = source.read_sequence()
+        if sequence is not None:
+            target.write_sequence(sequence)
+        retire(source.manifest_path)
+    return len(records)
+
+
+def main(argv=None):
+    """
+    Converte uma entidade entre um ficheiro JSON e partições (linha de comandos).
+
+    Args:
+        argv: Argumentos (default: sys.argv[1:])
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    conversions = {"split": split, "merge": merge}
+    if len(argv) not in (2, 3) or argv[0] not in conversions:
+        print(__doc__)
+        sys.exit(1)
+    count = conversions[argv[0]](*argv[1:])
+    print(f"{count} registos convertidos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Módulo de hash e verificação de passwords.
+
+As passwords são guardadas com sal aleatório e uma função de derivação
+lenta (hashlib.scrypt ou hashlib.pbkdf2_hmac), no formato:
+
+    scrypt$<N>$<r>$<p>$<sal>$<hash>
+    pbkdf2_sha256$<iterações>$<sal>$<hash>
+
+(sal e hash em base64). O algoritmo e o custo são definidos em config.py;
+uma password guardada com outro algoritmo ou custo, ou ainda em texto
+simples (dados antigos), é verificada na mesma e deve ser convertida no
+próximo login (ver needs_rehash).
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict
+
+from . import config
+
+# Parâmetros fixos do scrypt (o custo é N, ver config.SCRYPT_COST)
+SCRYPT_BLOCK_SIZE = 8
+SCRYPT_PARALLELISM = 1
+
+# Tamanhos do sal e do hash, em bytes
+SALT_SIZE = 16
+HASH_SIZE = 32
+
+# Número de verificações bem-sucedidas memorizadas
+CACHE_SIZE = 256
+
+# Chave aleatória do processo: a memória guarda apenas HMACs das passwords
+_cache_key = os.urandom(32)
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _b64encode(data: bytes) -> str:
+    """Codifica bytes em base64 (texto ASCII)."""
+    return base64.b64encode(data).decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    """Descodifica texto em base64."""
+    return base64.b64decode(text.encode("ascii"))
+
+
+def current_scheme() -> str:
+    """
+    Obtém o algoritmo usado para novas passwords.
+
+    Returns:
+        str: "scrypt", ou "pbkdf2" se configurado ou se o Python não tiver
+            scrypt (OpenSSL sem suporte)
+    """
+    if config.PASSWORD_SCHEME == "scrypt" and hasattr(hashlib, "scrypt"):
+        return "scrypt"
+    return "pbkdf2"
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    """Calcula o hash scrypt de uma password."""
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * n * r * p, dklen=HASH_SIZE)
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    """Calcula o hash PBKDF2-HMAC-SHA256 de uma password."""
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt,
+                               iterations, dklen=HASH_SIZE)
+
+
+def hash_password(password: str, scheme: str = None, cost: int = None) -> str:
+    """
+    Calcula o hash de uma password com um sal aleatório.
+
+    Args:
+        password: Password em texto simples
+        scheme: "scrypt" ou "pbkdf2" (default: o configurado)
+        cost: N do scrypt ou iterações do PBKDF2 (default: o configurado)
+
+    Returns:
+        str: Password codificada para guardar (ver formato no módulo)
+
+    Raises:
+        ValueError: Se o algoritmo não existir
+    """
+    scheme = scheme or current_scheme()
+    salt = os.urandom(SALT_SIZE)
+    if scheme == "scrypt":
+        n = cost or config.SCRYPT_COST
+        digest = _scrypt(password, salt, n, SCRYPT_BLOCK_SIZE, SCRYPT_PARALLELISM)
+        return (f"scrypt${n}${SCRYPT_BLOCK_SIZE}${SCRYPT_PARALLELISM}$"
+                f"{_b64encode(salt)}${_b64encode(digest)}")
+    if scheme == "pbkdf2":
+        iterations = cost or config.PBKDF2_ITERATIONS
+        digest = _pbkdf2(password, salt, iterations)
+        return f"pbkdf2_sha256${iterations}${_b64encode(salt)}${_b64encode(digest)}"
+    raise ValueError(f"Algoritmo de password desconhecido: {scheme}")
+
+
+def is_hashed(stored: str) -> bool:
+    """
+    Verifica se uma password guardada já está no formato com hash.
+
+    Args:
+        stored: Valor guardado no registo do utilizador
+
+    Returns:
+        bool: False se for uma password antiga em texto simples
+    """
+    return stored.startswith(("scrypt$", "pbkdf2_sha256$"))
+
+
+def _compute(password: str, stored: str) -> tuple:
+    """
+    Recalcula o hash de uma password com os parâmetros de um valor guardado.
+
+    Args:
+        password: Password introduzida
+        stored: Valor guardado (com hash)
+
+    Returns:
+        tuple: (hash calculado, hash guardado)
+    """
+    fields = stored.split("$")
+    if fields[0] == "scrypt":
+        n, r, p = (int(value) for value in fields[1:4])
+        salt, expected = _b64decode(fields[4]), _b64decode(fields[5])
+        return _scrypt(password, salt, n, r, p), expected
+    iterations = int(fields[1])
+    salt, expected = _b64decode(fields[2]), _b64decode(fields[3])
+    return _pbkdf2(password, salt, iterations), expected
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """
+    Verifica uma password introduzida contra o valor guardado.
+
+    A comparação é feita em tempo constante. As verificações bem-sucedidas
+    são memorizadas (por HMAC da password e do valor guardado), pelo que
+    um novo login com a mesma password não repete o cálculo lento.
+
+    Args:
+        password: Password introduzida
+        stored: Valor guardado (com hash, ou texto simples em dados antigos)
+
+    Returns:
+        bool: True se a password estiver correta
+    """
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+
+    key = hmac.new(_cache_key, f"{stored}\0{password}".encode("utf-8"),
+                   hashlib.sha256).digest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return True
+
+    digest, expected = _compute(password, stored)
+    if not hmac.compare_digest(digest, expected):
+        return False
+
+    with _cache_lock:
+        _cache[key] = True
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return True
+
+
+def needs_rehash(stored: str) -> bool:
+    """
+    Verifica se uma password guardada deve ser convertida no próximo login.
+
+    Args:
+        stored: Valor guardado no registo do utilizador
+
+    Returns:
+        bool: True se estiver em texto simples, ou com um algoritmo ou
+            custo diferentes dos configurados
+    """
+    if not is_hashed(stored):
+        return True
+    fields = stored.split("$")
+    if current_scheme() == "scrypt":
+        return fields[0] != "scrypt" or int(fields[1]) != config.SCRYPT_COST
+    return fields[0] != "pbkdf2_sha256" or int(fields[1]) != config.PBKDF2_ITERATIONS
+
@@ -0,0 +1,185 @@
+"""
+Módulo do motor de preços dos artigos.
+Mantém os preços por hora de todos os artigos num vetor compacto de
+floats e calcula os totais de muitas reservas ou cestos de uma só vez.
+"""
+
+from array import array
+from datetime import datetime
+
+# Módulo NumPy, importado só no primeiro cálculo (None se não existir)
+_numpy = False
+
+
+def _load_numpy():
+    """
+    Importa o NumPy na primeira utilização.
+
+    O NumPy demora mais a importar do que o resto dos modelos, pelo que só
+    é carregado quando um total é calculado (e não no arranque).
+
+    Returns:
+        module: Módulo numpy, ou None se não estiver instalado
+    """
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:  # Sem NumPy: cálculo em Python sobre o mesmo vetor
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def hours_between(start, end) -> float:
+    """
+    Calcula a duração de um período em horas.
+
+    Args:
+        start: Data e hora de início
+        end: Data e hora de fim
+
+    Returns:
+        float: Duração em horas
+    """
+    return (end - start).total_seconds() / 3600
+
+
+class PriceTable:
+    """
+    Tabela de preços por hora dos artigos, indexada pela posição do artigo.
+
+    Estrutura derivada do repositório de artigos (ver Repository.attach):
+    os preços ficam num array('d') contíguo e cada ID de artigo tem uma
+    posição fixa nesse vetor. Uma alteração de preço altera apenas a sua
+    posição; um artigo removido deixa de ter posição (o espaço é
+    recuperado na próxima reconstrução).
+
+    Com NumPy, os totais de vários cestos são calculados com operações
+    vetoriais sobre o próprio vetor (sem cópia); sem NumPy, com um ciclo
+    simples sobre o mesmo vetor.
+    """
+
+    def __init__(self):
+        """Inicializa a tabela vazia."""
+        self._index = {}            # ID do artigo -> posição no vetor
+        self._prices = array("d")   # preço por hora de cada posição
+
+    # ==================== SINCRONIZAÇÃO COM O REPOSITÓRIO ====================
+
+    def reset(self, records):
+        """
+        Reconstrói a tabela a partir de todos os artigos.
+
+        Args:
+            records: Dicionários dos artigos
+        """
+        index = {}
+        prices = array("d")
+        for record in records:
+            index[record["id"]] = len(prices)
+            prices.append(float(record["price_per_hour"]))
+        self._index, self._prices = index, prices
+
+    def update(self, old, new):
+        """
+        Atualiza o preço de um artigo criado, alterado ou removido.
+
+        Args:
+            old: Registo antes da alteração (ou None)
+            new: Registo depois da alteração (ou None)
+        """
+        if new is None:
+            self._index.pop(old["id"], None)
+            return
+        position = self._index.get(new["id"])
+        if position is None:
+            self._index[new["id"]] = len(self._prices)
+            self._prices.append(float(new["price_per_hour"]))
+        else:
+            self._prices[position] = float(new["price_per_hour"])
+
+    # ==================== CONSULTAS ====================
+
+    def price(self, item_id: int) -> float:
+        """
+        Obtém o preço por hora de um artigo.
+
+        Args:
+            item_id: ID do artigo
+
+        Returns:
+            float: Preço por hora (0 se o artigo não existir)
+        """
+        position = self._index.get(item_id)
+        return self._prices[position] if position is not None else 0.0
+
+    def total(self, item_ids, hours: float) -> float:
+        """
+        Calcula o total de um cesto de artigos durante um período.
+
+        Args:
+            item_ids: IDs dos artigos
+            hours: Duração em horas
+
+        Returns:
+            float: Soma dos preços por hora multiplicada pela duração
+        """
+        return self.totals([item_ids], [hours])[0]
+
+    def totals(self, baskets, hours) -> list:
+        """
+        Calcula os totais de vários cestos de uma só vez.
+
+        Os artigos de todos os cestos são convertidos em posições do vetor
+        de preços; as somas por cesto são feitas numa única operação
+        (numpy.bincount) e multiplicadas pelas durações. Artigos
+        inexistentes valem 0.
+
+        Args:
+            baskets: Lista de cestos (cada um uma lista de IDs de artigos)
+            hours: Duração em horas de cada cesto (mesmo comprimento)
+
+        Returns:
+            list[float]: Total de cada cesto
+        """
+        positions = []
+        owners = []
+        index = self._index
+        for basket_number, basket in enumerate(baskets):
+            for item_id in basket:
+                position = index.get(item_id)
+                if position is not None:
+                    positions.append(position)
+                    owners.append(basket_number)
+
+        np = _load_numpy() if positions else None
+        if np is not None:
+            prices = np.frombuffer(self._prices, dtype=np.float64)
+            sums = np.bincount(np.asarray(owners, dtype=np.intp),
+                               weights=prices[np.asarray(positions, dtype=np.intp)],
+                               minlength=len(baskets))
+            return (sums * np.asarray(hours, dtype=np.float64)).tolist()
+
+        sums = [0.0] * len(baskets)
+        prices = self._prices
+        for basket_number, position in zip(owners, positions):
+            sums[basket_number] += prices[position]
+        return [amount * duration for amount, duration in zip(sums, hours)]
+
+    def reservation_totals(self, records) -> dict:
+        """
+        Calcula os totais de várias reservas (dicionários) de uma só vez.
+
+        Args:
+            records: Dicionários das reservas (formato de Reservation.to_dict)
+
+        Returns:
+            dict: ID da reserva -> total calculado com os preços atuais
+        """
+        records = list(records)
+        hours = [hours_between(datetime.fromisoformat(r["start_date"]),
+                               datetime.fromisoformat(r["end_date"]))
+                 for r in records]
+        totals = self.totals([r.get("item_ids", ()) for r in records], hours)
+        return {r["id"]: total for r, total in zip(records, totals)}
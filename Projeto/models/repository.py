@@ -0,0 +1,757 @@
+"""
+Módulo de cache partilhada dos dados dos modelos.
+Mantém em memória os registos já lidos de cada entidade, indexados
+pela chave primária e por campos secundários, e um mapa de identidade com
+os objetos já criados.
+"""
+
+import functools
+import threading
+from datetime import datetime
+
+from .storage import create_storage
+from .unit_of_work import UnitOfWork
+
+
+def _synchronized(method):
+    """
+    Executa um método do repositório com o seu bloqueio (self.lock).
+
+    Args:
+        method: Método a proteger
+
+    Returns:
+        function: Método que obtém o bloqueio antes de executar
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ConflictError(Exception):
+    """
+    Exceção lançada quando um registo foi alterado por outro processo.
+
+    A gravação não é feita. A operação pode ser repetida depois de voltar
+    a ler o registo (ex: find_by_id) e reaplicar a alteração.
+
+    Attributes:
+        record_id: ID do registo em conflito
+    """
+
+    def __init__(self, record_id):
+        """
+        Inicializa o erro de conflito.
+
+        Args:
+            record_id: ID do registo em conflito
+        """
+        super().__init__(f"O registo #{record_id} foi alterado noutro posto. "
+                         f"Atualize os dados e tente novamente.")
+        self.record_id = record_id
+
+
+class Repository:
+    """
+    Cache em memória dos registos de uma entidade.
+
+    Os registos são lidos do armazenamento (ficheiro JSON ou SQLite, ver
+    storage.py) uma única vez e ficam guardados num dicionário indexado
+    pelo ID (acesso O(1)). A cache só é recarregada quando o armazenamento
+    é alterado por outro processo, e é atualizada diretamente quando o
+    próprio modelo grava os dados.
+
+    Mantém também um mapa de identidade: o mesmo ID devolve sempre o mesmo
+    objeto durante a sessão, enquanto os dados não forem alterados por fora.
+
+    Os índices secundários (valor de um campo -> IDs) são atualizados a cada
+    gravação ou remoção, permitindo filtrar sem percorrer todos os registos.
+
+    Estruturas derivadas mais complexas (ex: o motor de disponibilidade)
+    podem ser associadas ao repositório com attach(); recebem reset() quando
+    os registos são recarregados e update() a cada alteração individual.
+
+    Dentro de uma transação (ver unit_of_work.py), as alterações ficam
+    pendentes em memória e são escritas de uma só vez no commit.
+
+    Cada registo tem um contador "version", incrementado a cada gravação.
+    As escritas são feitas sob o bloqueio do armazenamento: se outro
+    processo gravou entretanto um dos registos alterados (versão diferente
+    da lida), é lançado ConflictError; as restantes alterações externas são
+    juntadas à cache antes de escrever, para não serem perdidas. As leituras
+    não pedem o bloqueio.
+
+    Os IDs novos são atribuídos por uma sequência persistente (next_ids),
+    sem percorrer os registos.
+
+    Existe uma única instância por entidade (identificada pelo DATA_FILE do
+    modelo), partilhada por todos os modelos.
+
+    Os métodos públicos são protegidos por um bloqueio reentrante, pelo que
+    o repositório pode ser consultado a partir de threads de fundo (ver
+    Views/background.py). Operações compostas sobre estruturas derivadas
+    devem obter o mesmo bloqueio (with repository.lock). Uma transação
+    mantém o bloqueio dos repositórios que alterou até ao fim (ver _begin).
+
+    Quando uma thread precisa de vários repositórios ao mesmo tempo, os
+    bloqueios são obtidos sempre pela mesma ordem, para não haver bloqueio
+    mútuo entre threads: reservas antes de artigos (ex: ao adicionar um
+    artigo, a reserva orçamenta-o com SportsItem.quote; ao mudar um preço,
+    SportsItem.save obtém primeiro o bloqueio das reservas).
+
+    Attributes:
+        path (str): Caminho do ficheiro JSON da entidade
+        storage: Armazenamento persistente (JsonFileStorage ou SqliteStorage)
+        lock: Bloqueio reentrante do repositório (threading.RLock)
+    """
+
+    # Instâncias partilhadas, uma por caminho de ficheiro
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str, storage):
+        """
+        Inicializa o repositório de uma entidade.
+
+        Args:
+            path: Caminho do ficheiro JSON da entidade
+            storage: Armazenamento persistente dos registos
+        """
+        self.path = path
+        self.storage = storage
+        self.lock = threading.RLock()
+        self._by_id = None      # ID -> dicionário do registo (ordem de armazenamento)
+        self._identity = {}     # ID -> objeto do modelo já criado
+        self._indexes = {}      # campo -> {valor -> {ID: None}}
+        self._derived = {}      # nome -> estrutura derivada (reset/update)
+        self._pending = None    # alterações por escrever (só em transação)
+        self._expected = {}     # ID -> versão lida, dos registos por escrever
+        self._stamp = None
+
+    @classmethod
+    def reset_instances(cls):
+        """Esquece todos os repositórios (ex: após mudar de armazenamento)."""
+        cls._instances = {}
+
+    @classmethod
+    def for_file(cls, path: str, lenient: bool = False,
+                 indexes: tuple = ()) -> 'Repository':
+        """
+        Obtém o repositório partilhado de uma entidade.
+
+        O armazenamento é escolhido pela configuração (ver config.py).
+
+        Args:
+            path: Caminho do ficheiro JSON da entidade
+            lenient: Tratar JSON inválido como ficheiro vazio (default: False)
+            indexes: Campos com índice secundário (opcional)
+
+        Returns:
+            Repository: Instância única associada à entidade
+        """
+        with cls._instances_lock:
+            repository = cls._instances.get(path)
+            if repository is None:
+                repository = cls._instances[path] = cls(path, create_storage(path, lenient))
+        with repository.lock:
+            for field in indexes:
+                if field not in repository._indexes:
+                    repository._add_index(field)
+        return repository
+
+    # ==================== ÍNDICES SECUNDÁRIOS ====================
+
+    def _add_index(self, field: str):
+        """
+        Cria um índice secundário sobre um campo dos registos.
+
+        Args:
+            field: Nome do campo a indexar
+        """
+        self.storage.add_index(field)
+        index = self._indexes[field] = {}
+        if self._by_id is not None:
+            for record_id, record in self._by_id.items():
+                index.setdefault(record.get(field), {})[record_id] = None
+
+    def _rebuild_indexes(self):
+        """Reconstrói todos os índices secundários a partir dos registos."""
+        for field in self._indexes:
+            self._add_index(field)
+
+    def _index_record(self, record: dict):
+        """
+        Adiciona um registo aos índices secundários.
+
+        Args:
+            record: Dicionário do registo
+        """
+        for field, index in self._indexes.items():
+            index.setdefault(record.get(field), {})[record["id"]] = None
+
+    def _unindex_record(self, record: dict):
+        """
+        Retira um registo dos índices secundários.
+
+        Args:
+            record: Dicionário do registo
+        """
+        for field, index in self._indexes.items():
+            value = record.get(field)
+            bucket = index.get(value)
+            if bucket is not None:
+                bucket.pop(record["id"], None)
+                if not bucket:
+                    del index[value]
+
+    # ==================== ESTRUTURAS DERIVADAS ====================
+
+    @_synchronized
+    def attach(self, name: str, factory):
+        """
+        Obtém uma estrutura derivada dos registos, criando-a se necessário.
+
+        A estrutura deve implementar reset(records) e update(old, new), onde
+        old/new são os dicionários antes e depois da alteração (None quando
+        o registo é criado ou removido).
+
+        Args:
+            name: Nome único da estrutura neste repositório
+            factory: Função sem argumentos que cria a estrutura
+
+        Returns:
+            object: Estrutura derivada, já sincronizada com os registos
+        """
+        derived = self._derived.get(name)
+        if derived is None:
+            records = self._records()
+            derived = self._derived[name] = factory()
+            derived.reset(records.values())
+        return derived
+
+    def _notify_reset(self):
+        """Reconstrói todas as estruturas derivadas a partir dos registos."""
+        for derived in self._derived.values():
+            derived.reset(self._by_id.values())
+
+    def _notify_update(self, old, new):
+        """
+        Propaga uma alteração individual às estruturas derivadas.
+
+        Args:
+            old: Registo antes da alteração (ou None)
+            new: Registo depois da alteração (ou None)
+        """
+        for derived in self._derived.values():
+            derived.update(old, new)
+
+    # ==================== DETEÇÃO DE ALTERAÇÕES ====================
+
+    def _records(self) -> dict:
+        """
+        Obtém o índice de registos, recarregando-os se o armazenamento mudou.
+
+        Uma alteração externa descarta também o mapa de identidade, para que
+        os objetos seguintes reflitam os novos dados. Durante uma transação
+        a cache não é recarregada, para não perder as alterações pendentes.
+
+        Returns:
+            dict: Dicionário ID -> registo
+        """
+        if self._by_id is not None and self._pending is not None:
+            return self._by_id
+        stamp = self.storage.stamp()
+        if self._by_id is None or stamp != self._stamp:
+            self._by_id = {r["id"]: r for r in self.storage.read()}
+            self._identity = {}
+            self._rebuild_indexes()
+            # Assinatura anterior à leitura: se o armazenamento mudar durante
+            # a leitura, a próxima consulta volta a ler (nunca o contrário)
+            self._stamp = stamp
+            self._notify_reset()
+        return self._by_id
+
+    @_synchronized
+    def refresh(self):
+        """Recarrega os registos se o armazenamento tiver sido alterado."""
+        self._records()
+
+    @_synchronized
+    def invalidate(self):
+        """Descarta os registos e objetos em cache, forçando nova leitura."""
+        self._by_id = None
+        self._identity = {}
+        self._expected = {}
+        for field in self._indexes:
+            self._indexes[field] = {}
+        self._stamp = None
+
+    # ==================== VERSÕES E CONFLITOS ====================
+
+    @staticmethod
+    def _version(record) -> int:
+        """
+        Obtém a versão de um registo (0 se não existir ou for antigo).
+
+        Args:
+            record: Dicionário do registo, ou None
+
+        Returns:
+            int: Número da versão
+        """
+        return record.get("version", 0) if record is not None else 0
+
+    def _flush(self, changes: list):
+        """
+        Escreve alterações sob o bloqueio do armazenamento.
+
+        Se o armazenamento foi alterado por outro processo desde a última
+        leitura, os registos são relidos: as versões dos registos alterados
+        são verificadas e as restantes alterações externas juntadas à cache.
+
+        Args:
+            changes: Lista de alterações a gravar
+
+        Raises:
+            ConflictError: Se um dos registos foi gravado por outro processo
+        """
+        with self.storage.lock():
+            self._prepare(changes)
+            self.storage.write_changes(changes, self._by_id.values())
+            self._stamp = self.storage.stamp()
+        self._expected = {}
+
+    def _prepare(self, changes: list):
+        """
+        Verifica as versões e junta as alterações externas (sob o bloqueio).
+
+        Args:
+            changes: Lista de alterações a gravar
+
+        Raises:
+            ConflictError: Se um dos registos foi gravado por outro processo
+        """
+        replaces_all = any(op == "all" for op, _ in changes)
+        if not replaces_all and self.storage.stamp() != self._stamp:
+            self._merge(self.storage.read(), changes)
+
+    @staticmethod
+    def _coalesce(changes: list) -> list:
+        """
+        Junta as alterações pendentes de cada registo na última.
+
+        Ex: criar uma reserva, adicionar três artigos e confirmá-la numa
+        transação grava o registo uma única vez.
+
+        Args:
+            changes: Alterações pela ordem em que foram feitas
+
+        Returns:
+            list: Uma alteração por registo (ou só ("all", None))
+        """
+        if any(op == "all" for op, _ in changes):
+            return [("all", None)]
+        latest = {}
+        for op, data in changes:
+            record_id = data["id"] if op == "put" else data
+            latest.pop(record_id, None)
+            latest[record_id] = (op, data)
+        return list(latest.values())
+
+    def _merge(self, stored: list, changes: list):
+        """
+        Aplica as alterações locais sobre os registos atuais do armazenamento.
+
+        Args:
+            stored: Registos lidos do armazenamento (sob o bloqueio)
+            changes: Alterações locais por escrever
+
+        Raises:
+            ConflictError: Se a versão de um registo alterado não é a lida
+        """
+        records = {r["id"]: r for r in stored}
+        for record_id, version in self._expected.items():
+            if self._version(records.get(record_id)) != version:
+                raise ConflictError(record_id)
+
+        for op, data in changes:
+            if op == "put":
+                records[data["id"]] = data
+            else:
+                records.pop(data, None)
+
+        # Manter só os objetos cujos registos não mudaram por fora
+        previous = self._by_id
+        self._identity = {
+            k: v for k, v in self._identity.items()
+            if k in records and (k in self._expected
+                                 or self._version(records[k]) == self._version(previous.get(k)))
+        }
+        self._by_id = records
+        self._rebuild_indexes()
+        self._notify_reset()
+
+    # ==================== TRANSAÇÕES ====================
+
+    def _enlist(self):
+        """Regista o repositório na transação ativa, se existir."""
+        unit = UnitOfWork.current()
+        if unit is not None:
+            unit.enlist(self)
+
+    def _write(self, change: tuple):
+        """
+        Escreve uma alteração, ou deixa-a pendente se houver transação.
+
+        Args:
+            change: ("put", registo), ("del", ID) ou ("all", None)
+        """
+        if self._pending is not None:
+            self._pending.append(change)
+            return
+        try:
+            self._flush([change])
+        except ConflictError:
+            # Descartar a alteração local: a próxima leitura traz os dados atuais
+            self.invalidate()
+            raise
+
+    @_synchronized
+    def _begin(self) -> tuple:
+        """
+        Inicia uma transação, guardando o estado atual da cache.
+
+        O bloqueio do repositório fica com a thread da transação até ao
+        commit ou rollback: as alterações pendentes pertencem a essa thread,
+        e as outras threads esperam em vez de as partilhar ou descartar.
+
+        Returns:
+            tuple: (registos, mapa de identidade) antes da transação
+        """
+        records = self._records()
+        self.lock.acquire()
+        self._pending = []
+        return dict(records), dict(self._identity)
+
+    @_synchronized
+    def _prepare_commit(self):
+        """
+        Verifica se as alterações pendentes podem ser escritas.
+
+        Chamado pela unidade de trabalho com o bloqueio do armazenamento já
+        obtido, antes de escrever qualquer repositório da transação.
+
+        Raises:
+            ConflictError: Se um dos registos foi gravado por outro processo
+        """
+        self._pending = self._coalesce(self._pending)
+        if self._pending:
+            self._prepare(self._pending)
+
+    @_synchronized
+    def _commit(self):
+        """
+        Escreve de uma só vez as alterações pendentes da transação.
+
+        Raises:
+            ConflictError: Se um dos registos foi gravado por outro processo
+                (as alterações continuam pendentes, para o rollback)
+        """
+        if self._pending:
+            self._flush(self._pending)
+        self._pending = None
+        self.lock.release()
+
+    @_synchronized
+    def _rollback(self, snapshot: tuple):
+        """
+        Descarta as alterações pendentes e repõe a cache.
+
+        Os objetos alterados durante a transação saem do mapa de identidade,
+        para serem recriados a partir dos registos repostos.
+
+        Args:
+            snapshot: Estado devolvido por _begin()
+        """
+        pending, self._pending = self._pending, None
+        touched = {data["id"] if op == "put" else data
+                   for op, data in pending if op != "all"}
+
+        # Os objetos alterados voltam à versão lida, para poderem ser regravados
+        for record_id, version in self._expected.items():
+            obj = self._identity.get(record_id)
+            if obj is not None:
+                obj._version = version
+        self._expected = {}
+
+        records, identity = snapshot
+        self._by_id = records
+        if any(op == "all" for op, _ in pending):
+            self._identity = {}
+        else:
+            self._identity = {k: v for k, v in identity.items() if k not in touched}
+        self._rebuild_indexes()
+        self._notify_reset()
+        self.lock.release()
+
+    # ==================== SEQUÊNCIA DE IDS ====================
+
+    @_synchronized
+    def next_ids(self, count: int = 1, start: int = 1) -> range:
+        """
+        Reserva um bloco de IDs novos em O(1), de forma segura entre processos.
+
+        O último ID atribuído fica guardado no armazenamento (ver
+        read_sequence/write_sequence). Na primeira utilização a sequência
+        parte do maior ID existente. Os IDs reservados nunca são reutilizados,
+        mesmo que a transação que os usou seja desfeita.
+
+        Args:
+            count: Número de IDs a reservar (ex: importações em bloco)
+            start: Menor ID possível da entidade (default: 1)
+
+        Returns:
+            range: IDs reservados, consecutivos
+        """
+        with self.storage.lock():
+            last = self.storage.read_sequence()
+            if last is None:
+                last = max(self._records(), default=0)
+            first = max(last + 1, start)
+            self.storage.write_sequence(first + count - 1)
+        return range(first, first + count)
+
+    def _advance_sequence(self, record_id: int):
+        """
+        Garante que a sequência não volta a atribuir um ID já gravado.
+
+        Args:
+            record_id: Maior ID presente nos registos gravados
+        """
+        with self.storage.lock():
+            last = self.storage.read_sequence()
+            if last is not None and last < record_id:
+                self.storage.write_sequence(record_id)
+
+    # ==================== LEITURA E ESCRITA ====================
+
+    @_synchronized
+    def load(self) -> list:
+        """
+        Obtém os registos da entidade, lendo-os apenas se necessário.
+
+        Returns:
+            list: Nova lista com os dicionários em cache
+        """
+        # Cópia da lista para que alterações do chamador não afetem a cache
+        return list(self._records().values())
+
+    @_synchronized
+    def save(self, records: list):
+        """
+        Substitui todos os registos, grava-os e atualiza a cache.
+
+        Os objetos cujo ID deixou de existir saem do mapa de identidade.
+
+        Args:
+            records: Lista de dicionários a gravar
+        """
+        self._enlist()
+        self._by_id = {r["id"]: r for r in records}
+        self._identity = {k: v for k, v in self._identity.items() if k in self._by_id}
+        self._rebuild_indexes()
+        self._write(("all", None))
+        self._notify_reset()
+        if self._by_id:
+            self._advance_sequence(max(self._by_id))
+
+    @_synchronized
+    def upsert(self, record: dict, obj=None):
+        """
+        Insere ou atualiza um registo, mantendo a sua posição na cache.
+
+        Com SQLite só a linha do registo é gravada; com JSON o ficheiro
+        é reescrito. A versão do registo passa a ser a do objeto mais um.
+
+        Args:
+            record: Dicionário com os dados do registo
+            obj: Objeto do modelo a registar no mapa de identidade (opcional)
+
+        Raises:
+            ConflictError: Se o objeto foi lido antes de outra gravação do registo
+        """
+        self._enlist()
+        records = self._records()
+        previous = records.get(record["id"])
+        version = getattr(obj, "_version", None)
+        if version is None:
+            version = self._version(previous)
+        elif version != self._version(previous):
+            raise ConflictError(record["id"])
+        self._expected.setdefault(record["id"], version)
+
+        if previous is not None:
+            self._unindex_record(previous)
+        record["version"] = version + 1
+        records[record["id"]] = record
+        self._index_record(record)
+        if obj is not None:
+            obj._version = record["version"]
+            self._identity[record["id"]] = obj
+        self._write(("put", record))
+        self._notify_update(previous, record)
+
+    @_synchronized
+    def remove(self, record_id):
+        """
+        Remove um registo pelo ID (sem efeito se não existir).
+
+        Args:
+            record_id: ID do registo a remover
+
+        Raises:
+            ConflictError: Se o registo foi gravado entretanto por outro processo
+        """
+        self._enlist()
+        records = self._records()
+        previous = records.pop(record_id, None)
+        if previous is not None:
+            self._expected.setdefault(record_id, self._version(previous))
+            self._unindex_record(previous)
+            self._identity.pop(record_id, None)
+            self._write(("del", record_id))
+            self._notify_update(previous, None)
+
+    # ==================== CONSULTAS ====================
+
+    @_synchronized
+    def get(self, record_id):
+        """
+        Obtém o dicionário de um registo pelo ID em O(1).
+
+        Args:
+            record_id: ID do registo
+
+        Returns:
+            dict: Registo encontrado, ou None
+        """
+        return self._records().get(record_id)
+
+    @_synchronized
+    def ids(self) -> list:
+        """
+        Obtém todos os IDs pela ordem de armazenamento.
+
+        Returns:
+            list: Lista de IDs
+        """
+        return list(self._records())
+
+    @_synchronized
+    def ids_where(self, field: str, value) -> list:
+        """
+        Obtém os IDs dos registos com um dado valor num campo indexado.
+
+        Args:
+            field: Campo com índice secundário
+            value: Valor a procurar
+
+        Returns:
+            list: IDs dos registos correspondentes
+        """
+        self._records()
+        return list(self._indexes[field].get(value, ()))
+
+    @_synchronized
+    def find(self, record_id, factory):
+        """
+        Obtém o objeto de um registo através do mapa de identidade.
+
+        Args:
+            record_id: ID do registo
+            factory: Função que cria o objeto a partir do dicionário (from_dict)
+
+        Returns:
+            object: Objeto do modelo, ou None se o ID não existir
+        """
+        records = self._records()
+        obj = self._identity.get(record_id)
+        if obj is None:
+            data = records.get(record_id)
+            if data is None:
+                return None
+            obj = factory(data)
+            if obj is not None:
+                obj._version = self._version(data)
+                self._identity[record_id] = obj
+        return obj
+
+    @_synchronized
+    def find_many(self, record_ids, factory) -> list:
+        """
+        Obtém os objetos de vários registos, ignorando IDs inexistentes.
+
+        Args:
+            record_ids: IDs dos registos, pela ordem pretendida
+            factory: Função que cria o objeto a partir do dicionário
+
+        Returns:
+            list: Objetos encontrados
+        """
+        objects = (self.find(record_id, factory) for record_id in record_ids)
+        return [obj for obj in objects if obj is not None]
+
+    @_synchronized
+    def find_overlapping(self, fields: tuple, start: datetime, end: datetime,
+                         factory) -> list:
+        """
+        Obtém os objetos dos registos cujo período interseta [start, end[.
+
+        Se os registos ainda não estão em memória e o armazenamento permite
+        ler por período (partições mensais, ver read_range), só são lidas as
+        partições que intersetam o período; esses objetos não entram no mapa
+        de identidade. Caso contrário, a pesquisa é feita na cache, sem
+        abrir ficheiros: na aplicação, depois do pré-carregamento, é sempre
+        este o caso, e a leitura por partições serve só consultas "a frio"
+        (ex: relatórios ou scripts que não carregam todas as reservas).
+
+        Args:
+            fields: Campos (início, fim) do período, em formato ISO 8601
+            start: Início do período
+            end: Fim do período
+            factory: Função que cria o objeto a partir do dicionário
+
+        Returns:
+            list: Objetos dos registos do período, pela ordem de armazenamento
+        """
+        start_field, end_field = fields
+
+        def overlaps(record):
+            return (datetime.fromisoformat(record[start_field]) < end
+                    and datetime.fromisoformat(record[end_field]) > start)
+
+        read_range = getattr(self.storage, "read_range", None)
+        if self._by_id is None and read_range is not None:
+            objects = []
+            for record in filter(overlaps, read_range(start, end)):
+                obj = factory(record)
+                obj._version = self._version(record)
+                objects.append(obj)
+            return objects
+        matching = [r["id"] for r in self._records().values() if overlaps(r)]
+        return self.find_many(matching, factory)
+
+    @_synchronized
+    def all(self, factory) -> list:
+        """
+        Obtém os objetos de todos os registos pela ordem de armazenamento.
+
+        Args:
+            factory: Função que cria o objeto a partir do dicionário
+
+        Returns:
+            list: Lista de objetos do modelo
+        """
+        return self.find_many(self.ids(), factory)
@@ -8,6 +8,23 @@ import json
 import os
 from datetime import datetime
 
+from . import config, events
+from .archive import CLOSED_STATES, ReservationArchive
+from .availability import AvailabilityIndex
+from .partitions import manifest_of
+from .pricing import hours_between
+from .repository import Repository
+from .unit_of_work import transaction
+
+
+class ReservationError(Exception):
+    """
+    Erro de negócio ao criar ou alterar uma reserva.
+    
+    Lançado dentro de uma transação para a desfazer (ex: um artigo deixou
+    de estar livre enquanto a reserva era criada).
+    """
+
 
 class Reservation:  
     """
@@ -18,12 +35,16 @@ class Reservation:
     
     Attributes:
         DATA_FILE (str): Caminho para o ficheiro JSON de armazenamento
+        ARCHIVE_FILE (str): Caminho do arquivo das reservas encerradas
         STATES (list): Estados possíveis de uma reserva
     """
     
     # Caminho do ficheiro JSON onde as reservas são guardadas
     DATA_FILE = "data/reservations.json"
     
+    # Arquivo só de leitura das reservas concluídas e canceladas
+    ARCHIVE_FILE = "data/reservations.archive"
+    
     # Estados possíveis do ciclo de vida de uma reserva
     # Pending -> Confirmed -> Completed
     #    |          |
@@ -31,6 +52,11 @@ class Reservation:
     # Cancelled  Cancelled
     STATES = ["Pending", "Confirmed", "Cancelled", "Completed"]
     
+    # Política de totais bloqueados: só as reservas ativas que ainda não
+    # começaram acompanham as alterações de preço dos artigos. Reservas
+    # concluídas, canceladas ou já iniciadas mantêm o total gravado.
+    REPRICE_STATES = AvailabilityIndex.ACTIVE_STATES
+    
     def __init__(self, id:  int, client_id: int, start_date: datetime,
                  end_date: datetime, item_ids: list = None,
                  total_value: float = 0.0, state: str = "Pending"):
@@ -53,6 +79,7 @@ class Reservation:
         self._item_ids = item_ids or []  # Lista vazia se None
         self._total_value = total_value
         self._state = state
+        self._related = {}  # Relações pré-carregadas (ver prefetch)
     
     # ==================== PROPRIEDADES SIMPLES ====================
     
@@ -99,10 +126,14 @@ class Reservation:
         Obtém o objeto Cliente associado a esta reserva.
         
         Estabelece a relação N:1 entre Reservation e User/Client.
+        Usa o cliente pré-carregado por prefetch(), se existir.
         
         Returns:
             Client:  Objeto do cliente, ou None se não encontrado
         """
+        related = self._related.get("client")
+        if related is not None and related[0] == self._client_id:
+            return related[1]
         from .user import User
         return User.find_by_id(self._client_id)
     
@@ -112,10 +143,14 @@ class Reservation:
         Obtém os objetos SportsItem associados a esta reserva.
         
         Estabelece a relação N:M entre Reservation e SportsItem. 
+        Usa os artigos pré-carregados por prefetch(), se existirem.
         
         Returns:
             list[SportsItem]: Lista de artigos reservados
         """
+        related = self._related.get("items")
+        if related is not None and related[0] == tuple(self._item_ids):
+            return list(related[1])
         from . sports_item import SportsItem
         return [SportsItem.find_by_id(item_id) for item_id in self._item_ids]
     
@@ -125,8 +160,9 @@ class Reservation:
         """
         Adiciona um artigo à reserva.
         
-        Verifica se o artigo está disponível antes de adicionar.
-        Marca o artigo como indisponível e recalcula o total.
+        Verifica se o artigo está em serviço e livre no período da reserva
+        (motor de disponibilidade) antes de adicionar, e recalcula o total.
+        O artigo fica ocupado apenas durante este período.
         
         Args:
             item: Objeto SportsItem a adicionar
@@ -134,25 +170,26 @@ class Reservation:
         Returns: 
             bool: True se adicionado com sucesso, False caso contrário
         """
-        # Verificar disponibilidade e se já não está na reserva
-        if item.check_availability() and item.id not in self._item_ids:
-            self._item_ids.append(item.id)
-            
-            # Marcar artigo como indisponível para outras reservas
-            item.set_available(False)
-            item.save()
-            
-            # Atualizar valor total e guardar reserva
-            self.calculate_total()
-            self.save()
-            return True
-        return False
+        # Verificar se já não está na reserva e se está livre no período
+        # (verificação e gravação sob o mesmo bloqueio do repositório)
+        with Reservation._repository().lock:
+            if (item.check_availability() and item.id not in self._item_ids
+                    and Reservation.availability().is_free(
+                        item.id, self._start_date, self._end_date,
+                        ignore_reservation=self._id)):
+                self._item_ids.append(item.id)
+                
+                # Atualizar valor total e guardar reserva
+                self.calculate_total()
+                self.save()
+                return True
+            return False
     
     def remove_item(self, item):
         """
         Remove um artigo da reserva. 
         
-        Liberta o artigo (marca como disponível) e recalcula o total. 
+        Liberta o período do artigo e recalcula o total. 
         
         Args:
             item: Objeto SportsItem a remover
@@ -160,10 +197,6 @@ class Reservation:
         if item.id in self._item_ids:
             self._item_ids.remove(item.id)
             
-            # Libertar o artigo para outras reservas
-            item.set_available(True)
-            item.save()
-            
             # Atualizar valor total e guardar reserva
             self.calculate_total()
             self.save()
@@ -173,17 +206,19 @@ class Reservation:
         Calcula o valor total da reserva.
         
         O total é baseado no preço por hora de cada artigo multiplicado
-        pela duração da reserva em horas.
+        pela duração da reserva em horas. Os preços vêm da tabela de preços
+        (SportsItem.prices), sem carregar os artigos.
         
         Returns:
             float: Valor total da reserva em euros
         """
+        from .sports_item import SportsItem
+        
         # Calcular duração em horas
-        hours = (self._end_date - self._start_date).total_seconds() / 3600
+        hours = hours_between(self._start_date, self._end_date)
         
         # Somar preço de todos os artigos
-        items = self.items
-        self._total_value = sum(item.price_per_hour * hours for item in items if item)
+        self._total_value = SportsItem.quote(self._item_ids, hours)
         
         return self._total_value
     
@@ -210,7 +245,7 @@ class Reservation:
         Cancela a reserva.
         
         Transição de estado: Pending/Confirmed -> Cancelled
-        Liberta todos os artigos reservados.
+        Liberta o período de todos os artigos reservados.
         
         Returns:
             bool: True se cancelada com sucesso, False caso contrário
@@ -218,12 +253,7 @@ class Reservation:
         if self._state in ["Pending", "Confirmed"]:
             self._state = "Cancelled"
             
-            # Libertar todos os artigos reservados
-            for item in self.items:
-                if item: 
-                    item.set_available(True)
-                    item.save()
-            
+            # Ao gravar, o motor de disponibilidade liberta os artigos
             self.save()
             return True
         return False
@@ -233,7 +263,7 @@ class Reservation:
         Marca a reserva como concluída. 
         
         Transição de estado: Confirmed -> Completed
-        Liberta todos os artigos após o período de reserva.
+        Liberta o período de todos os artigos após a utilização.
         
         Returns:
             bool: True se concluída com sucesso, False caso contrário
@@ -241,12 +271,7 @@ class Reservation:
         if self._state == "Confirmed": 
             self._state = "Completed"
             
-            # Libertar todos os artigos após utilização
-            for item in self. items:
-                if item: 
-                    item.set_available(True)
-                    item. save()
-            
+            # Ao gravar, o motor de disponibilidade liberta os artigos
             self. save()
             return True
         return False
@@ -267,7 +292,7 @@ class Reservation:
             "client_id": self._client_id,
             "start_date":  self._start_date.isoformat(),  # Formato:  YYYY-MM-DDTHH:MM:SS
             "end_date": self._end_date.isoformat(),
-            "item_ids": self._item_ids,
+            "item_ids": list(self._item_ids),
             "total_value": self._total_value,
             "state": self._state
         }
@@ -279,13 +304,69 @@ class Reservation:
         """
         Garante que o ficheiro JSON existe.
         
-        Cria a pasta 'data' e o ficheiro JSON vazio se não existirem.
+        Cria a pasta 'data' e o ficheiro JSON vazio se não existirem. Com
+        as reservas em partições (ver models/partitions.py), o ficheiro JSON
+        já não é usado e não é criado.
         """
         os.makedirs("data", exist_ok=True)
+        if os.path.exists(manifest_of(Reservation.DATA_FILE)):
+            return
         if not os.path.exists(Reservation.DATA_FILE):
             with open(Reservation.DATA_FILE, "w", encoding="utf-8") as f:
                 json.dump([], f)
     
+    @staticmethod
+    def _repository() -> Repository:
+        """
+        Obtém o repositório partilhado do ficheiro de reservas.
+        
+        Returns:
+            Repository: Cache em memória das reservas
+        """
+        # Índices secundários por cliente e por estado
+        return Repository.for_file(Reservation.DATA_FILE,
+                                       indexes=("client_id", "state"))
+    
+    @staticmethod
+    def archive() -> ReservationArchive:
+        """
+        Obtém o arquivo partilhado das reservas encerradas.
+        
+        Returns:
+            ReservationArchive: Arquivo das reservas concluídas e canceladas
+        """
+        return ReservationArchive.for_file(Reservation.ARCHIVE_FILE)
+    
+    @staticmethod
+    def archive_closed() -> int:
+        """
+        Move as reservas concluídas e canceladas para o arquivo.
+        
+        Estas reservas já não mudam de estado: saem do ficheiro de reservas,
+        que fica só com as ativas, e passam a ser lidas do arquivo apenas
+        quando são mostradas. Os registos são primeiro acrescentados ao
+        arquivo e só depois removidos (numa transação), pelo que uma
+        interrupção a meio não perde reservas.
+        
+        Returns:
+            int: Número de reservas arquivadas
+        """
+        Reservation._ensure_file()
+        repository = Reservation._repository()
+        with repository.lock, repository.storage.lock():
+            repository.refresh()
+            closed_ids = [reservation_id for state in CLOSED_STATES
+                          for reservation_id in repository.ids_where("state", state)]
+            if not closed_ids:
+                return 0
+            # Guardar a sequência antes de remover: os IDs não são reutilizados
+            repository.next_ids(count=0, start=101)
+            Reservation.archive().append([dict(repository.get(i)) for i in closed_ids])
+            with transaction():
+                for reservation_id in closed_ids:
+                    repository.remove(reservation_id)
+        return len(closed_ids)
+    
     @staticmethod
     def _load_all() -> list:
         """
@@ -295,8 +376,7 @@ class Reservation:
             list: Lista de dicionários com os dados das reservas
         """
         Reservation._ensure_file()
-        with open(Reservation. DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return Reservation._repository().load()
     
     @staticmethod
     def _save_all(reservations: list):
@@ -307,9 +387,7 @@ class Reservation:
             reservations: Lista de dicionários com os dados das reservas
         """
         Reservation._ensure_file()
-        with open(Reservation.DATA_FILE, "w", encoding="utf-8") as f:
-            # default=str permite serializar objetos datetime que não foram convertidos
-            json.dump(reservations, f, indent=4, ensure_ascii=False, default=str)
+        Reservation._repository().save(reservations)
     
     # ==================== OPERAÇÕES CRUD ====================
     
@@ -320,60 +398,225 @@ class Reservation:
         Se a reserva já existir (mesmo ID), atualiza os seus dados.
         Caso contrário, adiciona como nova reserva.
         """
-        reservations = Reservation._load_all()
+        Reservation._repository().upsert(self.to_dict(), self)
+        events.publish(events.SAVED, self)
+    
+    # ==================== MÉTODOS ESTÁTICOS ====================
+    
+    @staticmethod
+    def availability() -> AvailabilityIndex:
+        """
+        Obtém o motor de disponibilidade construído a partir das reservas.
         
-        # Procurar reserva existente para atualizar
-        for i, r in enumerate(reservations):
-            if r["id"] == self._id:
-                reservations[i] = self.to_dict()
-                Reservation._save_all(reservations)
-                return
+        O índice é criado na primeira utilização e mantido atualizado a cada
+        gravação de uma reserva (ver AvailabilityIndex).
         
-        # Se não existe, adicionar nova reserva
-        reservations.append(self.to_dict())
-        Reservation._save_all(reservations)
+        Returns:
+            AvailabilityIndex: Índice de intervalos reservados por artigo
+        """
+        repository = Reservation._repository()
+        repository.refresh()
+        return repository.attach("availability", AvailabilityIndex)
     
-    # ==================== MÉTODOS ESTÁTICOS ====================
+    @staticmethod
+    def reprice_items(item_ids, now: datetime = None) -> list:
+        """
+        Recalcula os totais das reservas afetadas por alterações de preço.
+        
+        As reservas são encontradas pelo motor de disponibilidade (índice
+        artigo -> reservas ativas), sem percorrer as restantes, e os novos
+        totais são calculados de uma só vez pela tabela de preços. As
+        reservas alteradas são gravadas numa única transação.
+        
+        Segue a política de totais bloqueados (ver REPRICE_STATES): só as
+        reservas pendentes ou confirmadas que começam depois de now são
+        recalculadas.
+        
+        Args:
+            item_ids: IDs dos artigos cujo preço mudou
+            now: Data de referência (default: agora)
+            
+        Returns:
+            list[Reservation]: Reservas cujo total foi alterado
+        """
+        from .sports_item import SportsItem
+        
+        now = now or datetime.now()
+        repository = Reservation._repository()
+        changed = []
+        with repository.lock, transaction():
+            reservation_ids = Reservation.availability().reservations_of(item_ids, since=now)
+            reservations = [r for r in Reservation.find_many(sorted(reservation_ids))
+                            if r._state in Reservation.REPRICE_STATES]
+            totals = SportsItem.quote_many(
+                [r._item_ids for r in reservations],
+                [hours_between(r._start_date, r._end_date) for r in reservations])
+            for reservation, total in zip(reservations, totals):
+                # Comparação ao cêntimo: só grava os totais que mudam
+                if round(total, 2) != round(reservation._total_value, 2):
+                    reservation._total_value = total
+                    reservation.save()
+                    changed.append(reservation)
+        return changed
+    
+    @staticmethod
+    def warm_up() -> int:
+        """
+        Lê o ficheiro de reservas para a cache partilhada.
+        
+        Prepara também o motor de disponibilidade. Usado pelo
+        pré-carregamento dos dados (ver models.warmup). Com
+        config.ARCHIVE_CLOSED, as reservas encerradas são antes movidas para
+        o arquivo.
+        
+        Returns:
+            int: Número de reservas carregadas
+        """
+        Reservation._ensure_file()
+        repository = Reservation._repository()
+        with repository.lock:
+            if config.ARCHIVE_CLOSED:
+                Reservation.archive_closed()
+            Reservation.availability()
+            return len(repository.ids())
     
     @staticmethod
     def get_next_id() -> int:
         """
-        Obtém o próximo ID disponível para uma nova reserva.
+        Reserva o próximo ID para uma nova reserva.
         
         Os IDs de reserva começam em 101 para fácil identificação.
         
         Returns:
-            int:  Próximo ID disponível
+            int:  Próximo ID da sequência
         """
-        reservations = Reservation._load_all()
-        if not reservations:
-            return 101  # IDs de reserva começam em 101
-        return max(r["id"] for r in reservations) + 1
+        return Reservation._repository().next_ids(start=101)[0]
     
     @staticmethod
-    def get_all(client_id: int = None, state: str = None) -> list:
+    def get_all(client_id: int = None, state: str = None, prefetch: tuple = ()) -> list:
         """
         Obtém todas as reservas com filtros opcionais.
         
-        Permite filtrar por cliente e/ou estado da reserva.
+        Permite filtrar por cliente e/ou estado da reserva. Os filtros usam
+        os índices secundários e só são criadas as reservas correspondentes.
         
         Args:
             client_id:  Filtrar por ID do cliente (opcional)
             state: Filtrar por estado da reserva (opcional)
+            prefetch: Relações a carregar em lote ("client", "items")
             
         Returns: 
             list[Reservation]: Lista de reservas filtradas
         """
-        reservations_data = Reservation._load_all()
-        reservations = [Reservation.from_dict(r) for r in reservations_data]
+        return Reservation.find_many(Reservation.get_ids(client_id, state), prefetch)
+    
+    @staticmethod
+    def get_ids(client_id: int = None, state: str = None) -> list:
+        """
+        Obtém os IDs das reservas com filtros opcionais, sem criar objetos.
+        
+        Usado pelas tabelas virtualizadas, que só criam as reservas visíveis.
+        As reservas arquivadas (encerradas) são obtidas pelos índices do
+        arquivo, sem descodificar os registos, e juntadas às restantes por
+        ordem de ID.
         
-        # Aplicar filtro por cliente se especificado
+        Args:
+            client_id:  Filtrar por ID do cliente (opcional)
+            state: Filtrar por estado da reserva (opcional)
+            
+        Returns: 
+            list[int]: IDs das reservas filtradas
+        """
+        repository = Reservation._repository()
+        
+        # Aplicar filtro por cliente se especificado (via índice)
         if client_id:
-            reservations = [r for r in reservations if r. client_id == client_id]
+            reservation_ids = repository.ids_where("client_id", client_id)
+        else:
+            reservation_ids = repository.ids()
         
-        # Aplicar filtro por estado se especificado
+        # Aplicar filtro por estado se especificado (interseção com o índice)
         if state:
-            reservations = [r for r in reservations if r. state == state]
+            state_ids = repository.ids_where("state", state)
+            if client_id:
+                state_ids = set(state_ids)
+                reservation_ids = [r for r in reservation_ids if r in state_ids]
+            else:
+                reservation_ids = state_ids
+        
+        # Reservas arquivadas (a cópia no ficheiro de reservas prevalece)
+        archived_ids = Reservation.archive().ids(client_id, state)
+        if archived_ids:
+            active_ids = set(reservation_ids)
+            reservation_ids = sorted(active_ids.union(archived_ids))
+        
+        return reservation_ids
+    
+    @staticmethod
+    def find_many(reservation_ids, prefetch: tuple = ()) -> list:
+        """
+        Obtém as reservas de uma lista de IDs, ignorando as inexistentes.
+        
+        Os IDs que não estão no ficheiro de reservas são procurados no
+        arquivo, onde só são descodificados os registos pedidos.
+        
+        Args:
+            reservation_ids: IDs das reservas, pela ordem pretendida
+            prefetch: Relações a carregar em lote ("client", "items")
+            
+        Returns:
+            list[Reservation]: Reservas encontradas
+        """
+        reservation_ids = list(reservation_ids)
+        reservations = Reservation._repository().find_many(reservation_ids,
+                                                           Reservation.from_dict)
+        if len(reservations) < len(reservation_ids):
+            found = {r._id: r for r in reservations}
+            missing = [i for i in reservation_ids if i not in found]
+            found.update((r._id, r) for r in Reservation.archive().find_many(
+                missing, Reservation.from_dict))
+            reservations = [found[i] for i in reservation_ids if i in found]
+        return Reservation.prefetch(reservations, prefetch)
+    
+    @staticmethod
+    def prefetch(reservations: list, relations: tuple = ("client", "items")) -> list:
+        """
+        Carrega em lote as relações de várias reservas.
+        
+        Os clientes e artigos referidos são obtidos uma única vez cada
+        (custo proporcional ao número de reservas e de artigos distintos) e
+        ficam associados às reservas: as propriedades client e items passam
+        a devolvê-los sem novas pesquisas, enquanto o cliente e a lista de
+        artigos da reserva não mudarem.
+        
+        Args:
+            reservations: Reservas a completar
+            relations: Relações a carregar ("client" e/ou "items")
+            
+        Returns:
+            list[Reservation]: As mesmas reservas
+            
+        Raises:
+            ValueError: Se uma relação não existir
+        """
+        unknown = set(relations) - {"client", "items"}
+        if unknown:
+            raise ValueError(f"Relações desconhecidas: {', '.join(sorted(unknown))}")
+        
+        if "client" in relations:
+            from .user import User
+            client_ids = {r._client_id for r in reservations}
+            clients = {u.id: u for u in User.find_many(client_ids)}
+            for r in reservations:
+                r._related["client"] = (r._client_id, clients.get(r._client_id))
+        
+        if "items" in relations:
+            from .sports_item import SportsItem
+            item_ids = {i for r in reservations for i in r._item_ids}
+            items = {i.id: i for i in SportsItem.find_many(item_ids)}
+            for r in reservations:
+                r._related["items"] = (tuple(r._item_ids),
+                                       [items.get(i) for i in r._item_ids])
         
         return reservations
     
@@ -388,11 +631,35 @@ class Reservation:
         Returns:
             Reservation: Objeto Reservation se encontrado, None caso contrário
         """
-        reservations = Reservation._load_all()
-        for r in reservations:  
-            if r["id"] == reservation_id:
-                return Reservation.from_dict(r)
-        return None
+        reservation = Reservation._repository().find(reservation_id, Reservation.from_dict)
+        if reservation is None:
+            archived = Reservation.archive().find_many([reservation_id], Reservation.from_dict)
+            reservation = archived[0] if archived else None
+        return reservation
+    
+    @staticmethod
+    def find_between(start: datetime, end: datetime) -> list:
+        """
+        Obtém as reservas ativas cujo período interseta [start, end[.
+        
+        Com o armazenamento em partições mensais (BOOKING_PARTITIONED), e
+        enquanto as reservas não estão em memória (ex: num script ou
+        relatório, sem o pré-carregamento), só são lidas as partições que
+        intersetam o período; caso contrário a pesquisa é feita na cache
+        (ver Repository.find_overlapping). As reservas arquivadas estão
+        encerradas e não são incluídas.
+        
+        Args:
+            start: Início do período
+            end: Fim do período
+            
+        Returns:
+            list[Reservation]: Reservas pendentes ou confirmadas do período
+        """
+        Reservation._ensure_file()
+        reservations = Reservation._repository().find_overlapping(
+            ("start_date", "end_date"), start, end, Reservation.from_dict)
+        return [r for r in reservations if r._state in AvailabilityIndex.ACTIVE_STATES]
     
     @staticmethod
     def find_by_client(client_id: int) -> list:
@@ -427,7 +694,7 @@ class Reservation:
             client_id=data["client_id"],
             start_date=datetime.fromisoformat(data["start_date"]),  # Converter string para datetime
             end_date=datetime.fromisoformat(data["end_date"]),
-            item_ids=data.get("item_ids", []),
+            item_ids=list(data.get("item_ids", [])),  # Cópia para não alterar a cache
             total_value=data.get("total_value", 0.0),
             state=data.get("state", "Pending")
         )
@@ -5,8 +5,15 @@ para aluguer, com persistência em ficheiro JSON.
 """
 
 import json
+import math
 import os
 
+from . import config, events
+from .columnar import binary_of
+from .pricing import PriceTable
+from .repository import Repository
+from .unit_of_work import transaction
+
 
 class SportsItem:
     """
@@ -81,21 +88,25 @@ class SportsItem:
         """
         Obtém o objeto Category associado a este artigo. 
         
-        Estabelece a relação N:1 entre SportsItem e Category.
+        Estabelece a relação N:1 entre SportsItem e Category. A categoria é
+        resolvida pela memória de categorias (Category.lookup), sem ler o
+        ficheiro em cada acesso.
         
         Returns:
             Category:  Objeto da categoria, ou None se não tiver categoria
         """
         if self._category_id:
             from . category import Category
-            return Category. find_by_id(self._category_id)
+            return Category.lookup(self._category_id)
         return None
     
     # ==================== GESTÃO DE DISPONIBILIDADE ====================
     
     def check_availability(self) -> bool:
         """
-        Verifica se o artigo está disponível para reserva.
+        Verifica se o artigo está em serviço (disponível para reservas).
+        
+        A ocupação num período concreto é verificada com is_free().
         
         Returns:
             bool: True se disponível, False caso contrário
@@ -106,14 +117,47 @@ class SportsItem:
         """
         Define o estado de disponibilidade do artigo.
         
-        Utilizado quando um artigo é reservado (False) ou 
-        quando uma reserva é cancelada/concluída (True).
+        Controlado pelo administrador (ex: artigo em manutenção). As reservas
+        não alteram este estado; ocupam apenas o seu período de tempo.
         
         Args:
             available:  Novo estado de disponibilidade
         """
         self._available = available
     
+    def set_price_per_hour(self, price: float):
+        """
+        Define o preço por hora do artigo.
+        
+        Ao gravar (save), os totais das reservas pendentes ou confirmadas que
+        ainda não começaram são recalculados (ver Reservation.reprice_items).
+        
+        Args:
+            price: Novo preço por hora, em euros
+            
+        Raises:
+            ValueError: Se o preço for negativo ou não for um número finito
+        """
+        if not (math.isfinite(price) and price >= 0):
+            raise ValueError("O preço por hora deve ser um número não negativo")
+        self._price_per_hour = float(price)
+    
+    def is_free(self, start_date, end_date) -> bool:
+        """
+        Verifica se o artigo pode ser reservado no intervalo [início, fim).
+        
+        Args:
+            start_date: Data e hora de início
+            end_date: Data e hora de fim
+            
+        Returns:
+            bool: True se está em serviço e sem reservas ativas no período
+        """
+        from .reservation import Reservation
+        with Reservation._repository().lock:
+            return self._available and Reservation.availability().is_free(
+                self._id, start_date, end_date)
+    
     # ==================== SERIALIZAÇÃO ====================
     
     def to_dict(self) -> dict:
@@ -141,14 +185,29 @@ class SportsItem:
         """
         Garante que o ficheiro JSON existe. 
         
-        Cria a pasta 'data' e o ficheiro JSON vazio se não existirem.
+        Cria a pasta 'data' e o ficheiro JSON vazio se não existirem. Com
+        os artigos no formato binário (ver models/columnar.py), o ficheiro
+        JSON já não é usado e não é criado.
         Método privado utilizado internamente antes de operações de leitura/escrita.
         """
         os.makedirs("data", exist_ok=True)
+        if "sports_items" in config.BINARY_ENTITIES or os.path.exists(binary_of(SportsItem.DATA_FILE)):
+            return
         if not os.path. exists(SportsItem.DATA_FILE):
             with open(SportsItem.DATA_FILE, "w", encoding="utf-8") as f:
                 json.dump([], f)
     
+    @staticmethod
+    def _repository() -> Repository:
+        """
+        Obtém o repositório partilhado do ficheiro de artigos.
+        
+        Returns:
+            Repository: Cache em memória dos artigos
+        """
+        # Índice secundário por categoria para filtrar sem percorrer tudo
+        return Repository.for_file(SportsItem.DATA_FILE, indexes=("category_id",))
+    
     @staticmethod
     def _load_all() -> list:
         """
@@ -158,8 +217,7 @@ class SportsItem:
             list: Lista de dicionários com os dados dos artigos
         """
         SportsItem._ensure_file()
-        with open(SportsItem.DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return SportsItem._repository().load()
     
     @staticmethod
     def _save_all(items:  list):
@@ -170,8 +228,7 @@ class SportsItem:
             items: Lista de dicionários com os dados dos artigos
         """
         SportsItem._ensure_file()
-        with open(SportsItem.DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(items, f, indent=4, ensure_ascii=False)
+        SportsItem._repository().save(items)
     
     # ==================== OPERAÇÕES CRUD ====================
     
@@ -181,51 +238,66 @@ class SportsItem:
         
         Se o artigo já existir (mesmo ID), atualiza os seus dados.
         Caso contrário, adiciona como novo artigo.
-        """
-        items = SportsItem._load_all()
-        
-        # Procurar artigo existente para atualizar
-        for i, item in enumerate(items):
-            if item["id"] == self._id:
-                items[i] = self. to_dict()
-                SportsItem._save_all(items)
-                return
         
-        # Se não existe, adicionar novo artigo
-        items.append(self.to_dict())
-        SportsItem._save_all(items)
+        Se o preço por hora mudou, os totais das reservas afetadas são
+        recalculados na mesma transação (ver Reservation.reprice_items).
+        O bloqueio das reservas é obtido antes do dos artigos, pela ordem
+        global dos bloqueios (ver Repository).
+        """
+        from .reservation import Reservation
+        repository = SportsItem._repository()
+        previous = repository.get(self._id)
+        with Reservation._repository().lock, transaction():
+            repository.upsert(self.to_dict(), self)
+            events.publish(events.SAVED, self)
+            if previous is not None and previous["price_per_hour"] != self._price_per_hour:
+                Reservation.reprice_items([self._id])
     
     def delete(self):
         """
         Remove este artigo do ficheiro JSON.
         
-        Filtra a lista de artigos removendo o que tem o mesmo ID.
+        Remove o registo com o mesmo ID do repositório.
         """
-        items = SportsItem._load_all()
-        items = [i for i in items if i["id"] != self._id]
-        SportsItem._save_all(items)
+        SportsItem._repository().remove(self._id)
+        events.publish(events.DELETED, self)
     
     # ==================== MÉTODOS ESTÁTICOS ====================
     
+    @staticmethod
+    def warm_up() -> int:
+        """
+        Lê o ficheiro de artigos para a cache partilhada.
+        
+        Prepara também a tabela de preços. Usado pelo pré-carregamento dos
+        dados (ver models.warmup).
+        
+        Returns:
+            int: Número de artigos carregados
+        """
+        SportsItem._ensure_file()
+        repository = SportsItem._repository()
+        with repository.lock:
+            SportsItem.prices()
+            return len(repository.ids())
+    
     @staticmethod
     def get_next_id() -> int:
         """
-        Obtém o próximo ID disponível para um novo artigo.
+        Reserva o próximo ID para um novo artigo.
         
         Returns:
-            int:  Próximo ID (máximo atual + 1, ou 1 se não existirem artigos)
+            int:  Próximo ID da sequência (1 se não existirem artigos)
         """
-        items = SportsItem._load_all()
-        if not items: 
-            return 1
-        return max(i["id"] for i in items) + 1
+        return SportsItem._repository().next_ids()[0]
     
     @staticmethod
     def get_all(category_id: int = None, available_only: bool = False) -> list:
         """
         Obtém todos os artigos com filtros opcionais.
         
-        Permite filtrar por categoria e/ou disponibilidade.
+        Permite filtrar por categoria e/ou disponibilidade. O filtro por
+        categoria usa o índice secundário e só cria os artigos correspondentes.
         
         Args:
             category_id:  Filtrar por ID da categoria (opcional)
@@ -234,18 +306,48 @@ class SportsItem:
         Returns: 
             list[SportsItem]: Lista de artigos filtrados
         """
-        items_data = SportsItem._load_all()
-        items = [SportsItem.from_dict(i) for i in items_data]
+        return SportsItem.find_many(SportsItem.get_ids(category_id, available_only))
+    
+    @staticmethod
+    def get_ids(category_id: int = None, available_only: bool = False) -> list:
+        """
+        Obtém os IDs dos artigos com filtros opcionais, sem criar objetos.
+        
+        Usado pelas tabelas virtualizadas, que só criam os artigos visíveis.
+        
+        Args:
+            category_id:  Filtrar por ID da categoria (opcional)
+            available_only:  Se True, retorna apenas artigos disponíveis (opcional)
+            
+        Returns: 
+            list[int]: IDs dos artigos filtrados, pela ordem de armazenamento
+        """
+        repository = SportsItem._repository()
         
-        # Aplicar filtro por categoria se especificado
+        # Aplicar filtro por categoria se especificado (via índice)
         if category_id:
-            items = [i for i in items if i.category_id == category_id]
+            item_ids = repository.ids_where("category_id", category_id)
+        else:
+            item_ids = repository.ids()
         
-        # Aplicar filtro de disponibilidade se especificado
+        # Aplicar filtro de disponibilidade se especificado (sobre os registos)
         if available_only:
-            items = [i for i in items if i.available]
+            item_ids = [i for i in item_ids if repository.get(i)["available"]]
         
-        return items
+        return item_ids
+    
+    @staticmethod
+    def find_many(item_ids) -> list:
+        """
+        Obtém os artigos de uma lista de IDs, ignorando os inexistentes.
+        
+        Args:
+            item_ids: IDs dos artigos, pela ordem pretendida
+            
+        Returns:
+            list[SportsItem]: Artigos encontrados
+        """
+        return SportsItem._repository().find_many(item_ids, SportsItem.from_dict)
     
     @staticmethod
     def find_by_id(item_id: int):
@@ -258,11 +360,81 @@ class SportsItem:
         Returns:
             SportsItem: Objeto SportsItem se encontrado, None caso contrário
         """
-        items = SportsItem._load_all()
-        for i in items:
-            if i["id"] == item_id:
-                return SportsItem. from_dict(i)
-        return None
+        return SportsItem._repository().find(item_id, SportsItem.from_dict)
+    
+    @staticmethod
+    def prices() -> PriceTable:
+        """
+        Obtém a tabela de preços construída a partir dos artigos.
+        
+        A tabela é criada na primeira utilização e mantida atualizada a cada
+        gravação de um artigo (ver PriceTable). Para várias consultas
+        seguidas a partir de threads diferentes, usar o bloqueio do
+        repositório (ou quote/quote_many).
+        
+        Returns:
+            PriceTable: Preços por hora indexados pela posição do artigo
+        """
+        repository = SportsItem._repository()
+        with repository.lock:
+            repository.refresh()
+            return repository.attach("prices", PriceTable)
+    
+    @staticmethod
+    def quote(item_ids, hours: float) -> float:
+        """
+        Calcula o preço de um conjunto de artigos durante um período.
+        
+        Args:
+            item_ids: IDs dos artigos
+            hours: Duração em horas
+            
+        Returns:
+            float: Soma dos preços por hora multiplicada pela duração
+        """
+        with SportsItem._repository().lock:
+            return SportsItem.prices().total(item_ids, hours)
+    
+    @staticmethod
+    def quote_many(baskets, hours) -> list:
+        """
+        Calcula os preços de vários conjuntos de artigos de uma só vez.
+        
+        Usado para orçamentar muitos cestos (ex: importação em bloco) com
+        uma única operação vetorial.
+        
+        Args:
+            baskets: Lista de listas de IDs de artigos
+            hours: Duração em horas de cada cesto
+            
+        Returns:
+            list[float]: Preço de cada cesto
+        """
+        with SportsItem._repository().lock:
+            return SportsItem.prices().totals(baskets, hours)
+    
+    @staticmethod
+    def get_free(start_date, end_date, category_id: int = None) -> list:
+        """
+        Obtém os artigos em serviço livres no intervalo [início, fim).
+        
+        Usa o índice por categoria e o motor de disponibilidade (mapa de
+        slots ou pesquisa binária por artigo candidato).
+        
+        Args:
+            start_date: Data e hora de início
+            end_date: Data e hora de fim
+            category_id: Filtrar por ID da categoria (opcional)
+            
+        Returns:
+            list[SportsItem]: Lista de artigos livres no período
+        """
+        from .reservation import Reservation
+        items = SportsItem.get_all(category_id=category_id, available_only=True)
+        with Reservation._repository().lock:
+            free_ids = set(Reservation.availability().free_items(
+                [i.id for i in items], start_date, end_date))
+        return [i for i in items if i.id in free_ids]
     
     @staticmethod
     def find_by_category(category_id: int) -> list:
@@ -0,0 +1,717 @@
+"""
+Módulo dos armazenamentos persistentes usados pelo repositório.
+Cada armazenamento sabe ler todos os registos de uma entidade, detetar
+alterações feitas por outros processos e gravar um lote de alterações.
+
+As alterações são tuplos ("put", registo), ("del", ID) ou ("all", None),
+este último quando todos os registos foram substituídos.
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+from . import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem bloqueio entre processos
+    fcntl = None
+
+
+# ==================== ESCRITA SEGURA ====================
+
+def _write_fully(fd: int, data: bytes):
+    """
+    Escreve todos os bytes num descritor (normalmente numa única chamada).
+
+    Args:
+        fd: Descritor de ficheiro aberto para escrita
+        data: Bytes a escrever
+    """
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _fsync_directory(directory: str):
+    """
+    Sincroniza uma pasta com o disco, tornando duradoura uma mudança de nome.
+
+    Args:
+        directory: Caminho da pasta
+    """
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, data: bytes):
+    """
+    Substitui o conteúdo de um ficheiro de forma atómica.
+
+    Os dados (já serializados) são escritos de uma só vez num ficheiro
+    temporário na mesma pasta, sincronizados com o disco (config.FSYNC) e só
+    então o temporário substitui o original com os.replace. Uma interrupção
+    a meio deixa sempre o ficheiro antigo ou o novo, nunca um truncado.
+
+    Args:
+        path: Caminho do ficheiro a substituir
+        data: Novo conteúdo completo
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        try:
+            _write_fully(fd, data)
+            if config.FSYNC:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        # mkstemp cria o ficheiro só com permissões do dono; manter as originais
+        try:
+            os.chmod(temp_path, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    if config.FSYNC_DIRECTORY:
+        _fsync_directory(directory)
+
+
+def append_bytes(path: str, data: bytes):
+    """
+    Acrescenta bytes ao fim de um ficheiro numa única escrita.
+
+    Args:
+        path: Caminho do ficheiro (criado se não existir)
+        data: Bytes a acrescentar
+
+    Returns:
+        int: Tamanho do ficheiro após a escrita
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        _write_fully(fd, data)
+        if config.FSYNC:
+            os.fsync(fd)
+        return os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+
+
+# Sufixo dos ficheiros substituídos por uma conversão (ex: partições, binário)
+RETIRED_SUFFIX = ".migrated"
+
+
+def retire(*paths):
+    """
+    Renomeia os ficheiros existentes para <ficheiro>.migrated.
+
+    Usado no fim de uma conversão, para que os ficheiros de origem não
+    voltem a ser lidos por engano.
+
+    Args:
+        paths: Caminhos dos ficheiros (os que não existem são ignorados)
+    """
+    for path in paths:
+        if os.path.exists(path):
+            os.replace(path, path + RETIRED_SUFFIX)
+
+
+# ==================== BLOQUEIO ENTRE PROCESSOS ====================
+
+class FileLock:
+    """
+    Bloqueio exclusivo (fcntl.flock) partilhado entre processos e threads.
+
+    Serve apenas para serializar os escritores: as leituras nunca o pedem,
+    porque cada escrita substitui o ficheiro de forma atómica. O bloqueio
+    é reentrante dentro do mesmo processo. Sem fcntl (Windows) só as
+    threads do próprio processo são serializadas.
+
+    Attributes:
+        path (str): Caminho do ficheiro de bloqueio
+    """
+
+    def __init__(self, path: str):
+        """
+        Inicializa o bloqueio associado a um ficheiro.
+
+        Args:
+            path: Caminho do ficheiro de bloqueio (criado se não existir)
+        """
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        """Obtém o bloqueio, esperando que outro escritor termine."""
+        self._thread_lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        """Liberta o bloqueio."""
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+
+# ==================== ARMAZENAMENTOS ====================
+
+
+class JsonFileStorage:
+    """
+    Armazenamento num ficheiro JSON (lista de dicionários).
+
+    Qualquer gravação reescreve o ficheiro completo. As alterações externas
+    são detetadas pela data de modificação e tamanho do ficheiro.
+
+    Attributes:
+        path (str): Caminho do ficheiro JSON
+        lenient (bool): Se True, um ficheiro com JSON inválido é lido como vazio
+    """
+
+    def __init__(self, path: str, lenient: bool = False):
+        """
+        Inicializa o armazenamento de um ficheiro.
+
+        Args:
+            path: Caminho do ficheiro JSON
+            lenient: Tratar JSON inválido como ficheiro vazio (default: False)
+        """
+        self.path = path
+        self.lenient = lenient
+        self._lock = FileLock(path + ".lock")
+
+    def lock(self) -> FileLock:
+        """
+        Obtém o bloqueio de escrita do ficheiro (usar com "with").
+
+        Returns:
+            FileLock: Bloqueio partilhado entre processos
+        """
+        return self._lock
+
+    def add_index(self, field: str):
+        """
+        Sem efeito: o ficheiro JSON não guarda índices.
+
+        Args:
+            field: Nome do campo indexado em memória
+        """
+
+    def stamp(self):
+        """
+        Obtém a assinatura atual do ficheiro no disco.
+
+        Returns:
+            tuple: (mtime em nanossegundos, tamanho), ou None se não existir
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def read(self) -> list:
+        """
+        Lê e interpreta o ficheiro JSON, criando-o vazio se não existir.
+
+        Returns:
+            list: Lista de dicionários (vazia se o ficheiro estiver vazio)
+        """
+        if not os.path.exists(self.path):
+            self.write_all([])
+        with open(self.path, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        try:
+            return json.loads(content) if content else []
+        except json.JSONDecodeError:
+            if self.lenient:
+                return []
+            raise
+
+    def write_all(self, records: list):
+        """
+        Escreve a lista de registos no ficheiro JSON (escrita atómica).
+
+        Args:
+            records: Lista de dicionários a gravar
+        """
+        # default=str permite serializar objetos datetime que não foram convertidos
+        content = json.dumps(records, indent=4, ensure_ascii=False, default=str)
+        atomic_write(self.path, content.encode("utf-8"))
+
+    def write_changes(self, changes: list, records):
+        """
+        Grava um lote de alterações.
+
+        O formato JSON não permite alterar um registo isolado, por isso o
+        ficheiro é reescrito uma vez com todos os registos.
+
+        Args:
+            changes: Lista de alterações a gravar
+            records: Todos os registos atuais (já com as alterações)
+        """
+        self.write_all(list(records))
+
+    def read_sequence(self):
+        """
+        Lê o último ID atribuído, guardado em <ficheiro>.seq.
+
+        Returns:
+            int: Último ID atribuído, ou None se a sequência não existir
+        """
+        try:
+            with open(self.path + ".seq", "r", encoding="utf-8") as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_sequence(self, value: int):
+        """
+        Guarda o último ID atribuído (escrita atómica).
+
+        Args:
+            value: Último ID atribuído
+        """
+        atomic_write(self.path + ".seq", str(value).encode("ascii"))
+
+
+class JournalStorage(JsonFileStorage):
+    """
+    Armazenamento JSON com diário append-only das alterações.
+
+    O ficheiro JSON funciona como snapshot. Cada gravação ou remoção de um
+    registo acrescenta uma linha JSON ao diário (<ficheiro>.journal), pelo
+    que o custo de escrita é proporcional ao registo e não ao histórico.
+    Na leitura, o estado é reconstruído aplicando o diário ao snapshot.
+
+    Quando o diário atinge config.JOURNAL_COMPACT_EVERY entradas, é escrito
+    um novo snapshot com todos os registos e o diário é esvaziado.
+
+    Attributes:
+        journal_path (str): Caminho do ficheiro do diário
+    """
+
+    def __init__(self, path: str, lenient: bool = False):
+        """
+        Inicializa o armazenamento de um ficheiro com diário.
+
+        Args:
+            path: Caminho do ficheiro JSON (snapshot)
+            lenient: Tratar JSON inválido como ficheiro vazio (default: False)
+        """
+        super().__init__(path, lenient)
+        self.journal_path = path + ".journal"
+        self._entries = 0       # Entradas atualmente no diário
+        self._replayed = None   # (assinatura do snapshot, posição lida, registos)
+
+    def stamp(self):
+        """
+        Obtém a assinatura do snapshot e do diário.
+
+        Returns:
+            tuple: (assinatura do snapshot, tamanho do diário)
+        """
+        try:
+            journal_size = os.stat(self.journal_path).st_size
+        except FileNotFoundError:
+            journal_size = 0
+        return (super().stamp(), journal_size)
+
+    def read(self) -> list:
+        """
+        Reconstrói os registos a partir do snapshot e do diário.
+
+        Se o snapshot não mudou desde a última leitura, só as entradas novas
+        do diário são interpretadas.
+
+        Returns:
+            list: Lista de dicionários
+        """
+        # Assinatura anterior à leitura: um snapshot substituído durante a
+        # leitura é relido da próxima vez
+        snapshot_stamp = super().stamp()
+        if self._replayed is None or self._replayed[0] != snapshot_stamp:
+            records = {r["id"]: r for r in super().read()}
+            offset = 0
+            self._entries = 0
+        else:
+            _, offset, records = self._replayed
+        offset = self._replay(records, offset)
+        self._replayed = (snapshot_stamp, offset, records)
+        return list(records.values())
+
+    def _replay(self, records: dict, offset: int) -> int:
+        """
+        Aplica aos registos as entradas do diário a partir de uma posição.
+
+        Uma última linha incompleta (escrita interrompida) é ignorada.
+
+        Args:
+            records: Dicionário ID -> registo a atualizar
+            offset: Posição (em bytes) a partir da qual ler
+
+        Returns:
+            int: Posição após a última entrada completa
+        """
+        try:
+            f = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return 0
+        with f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                entry = json.loads(line)
+                if entry["op"] == "put":
+                    records[entry["record"]["id"]] = entry["record"]
+                else:
+                    records.pop(entry["id"], None)
+                offset += len(line)
+                self._entries += 1
+        return offset
+
+    def write_changes(self, changes: list, records):
+        """
+        Acrescenta as alterações ao diário numa única escrita.
+
+        Compacta o diário se atingir o limite de entradas, ou se o lote
+        substituir todos os registos.
+
+        Args:
+            changes: Lista de alterações a gravar
+            records: Todos os registos atuais (usados na compactação)
+        """
+        if any(op == "all" for op, _ in changes):
+            self.write_all(list(records))
+            return
+
+        entries = [{"op": "put", "record": data} if op == "put" else {"op": "del", "id": data}
+                   for op, data in changes]
+        block = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+                        for entry in entries).encode("utf-8")
+        end = append_bytes(self.journal_path, block)
+        self._entries += len(entries)
+        if self._entries >= config.JOURNAL_COMPACT_EVERY:
+            self.write_all(list(records))
+            return
+
+        # Avançar a posição lida só se ninguém escreveu no diário entretanto;
+        # caso contrário a próxima leitura reaplica a partir da posição antiga
+        if self._replayed is not None and self._replayed[1] == end - len(block):
+            snapshot_stamp, _, cached = self._replayed
+            for entry in entries:
+                if entry["op"] == "put":
+                    cached[entry["record"]["id"]] = entry["record"]
+                else:
+                    cached.pop(entry["id"], None)
+            self._replayed = (snapshot_stamp, end, cached)
+
+    def write_all(self, records: list):
+        """
+        Escreve um novo snapshot e esvazia o diário (compactação).
+
+        O snapshot é escrito antes de esvaziar o diário: se o processo for
+        interrompido entre os dois passos, reaplicar o diário não altera nada.
+
+        Args:
+            records: Lista de dicionários a gravar
+        """
+        super().write_all(records)
+        atomic_write(self.journal_path, b"")
+        self._entries = 0
+        self._replayed = (super().stamp(), 0, {r["id"]: r for r in records})
+
+
+class SqliteStorage:
+    """
+    Armazenamento numa tabela SQLite.
+
+    Cada registo é uma linha com o ID como chave primária, o dicionário
+    completo em JSON e uma coluna indexada por cada campo com índice
+    secundário. Gravar ou remover um registo altera apenas a sua linha.
+
+    As alterações feitas por outras ligações são detetadas pelo
+    PRAGMA data_version.
+
+    Attributes:
+        db_path (str): Caminho do ficheiro da base de dados
+        table (str): Nome da tabela da entidade
+    """
+
+    # Ligações partilhadas, uma por base de dados
+    _connections = {}
+
+    def __init__(self, db_path: str, table: str):
+        """
+        Inicializa o armazenamento de uma tabela, criando-a se necessário.
+
+        Args:
+            db_path: Caminho do ficheiro da base de dados
+            table: Nome da tabela da entidade
+        """
+        self.db_path = db_path
+        self.table = table
+        self._columns = []
+        self._lock = FileLock(f"{db_path}.{table}.lock")
+        with self._connection() as connection:
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}" '
+                f'(id INTEGER PRIMARY KEY, data TEXT NOT NULL)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS "sequences" '
+                '(name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+
+    def _connection(self) -> "sqlite3.Connection":
+        """
+        Obtém a ligação partilhada à base de dados.
+
+        Returns:
+            sqlite3.Connection: Ligação aberta
+        """
+        connection = SqliteStorage._connections.get(self.db_path)
+        if connection is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            import sqlite3  # só carregado com o armazenamento SQLite
+            connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            SqliteStorage._connections[self.db_path] = connection
+        return connection
+
+    def lock(self) -> FileLock:
+        """
+        Obtém o bloqueio de escrita da tabela (usar com "with").
+
+        As leituras não o pedem: em modo WAL não esperam pelos escritores.
+
+        Returns:
+            FileLock: Bloqueio partilhado entre processos
+        """
+        return self._lock
+
+    def add_index(self, field: str):
+        """
+        Cria a coluna e o índice SQL de um campo com índice secundário.
+
+        Args:
+            field: Nome do campo a indexar
+        """
+        if field in self._columns:
+            return
+        connection = self._connection()
+        existing = {row[1] for row in connection.execute(f'PRAGMA table_info("{self.table}")')}
+        with connection:
+            if field not in existing:
+                connection.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{field}"')
+                connection.execute(
+                    f'UPDATE "{self.table}" SET "{field}" = json_extract(data, ?)',
+                    (f"$.{field}",)
+                )
+            connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{self.table}_{field}" '
+                f'ON "{self.table}" ("{field}")'
+            )
+        self._columns.append(field)
+
+    def stamp(self):
+        """
+        Obtém a versão atual dos dados vista por esta ligação.
+
+        Returns:
+            int: Valor do PRAGMA data_version
+        """
+        return self._connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def read(self) -> list:
+        """
+        Lê todos os registos da tabela, ordenados pelo ID.
+
+        Returns:
+            list: Lista de dicionários
+        """
+        rows = self._connection().execute(f'SELECT data FROM "{self.table}" ORDER BY id')
+        return [json.loads(data) for (data,) in rows]
+
+    def _row(self, record: dict) -> tuple:
+        """
+        Converte um registo nos valores de uma linha da tabela.
+
+        Args:
+            record: Dicionário do registo
+
+        Returns:
+            tuple: (id, data, colunas indexadas...)
+        """
+        data = json.dumps(record, ensure_ascii=False, default=str)
+        return (record["id"], data) + tuple(record.get(f) for f in self._columns)
+
+    def _upsert_sql(self) -> str:
+        """
+        Obtém a instrução SQL de inserção ou substituição de uma linha.
+
+        Returns:
+            str: Instrução INSERT OR REPLACE com todas as colunas
+        """
+        columns = ["id", "data"] + self._columns
+        names = ", ".join(f'"{c}"' for c in columns)
+        marks = ", ".join("?" for _ in columns)
+        return f'INSERT OR REPLACE INTO "{self.table}" ({names}) VALUES ({marks})'
+
+    def write_all(self, records: list):
+        """
+        Substitui todas as linhas da tabela numa única transação.
+
+        Args:
+            records: Lista de dicionários a gravar
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute(f'DELETE FROM "{self.table}"')
+            connection.executemany(self._upsert_sql(), [self._row(r) for r in records])
+
+    def write_changes(self, changes: list, records):
+        """
+        Grava um lote de alterações numa única transação.
+
+        Cada alteração individual escreve ou remove apenas a sua linha.
+
+        Args:
+            changes: Lista de alterações a gravar
+            records: Todos os registos atuais (usados se o lote substituir tudo)
+        """
+        if any(op == "all" for op, _ in changes):
+            self.write_all(list(records))
+            return
+        connection = self._connection()
+        with connection:
+            for op, data in changes:
+                if op == "put":
+                    connection.execute(self._upsert_sql(), self._row(data))
+                else:
+                    connection.execute(f'DELETE FROM "{self.table}" WHERE id = ?', (data,))
+
+    def read_sequence(self):
+        """
+        Lê o último ID atribuído, guardado na tabela "sequences".
+
+        Returns:
+            int: Último ID atribuído, ou None se a sequência não existir
+        """
+        row = self._connection().execute(
+            'SELECT value FROM "sequences" WHERE name = ?', (self.table,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def write_sequence(self, value: int):
+        """
+        Guarda o último ID atribuído.
+
+        Args:
+            value: Último ID atribuído
+        """
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO "sequences" (name, value) VALUES (?, ?)',
+                (self.table, value)
+            )
+
+
+def create_storage(path: str, lenient: bool = False):
+    """
+    Cria o armazenamento de uma entidade segundo a configuração.
+
+    Com STORAGE_BACKEND = "sqlite", a entidade é guardada numa tabela com o
+    nome do ficheiro JSON (ex: data/users.json -> tabela "users"). Com JSON,
+    as entidades em config.JOURNAL_ENTITIES usam diário append-only e as
+    entidades em config.BINARY_ENTITIES o formato binário em colunas, num
+    ficheiro .bin (ex: data/sports_items.bin), e as entidades em
+    config.PARTITIONED_ENTITIES partições mensais numa pasta (ex:
+    data/reservations/). Uma entidade já dividida em partições não pode ser
+    aberta como ficheiro JSON (ver partitions.merge), e o formato binário
+    tem de corresponder ao ficheiro que existe (ver columnar.json_to_binary).
+
+    Args:
+        path: Caminho do ficheiro JSON da entidade
+        lenient: Tratar JSON inválido como ficheiro vazio (apenas JSON)
+
+    Returns:
+        JsonFileStorage | JournalStorage | ColumnarStorage | PartitionedStorage |
+            SqliteStorage: Armazenamento configurado
+
+    Raises:
+        ValueError: Se o armazenamento configurado não existir, ou se os
+            dados da entidade estiverem noutro formato (partições ou binário)
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    if config.STORAGE_BACKEND == "sqlite":
+        return SqliteStorage(config.SQLITE_PATH, name)
+    if config.STORAGE_BACKEND != "json":
+        raise ValueError(f"Armazenamento desconhecido: {config.STORAGE_BACKEND}")
+    if name in config.BINARY_ENTITIES:
+        from .columnar import SCHEMAS, ColumnarStorage, binary_of
+        if not os.path.exists(binary_of(path)) and os.path.exists(path):
+            # Os dados ainda estão em JSON: não começar com o catálogo vazio
+            raise ValueError(
+                f"Os registos de {path} ainda não foram convertidos para o formato binário. "
+                f"Converta-os com 'python -m models.columnar to-binary {path}' "
+                f"ou retire {name} de BOOKING_BINARY.")
+        return ColumnarStorage(binary_of(path), SCHEMAS[name])
+    if name in config.PARTITIONED_ENTITIES:
+        from .partitions import FIELDS, PartitionedStorage
+        return PartitionedStorage(os.path.splitext(path)[0], *FIELDS[name], lenient=lenient)
+    if not os.path.exists(path):
+        from .columnar import binary_of
+        from .partitions import manifest_of
+        if os.path.exists(manifest_of(path)):
+            # Os dados foram divididos em partições: não começar do zero
+            raise ValueError(
+                f"Os registos de {path} estão em partições ({os.path.dirname(manifest_of(path))}). "
+                f"Defina BOOKING_PARTITIONED={name} ou junte-as com "
+                f"'python -m models.partitions merge'.")
+        if os.path.exists(binary_of(path)):
+            # Os dados foram convertidos para o formato binário: não voltar ao JSON antigo
+            raise ValueError(
+                f"Os registos de {path} estão no formato binário ({binary_of(path)}). "
+                f"Defina BOOKING_BINARY={name} ou converta-os com "
+                f"'python -m models.columnar to-json {binary_of(path)}'.")
+    if name in config.JOURNAL_ENTITIES:
+        return JournalStorage(path, lenient)
+    return JsonFileStorage(path, lenient)
@@ -0,0 +1,142 @@
+"""
+Módulo de unidades de trabalho (transações) sobre os repositórios.
+Permite agrupar várias gravações e escrever cada armazenamento uma única
+vez no fim, ou desfazer tudo em caso de erro.
+"""
+
+import threading
+from contextlib import ExitStack, contextmanager
+
+
+class UnitOfWork:
+    """
+    Unidade de trabalho que agrupa as alterações de vários repositórios.
+
+    Enquanto está ativa, as gravações (save/delete dos modelos) alteram apenas
+    a cache em memória e ficam pendentes. No commit, cada repositório afetado
+    escreve todas as suas alterações de uma só vez; no rollback, a cache é
+    reposta no estado inicial e nada é escrito.
+
+    A unidade ativa é guardada por thread.
+    """
+
+    _local = threading.local()
+
+    def __init__(self):
+        """Inicializa uma unidade de trabalho sem repositórios."""
+        self._snapshots = {}   # repositório -> estado antes da transação
+        self._deferred = {}    # chave -> função a executar após o commit
+
+    @classmethod
+    def current(cls):
+        """
+        Obtém a unidade de trabalho ativa nesta thread.
+
+        Returns:
+            UnitOfWork: Unidade ativa, ou None se não houver transação
+        """
+        return getattr(cls._local, "unit", None)
+
+    def enlist(self, repository):
+        """
+        Regista um repositório na transação (apenas na primeira alteração).
+
+        Guarda o estado da cache antes de qualquer alteração, para o rollback.
+
+        Args:
+            repository: Repositório que vai ser alterado
+        """
+        if repository not in self._snapshots:
+            self._snapshots[repository] = repository._begin()
+
+    def defer(self, callback, key=None):
+        """
+        Adia uma função para depois do commit (descartada no rollback).
+
+        Args:
+            callback: Função sem argumentos
+            key: Chave opcional; uma nova função com a mesma chave substitui
+                a anterior (ex: várias notificações do mesmo objeto)
+        """
+        if key is None:
+            key = object()
+        self._deferred.pop(key, None)
+        self._deferred[key] = callback
+
+    def commit(self):
+        """
+        Escreve as alterações pendentes de cada repositório afetado.
+
+        Os bloqueios de escrita de todos os armazenamentos são obtidos
+        primeiro (sempre pela mesma ordem, para evitar bloqueios mútuos entre
+        processos) e as versões de todos os repositórios são verificadas
+        antes de escrever o primeiro: um ConflictError desfaz a transação
+        sem nada escrito. Só um erro de escrita (ex: disco cheio) a meio
+        pode deixar escritos os repositórios anteriores; os restantes são
+        repostos e a exceção é propagada.
+        """
+        snapshots = list(self._snapshots.items())
+        repositories = sorted((repository for repository, _ in snapshots),
+                              key=lambda repository: repository.storage.lock().path)
+        try:
+            with ExitStack() as locks:
+                for repository in repositories:
+                    locks.enter_context(repository.storage.lock())
+                for repository in repositories:
+                    repository._prepare_commit()
+                for repository in repositories:
+                    repository._commit()
+        except BaseException:
+            for repository, snapshot in snapshots:
+                if repository._pending is not None:     # ainda não escrito
+                    repository._rollback(snapshot)
+            self._snapshots = {}
+            self._deferred = {}
+            raise
+        self._snapshots = {}
+
+        deferred, self._deferred = self._deferred, {}
+        for callback in deferred.values():
+            callback()
+
+    def rollback(self):
+        """Repõe a cache de cada repositório afetado sem escrever nada."""
+        for repository, snapshot in self._snapshots.items():
+            repository._rollback(snapshot)
+        self._snapshots = {}
+        self._deferred = {}
+
+
+@contextmanager
+def transaction():
+    """
+    Executa um bloco de gravações como uma única unidade de trabalho.
+
+    Exemplo:
+        with transaction():
+            reservation = Reservation.create(...)
+            reservation.add_item(item)
+            reservation.confirm()
+
+    Se o bloco terminar sem erros, cada armazenamento afetado é escrito uma
+    única vez. Se for lançada uma exceção, as alterações são desfeitas e a
+    exceção é propagada. Transações encadeadas juntam-se à exterior.
+
+    Yields:
+        UnitOfWork: Unidade de trabalho ativa
+    """
+    outer = UnitOfWork.current()
+    if outer is not None:
+        yield outer
+        return
+
+    unit = UnitOfWork()
+    UnitOfWork._local.unit = unit
+    try:
+        yield unit
+    except BaseException:
+        UnitOfWork._local.unit = None
+        unit.rollback()
+        raise
+    UnitOfWork._local.unit = None
+    unit.commit()
@@ -7,6 +7,73 @@ import json
 import os
 from abc import ABC, abstractmethod
 
+from . import events, passwords
+from .repository import ConflictError, Repository
+
+
+class EmailInUseError(Exception):
+    """
+    Erro lançado ao gravar um utilizador com um email já registado.
+    
+    A comparação ignora maiúsculas/minúsculas (ver User.normalize_email).
+    """
+    
+    def __init__(self, email: str):
+        super().__init__(f"O email {email} já está registado.")
+        self.email = email
+
+
+class EmailIndex:
+    """
+    Índice email normalizado -> ID do utilizador.
+    
+    Estrutura derivada do repositório de utilizadores (ver Repository.attach),
+    atualizada a cada gravação. Se existirem emails repetidos em dados
+    antigos, fica o primeiro utilizador (como na pesquisa sequencial).
+    """
+    
+    def __init__(self):
+        """Inicializa o índice vazio."""
+        self._ids = {}
+    
+    def reset(self, records):
+        """
+        Reconstrói o índice a partir de todos os utilizadores.
+        
+        Args:
+            records: Dicionários dos utilizadores
+        """
+        self._ids = {}
+        for record in records:
+            self._ids.setdefault(User.normalize_email(record["email"]), record["id"])
+    
+    def update(self, old, new):
+        """
+        Atualiza o email de um utilizador criado, alterado ou removido.
+        
+        Args:
+            old: Registo antes da alteração (ou None)
+            new: Registo depois da alteração (ou None)
+        """
+        if old is not None:
+            key = User.normalize_email(old["email"])
+            if self._ids.get(key) == old["id"]:
+                del self._ids[key]
+        if new is not None:
+            self._ids.setdefault(User.normalize_email(new["email"]), new["id"])
+    
+    def get(self, email: str):
+        """
+        Procura o ID do utilizador com um email.
+        
+        Args:
+            email: Email (qualquer capitalização)
+            
+        Returns:
+            int: ID do utilizador, ou None se o email não estiver registado
+        """
+        return self._ids.get(User.normalize_email(email))
+
 
 class User(ABC):
     """
@@ -24,7 +91,8 @@ class User(ABC):
             id:  Identificador único do utilizador
             name: Nome completo
             email: Email (usado para login)
-            password: Password (armazenada em texto simples - melhorar em produção)
+            password: Password guardada (hash, ver passwords.hash_password; texto
+                simples em dados antigos, convertido no primeiro login)
         """
         self._id = id
         self._name = name
@@ -48,8 +116,27 @@ class User(ABC):
     # ==================== MÉTODOS DE INSTÂNCIA ====================
     
     def login(self, email: str, password: str) -> bool:
-        """Verifica as credenciais de login."""
-        return self._email == email and self._password == password
+        """
+        Verifica as credenciais de login (o email ignora maiúsculas/minúsculas).
+        
+        A verificação da password é lenta por definição (ver models.passwords):
+        a interface deve chamar este método fora da thread do Tkinter. Após
+        um login válido, uma password em texto simples ou com um custo
+        diferente do configurado é convertida e gravada.
+        """
+        if User.normalize_email(self._email) != User.normalize_email(email):
+            return False
+        if not passwords.verify_password(password, self._password):
+            return False
+        if passwords.needs_rehash(self._password):
+            self._password = passwords.hash_password(password)
+            try:
+                self.save()
+            except (ConflictError, EmailInUseError, OSError):
+                # Registo alterado entretanto, email duplicado em dados antigos
+                # ou erro de escrita: a conversão fica para o próximo login
+                pass
+        return True
     
     @abstractmethod
     def get_type(self) -> str:
@@ -62,19 +149,23 @@ class User(ABC):
         pass
     
     def save(self):
-        """Guarda ou atualiza este utilizador no ficheiro JSON."""
-        users = User._load_all()
+        """
+        Guarda ou atualiza este utilizador no ficheiro JSON.
         
-        # Atualizar se já existe
-        for i, u in enumerate(users):
-            if u["id"] == self._id:
-                users[i] = self. to_dict()
-                User._save_all(users)
-                return
+        A verificação do email e a gravação são feitas sob o bloqueio do
+        armazenamento, que é partilhado entre processos: dois registos em
+        simultâneo com o mesmo email não podem ser ambos gravados.
         
-        # Adicionar novo
-        users.append(self.to_dict())
-        User._save_all(users)
+        Raises:
+            EmailInUseError: Se outro utilizador já tiver este email
+        """
+        repository = User._repository()
+        with repository.lock, repository.storage.lock():
+            owner = User.emails().get(self._email)
+            if owner is not None and owner != self._id:
+                raise EmailInUseError(self._email)
+            repository.upsert(self.to_dict(), self)
+        events.publish(events.SAVED, self)
     
     # ==================== MÉTODOS ESTÁTICOS (PERSISTÊNCIA) ====================
     
@@ -86,47 +177,72 @@ class User(ABC):
             with open(User.DATA_FILE, "w", encoding="utf-8") as f:
                 json.dump([], f)
     
+    @staticmethod
+    def _repository() -> Repository:
+        """Obtém o repositório partilhado do ficheiro de utilizadores."""
+        # lenient: um ficheiro inválido é tratado como vazio (comportamento original)
+        return Repository.for_file(User.DATA_FILE, lenient=True)
+    
     @staticmethod
     def _load_all() -> list:
         """Carrega todos os utilizadores do ficheiro JSON."""
         User._ensure_file()
-        try:
-            with open(User. DATA_FILE, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                return json.loads(content) if content else []
-        except json.JSONDecodeError:
-            return []
+        return User._repository().load()
     
     @staticmethod
     def _save_all(users: list):
         """Guarda a lista de utilizadores no ficheiro JSON."""
         User._ensure_file()
-        with open(User.DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(users, f, indent=4, ensure_ascii=False)
+        User._repository().save(users)
+    
+    @staticmethod
+    def warm_up() -> int:
+        """Lê os utilizadores para a cache partilhada (ver models.warmup)."""
+        User.emails()
+        return len(User._repository().ids())
     
     @staticmethod
     def get_next_id() -> int:
-        """Obtém o próximo ID disponível."""
-        users = User._load_all()
-        return max((u["id"] for u in users), default=0) + 1
+        """Reserva o próximo ID da sequência."""
+        return User._repository().next_ids()[0]
+    
+    @staticmethod
+    def normalize_email(email: str) -> str:
+        """Normaliza um email para comparação (sem espaços, casefold)."""
+        return email.strip().casefold()
+    
+    @staticmethod
+    def emails() -> EmailIndex:
+        """Obtém o índice de emails, recarregando os utilizadores se o ficheiro mudou."""
+        User._ensure_file()
+        repository = User._repository()
+        with repository.lock:
+            repository.refresh()
+            return repository.attach("emails", EmailIndex)
     
     @staticmethod
     def find_by_email(email: str):
-        """Procura um utilizador pelo email."""
-        users = User._load_all()
-        for u in users: 
-            if u["email"] == email:
-                return User. from_dict(u)
-        return None
+        """Procura um utilizador pelo email (ignora maiúsculas/minúsculas)."""
+        repository = User._repository()
+        with repository.lock:
+            user_id = User.emails().get(email)
+            return repository.find(user_id, User.from_dict) if user_id is not None else None
+    
+    @staticmethod
+    def authenticate(email: str, password: str):
+        """Procura o utilizador e verifica a password; devolve o utilizador ou None."""
+        user = User.find_by_email(email)
+        return user if user is not None and user.login(email, password) else None
     
     @staticmethod
     def find_by_id(user_id: int):
         """Procura um utilizador pelo ID."""
-        users = User._load_all()
-        for u in users:
-            if u["id"] == user_id:
-                return User.from_dict(u)
-        return None
+        return User._repository().find(user_id, User.from_dict)
+    
+    @staticmethod
+    def find_many(user_ids) -> list:
+        """Obtém os utilizadores de uma lista de IDs, ignorando os inexistentes."""
+        return User._repository().find_many(user_ids, User.from_dict)
     
     @staticmethod
     def from_dict(data: dict):
@@ -190,9 +306,10 @@ class Client(User):
     @staticmethod
     def create(name: str, email: str, password: str,
                address: str, phone:  str) -> 'Client':
-        """Cria e guarda um novo cliente."""
+        """Cria e guarda um novo cliente (a password é guardada com hash)."""
         new_id = User.get_next_id()
-        client = Client(new_id, name, email, password, address, phone)
+        client = Client(new_id, name, email, passwords.hash_password(password),
+                        address, phone)
         client.save()
         return client
 
@@ -225,8 +342,9 @@ class Administrator(User):
     @staticmethod
     def create(name: str, email: str, password: str,
                access_level: int = 1) -> 'Administrator':
-        """Cria e guarda um novo administrador."""
+        """Cria e guarda um novo administrador (a password é guardada com hash)."""
         new_id = User.get_next_id()
-        admin = Administrator(new_id, name, email, password, access_level)
+        admin = Administrator(new_id, name, email, passwords.hash_password(password),
+                              access_level)
         admin.save()
         return admin
\ No newline at end of file
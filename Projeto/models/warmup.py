@@ -0,0 +1,76 @@
+"""
+Pré-carregamento dos ficheiros de dados.
+
+Lê todos os ficheiros de dados uma única vez, em threads paralelas, para
+os repositórios partilhados, e prepara as estruturas derivadas (memória
+de categorias, tabela de preços e motor de disponibilidade). As views
+obtêm depois os dados desses repositórios sem voltar a ler os ficheiros.
+
+Utilização (ver main.py): iniciar com start() quando o ecrã de login é
+mostrado, para que a leitura decorra enquanto o utilizador se autentica.
+Os módulos dos modelos só são importados na thread de fundo.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+def default_models() -> tuple:
+    """
+    Obtém os modelos pré-carregados (um ficheiro de dados cada).
+
+    Returns:
+        tuple: User, Category, SportsItem e Reservation
+    """
+    from .category import Category
+    from .reservation import Reservation
+    from .sports_item import SportsItem
+    from .user import User
+    return (User, Category, SportsItem, Reservation)
+
+
+def warm_up(models: tuple = None) -> dict:
+    """
+    Lê os ficheiros de dados dos modelos em paralelo.
+
+    Cada ficheiro é lido numa thread própria. Uma view que peça os dados
+    de um modelo durante a leitura espera pelo bloqueio do repositório e
+    recebe os registos já lidos, sem segunda leitura.
+
+    Args:
+        models: Modelos a pré-carregar (default: default_models())
+
+    Returns:
+        dict: Ficheiro de dados -> número de registos carregados
+
+    Raises:
+        Exception: O primeiro erro de leitura (ex: JSON inválido)
+    """
+    models = models or default_models()
+    with ThreadPoolExecutor(max_workers=len(models),
+                            thread_name_prefix="warm-up") as pool:
+        futures = {model.DATA_FILE: pool.submit(model.warm_up) for model in models}
+    return {path: future.result() for path, future in futures.items()}
+
+
+def start(models: tuple = None) -> Future:
+    """
+    Inicia o pré-carregamento numa thread de fundo, sem bloquear a interface.
+
+    Args:
+        models: Modelos a pré-carregar (default: default_models())
+
+    Returns:
+        Future: Resultado de warm_up (ou o erro de leitura)
+    """
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(warm_up(models))
+        except Exception as error:
+            future.set_exception(error)
+
+    # Thread daemon: fechar a aplicação não espera pelo pré-carregamento
+    threading.Thread(target=run, name="warm-up", daemon=True).start()
+    return future
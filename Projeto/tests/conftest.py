@@ -0,0 +1,16 @@
+"""
+Configuração comum dos testes dos modelos.
+
+Os testes usam ficheiros numa pasta temporária e não sincronizam com o
+disco (config.FSYNC), para serem rápidos.
+"""
+
+import pytest
+
+from models import config
+
+
+@pytest.fixture(autouse=True)
+def no_fsync(monkeypatch):
+    """Desativa o fsync das escritas atómicas durante os testes."""
+    monkeypatch.setattr(config, "FSYNC", False)
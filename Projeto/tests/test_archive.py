@@ -0,0 +1,77 @@
+"""
+Testes do arquivo das reservas encerradas (models/archive.py).
+"""
+
+import random
+
+import pytest
+
+from models import archive
+from models.archive import ReservationArchive
+
+
+def closed(reservation_id: int, client_id: int, state: str = "Completed") -> dict:
+    """Cria o registo de uma reserva encerrada."""
+    return {"id": reservation_id, "client_id": client_id, "state": state,
+            "start_date": "2026-10-01T10:00:00", "end_date": "2026-10-01T11:00:00",
+            "item_ids": [1], "total_value": 4.5, "version": 2}
+
+
+class Archived:
+    """Objeto mínimo criado a partir de um registo arquivado."""
+
+    def __init__(self, record: dict):
+        self.id = record["id"]
+
+
+@pytest.fixture(params=[False, True], ids=["log", "merged"])
+def small_tail(request, monkeypatch):
+    """Corre cada teste com as linhas no .log e com junções frequentes ao índice."""
+    if request.param:
+        monkeypatch.setattr(archive, "TAIL_MIN", 4)
+        monkeypatch.setattr(archive, "TAIL_RATIO", 2)
+
+
+def test_append_and_lookup(tmp_path, small_tail):
+    """As reservas arquivadas são encontradas por ID, cliente e estado."""
+    rnd = random.Random(7)
+    path = str(tmp_path / "reservations.archive")
+    records = {}
+    for batch in range(20):
+        new = [closed(i, rnd.randrange(1, 5), rnd.choice(["Completed", "Cancelled"]))
+               for i in rnd.sample(range(101, 1000), 10) if i not in records]
+        assert ReservationArchive(path).append(new) == len(new)
+        records.update((r["id"], r) for r in new)
+
+    reader = ReservationArchive(path)
+    assert reader.ids() == sorted(records)
+    for client_id in range(1, 5):
+        for state in (None, "Completed", "Cancelled"):
+            assert reader.ids(client_id, state) == sorted(
+                i for i, r in records.items()
+                if r["client_id"] == client_id and state in (None, r["state"]))
+    assert reader.ids(state="Pending") == []
+    for record_id in rnd.sample(sorted(records), 20):
+        assert reader.get(record_id) == records[record_id]
+    assert reader.get(1) is None
+
+
+def test_append_ignores_archived_and_rejects_active(tmp_path, small_tail):
+    """Repetir um arquivamento não duplica reservas; reservas ativas são recusadas."""
+    path = str(tmp_path / "reservations.archive")
+    store = ReservationArchive(path)
+    assert store.append([closed(101, 1), closed(102, 2, "Cancelled")]) == 2
+    assert store.append([closed(101, 1)]) == 0
+    with pytest.raises(ValueError):
+        store.append([closed(103, 1, "Confirmed")])
+    assert ReservationArchive(path).ids() == [101, 102]
+
+
+def test_find_many_keeps_order_and_identity(tmp_path):
+    """find_many devolve os objetos pela ordem pedida e memoriza-os."""
+    store = ReservationArchive(str(tmp_path / "reservations.archive"))
+    store.append([closed(101, 1), closed(102, 2)])
+    found = store.find_many([102, 999, 101], Archived)
+    assert [r.id for r in found] == [102, 101]
+    assert found[0]._version == 2
+    assert store.find_many([101], Archived)[0] is found[1]
@@ -0,0 +1,127 @@
+"""
+Testes do motor de disponibilidade (models/availability.py).
+
+As respostas do índice são comparadas com uma verificação exaustiva sobre
+todas as reservas.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.availability import AvailabilityIndex
+
+BASE = datetime(2026, 11, 2, 8, 0)
+ITEMS = range(1, 7)
+
+
+def random_reservation(rnd: random.Random, reservation_id: int) -> dict:
+    """Cria uma reserva aleatória (alinhada ou não com a grelha de 15 minutos)."""
+    step = 15 if rnd.random() < 0.7 else 7
+    start = BASE + timedelta(minutes=step * rnd.randrange(0, 600))
+    end = start + timedelta(minutes=step * rnd.randrange(1, 40))
+    return {
+        "id": reservation_id,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "item_ids": rnd.sample(ITEMS, rnd.randrange(1, 3)),
+        "state": rnd.choice(["Pending", "Confirmed", "Confirmed", "Cancelled", "Completed"]),
+    }
+
+
+def brute_force_free(records, item_id, start, end, ignore_reservation=None) -> bool:
+    """Verifica a disponibilidade percorrendo todas as reservas."""
+    for record in records:
+        if (record["id"] == ignore_reservation or item_id not in record["item_ids"]
+                or record["state"] not in AvailabilityIndex.ACTIVE_STATES):
+            continue
+        if (datetime.fromisoformat(record["start_date"]) < end
+                and datetime.fromisoformat(record["end_date"]) > start):
+            return False
+    return True
+
+
+def random_queries(rnd: random.Random, count: int):
+    """Gera períodos de consulta, alinhados e não alinhados."""
+    for _ in range(count):
+        step = 15 if rnd.random() < 0.5 else 1
+        start = BASE + timedelta(minutes=step * rnd.randrange(0, 9000 // step))
+        yield start, start + timedelta(minutes=step * rnd.randrange(1, 600 // step))
+
+
+@pytest.fixture
+def rnd():
+    """Gerador aleatório com semente fixa (resultados reprodutíveis)."""
+    return random.Random(2026)
+
+
+def test_is_free_matches_brute_force(rnd):
+    """is_free (mapa de bits e intervalos) coincide com a verificação exaustiva."""
+    records = [random_reservation(rnd, i) for i in range(101, 401)]
+    index = AvailabilityIndex()
+    index.reset(records)
+    for start, end in random_queries(rnd, 2000):
+        item_id = rnd.choice(ITEMS)
+        assert index.is_free(item_id, start, end) == brute_force_free(records, item_id, start, end)
+
+
+def test_is_free_ignoring_own_reservation(rnd):
+    """Uma reserva não ocupa os próprios artigos quando é ignorada."""
+    records = [random_reservation(rnd, i) for i in range(101, 301)]
+    index = AvailabilityIndex()
+    index.reset(records)
+    for start, end in random_queries(rnd, 1000):
+        item_id, ignored = rnd.choice(ITEMS), rnd.choice(records)["id"]
+        assert (index.is_free(item_id, start, end, ignore_reservation=ignored)
+                == brute_force_free(records, item_id, start, end, ignored))
+
+
+def test_free_items_matches_brute_force(rnd):
+    """free_items devolve exatamente os artigos livres, pela ordem recebida."""
+    records = [random_reservation(rnd, i) for i in range(101, 401)]
+    index = AvailabilityIndex()
+    index.reset(records)
+    candidates = list(reversed(ITEMS))
+    for start, end in random_queries(rnd, 500):
+        expected = [i for i in candidates if brute_force_free(records, i, start, end)]
+        assert index.free_items(candidates, start, end) == expected
+
+
+def test_updates_match_rebuild(rnd):
+    """Gravações e remoções incrementais dão o mesmo índice que uma reconstrução."""
+    index = AvailabilityIndex()
+    index.reset([])
+    records = {}
+    for step in range(1500):
+        reservation_id = rnd.randrange(101, 251)
+        old = records.get(reservation_id)
+        new = None if old is not None and rnd.random() < 0.25 else random_reservation(rnd, reservation_id)
+        index.update(old, new)
+        if new is None:
+            del records[reservation_id]
+        else:
+            records[reservation_id] = new
+
+        if step % 100 == 0:
+            rebuilt = AvailabilityIndex()
+            rebuilt.reset(records.values())
+            assert index._intervals == rebuilt._intervals
+            assert index._max_ends == rebuilt._max_ends
+
+    for start, end in random_queries(rnd, 1000):
+        item_id = rnd.choice(ITEMS)
+        assert (index.is_free(item_id, start, end)
+                == brute_force_free(records.values(), item_id, start, end))
+
+
+def test_reservations_of(rnd):
+    """reservations_of encontra as reservas ativas dos artigos a partir de uma data."""
+    records = [random_reservation(rnd, i) for i in range(101, 301)]
+    index = AvailabilityIndex()
+    index.reset(records)
+    since = BASE + timedelta(days=3)
+    expected = {r["id"] for r in records
+                if r["state"] in AvailabilityIndex.ACTIVE_STATES and {1, 2} & set(r["item_ids"])
+                and datetime.fromisoformat(r["start_date"]) >= since}
+    assert index.reservations_of([1, 2], since=since) == expected
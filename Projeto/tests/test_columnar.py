@@ -0,0 +1,95 @@
+"""
+Testes do formato binário em colunas (models/columnar.py).
+"""
+
+import json
+import os
+
+import pytest
+
+from models import config
+from models.columnar import (SCHEMAS, ColumnarStorage, binary_to_json, encode,
+                             json_to_binary)
+from models.storage import RETIRED_SUFFIX, JsonFileStorage, create_storage
+
+ITEMS = [
+    {"id": 1, "name": "Bola de Futebol", "brand": "Adidas", "price_per_hour": 2.5,
+     "available": True, "category_id": 1, "version": 3},
+    {"id": 2, "name": "Raquete de Ténis", "brand": "Wilson", "price_per_hour": 4.0,
+     "available": False, "category_id": 2},
+    {"id": 5, "name": "Bola de Futebol", "brand": "Adidas", "price_per_hour": 3,
+     "available": True},
+]
+
+
+def test_storage_round_trip(tmp_path):
+    """Os registos escritos no formato binário são lidos iguais."""
+    storage = ColumnarStorage(str(tmp_path / "sports_items.bin"), SCHEMAS["sports_items"])
+    assert storage.read() == []
+    storage.write_all(ITEMS)
+    assert [dict(record) for record in storage.read()] == ITEMS
+
+
+def test_record_fields_are_lazy_mappings(tmp_path):
+    """Os registos lidos comportam-se como dicionários, sem os campos em falta."""
+    storage = ColumnarStorage(str(tmp_path / "sports_items.bin"), SCHEMAS["sports_items"])
+    storage.write_all(ITEMS)
+    record = storage.read()[2]
+    assert record["name"] == "Bola de Futebol"
+    assert record.get("category_id") is None
+    assert "version" not in record
+    with pytest.raises(KeyError):
+        record["category_id"]
+
+
+@pytest.mark.parametrize("price", [None, "3.50"])
+def test_encode_rejects_invalid_real(price):
+    """Um preço em falta ou não numérico é recusado com o ID e o campo."""
+    record = dict(ITEMS[0], id=7, price_per_hour=price)
+    with pytest.raises(ValueError, match=r"#7.*price_per_hour"):
+        encode(ITEMS + [record], SCHEMAS["sports_items"])
+
+
+def test_encode_rejects_unknown_field():
+    """Um campo sem coluna no esquema é recusado."""
+    with pytest.raises(ValueError):
+        encode([dict(ITEMS[0], colour="azul")], SCHEMAS["sports_items"])
+
+
+def test_conversion_round_trip(tmp_path):
+    """JSON -> binário -> JSON preserva os registos e a sequência de IDs."""
+    json_path = str(tmp_path / "sports_items.json")
+    source = JsonFileStorage(json_path)
+    source.write_all(ITEMS)
+    source.write_sequence(9)
+
+    assert json_to_binary(json_path) == len(ITEMS)
+    binary_path = str(tmp_path / "sports_items.bin")
+    assert not os.path.exists(json_path)
+    assert os.path.exists(json_path + RETIRED_SUFFIX)
+    assert ColumnarStorage(binary_path, ()).read_sequence() == 9
+
+    assert binary_to_json(binary_path) == len(ITEMS)
+    assert not os.path.exists(binary_path)
+    with open(json_path, "r", encoding="utf-8") as f:
+        assert json.load(f) == ITEMS
+    assert JsonFileStorage(json_path).read_sequence() == 9
+
+
+def test_create_storage_refuses_mismatched_format(tmp_path, monkeypatch):
+    """A configuração tem de corresponder ao ficheiro que existe."""
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "json")
+    json_path = str(tmp_path / "sports_items.json")
+    JsonFileStorage(json_path).write_all(ITEMS)
+
+    # Formato binário configurado, mas só existe o JSON
+    monkeypatch.setattr(config, "BINARY_ENTITIES", ("sports_items",))
+    with pytest.raises(ValueError, match="models.columnar"):
+        create_storage(json_path)
+
+    # Convertido para binário, mas a configuração voltou ao JSON
+    json_to_binary(json_path)
+    assert isinstance(create_storage(json_path), ColumnarStorage)
+    monkeypatch.setattr(config, "BINARY_ENTITIES", ())
+    with pytest.raises(ValueError, match="BOOKING_BINARY"):
+        create_storage(json_path)
@@ -0,0 +1,122 @@
+"""
+Testes do armazenamento em partições mensais (models/partitions.py).
+"""
+
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from models import config
+from models.partitions import FIELDS, PartitionedStorage, manifest_of, merge, split
+from models.storage import RETIRED_SUFFIX, JournalStorage, JsonFileStorage, create_storage
+
+
+def reservation(reservation_id: int, start: str, end: str, state: str = "Confirmed") -> dict:
+    """Cria o registo de uma reserva."""
+    return {"id": reservation_id, "client_id": 2, "start_date": start, "end_date": end,
+            "item_ids": [1], "total_value": 5.0, "state": state, "version": 1}
+
+
+RESERVATIONS = [
+    reservation(101, "2026-09-30T20:00:00", "2026-10-01T10:00:00"),
+    reservation(102, "2026-10-05T10:00:00", "2026-10-05T12:00:00"),
+    reservation(103, "2026-11-02T09:00:00", "2026-11-02T10:00:00", "Pending"),
+    reservation(104, "2026-12-20T09:00:00", "2026-12-20T10:00:00"),
+]
+
+
+def by_id(records) -> list:
+    """Ordena os registos lidos pelo ID."""
+    return sorted(records, key=lambda r: r["id"])
+
+
+def open_storage(directory) -> PartitionedStorage:
+    """Cria o armazenamento das partições de reservas numa pasta."""
+    return PartitionedStorage(str(directory), *FIELDS["reservations"])
+
+
+def test_round_trip(tmp_path):
+    """Os registos são divididos por mês e lidos iguais por outra instância."""
+    directory = tmp_path / "reservations"
+    storage = open_storage(directory)
+    storage.write_all(RESERVATIONS)
+    assert sorted(os.listdir(directory)) == [
+        "2026-09.json", "2026-10.json", "2026-11.json", "2026-12.json", "manifest.json"]
+    assert by_id(open_storage(directory).read()) == RESERVATIONS
+
+
+def test_write_changes_moves_between_partitions(tmp_path):
+    """Mudar o mês de uma reserva retira-a da partição antiga."""
+    directory = tmp_path / "reservations"
+    storage = open_storage(directory)
+    storage.write_all(RESERVATIONS)
+    storage.read()
+
+    moved = dict(RESERVATIONS[1], start_date="2026-11-20T10:00:00",
+                 end_date="2026-11-20T11:00:00", version=2)
+    records = [moved if r["id"] == 102 else r for r in RESERVATIONS if r["id"] != 104]
+    storage.write_changes([("put", moved), ("del", 104)], records)
+
+    other = open_storage(directory)
+    assert by_id(other.read()) == by_id(records)
+    with open(directory / "2026-10.json", "r", encoding="utf-8") as f:
+        assert json.load(f) == []
+
+
+def test_read_range_skips_other_months(tmp_path):
+    """read_range só devolve os registos das partições que intersetam o período."""
+    storage = open_storage(tmp_path / "reservations")
+    storage.write_all(RESERVATIONS)
+    cold = open_storage(tmp_path / "reservations")
+    found = cold.read_range(datetime(2026, 10, 1), datetime(2026, 10, 31))
+    # A reserva de setembro termina em outubro: a sua partição também é lida
+    assert {r["id"] for r in found} == {101, 102}
+    assert set(cold._partitions) == {"2026-09", "2026-10"}
+
+
+def test_split_merge_round_trip(tmp_path):
+    """JSON -> partições -> JSON preserva os registos, o diário e a sequência."""
+    json_path = str(tmp_path / "reservations.json")
+    source = JournalStorage(json_path)
+    source.write_all(RESERVATIONS[:3])
+    source.write_changes([("put", RESERVATIONS[3])], RESERVATIONS)   # só no diário
+    source.write_sequence(104)
+
+    assert split(json_path) == len(RESERVATIONS)
+    for path in (json_path, source.journal_path, json_path + ".seq"):
+        assert not os.path.exists(path)
+        assert os.path.exists(path + RETIRED_SUFFIX)
+    directory = str(tmp_path / "reservations")
+    assert open_storage(directory).read_sequence() == 104
+
+    assert merge(directory) == len(RESERVATIONS)
+    assert not os.path.exists(manifest_of(json_path))
+    with open(json_path, "r", encoding="utf-8") as f:
+        assert json.load(f) == RESERVATIONS
+    assert JsonFileStorage(json_path).read_sequence() == 104
+
+
+def test_legacy_file_imported_on_first_read(tmp_path):
+    """Sem manifesto, a primeira leitura divide o ficheiro JSON da entidade."""
+    json_path = str(tmp_path / "reservations.json")
+    JsonFileStorage(json_path).write_all(RESERVATIONS)
+    assert by_id(open_storage(tmp_path / "reservations").read()) == RESERVATIONS
+    assert not os.path.exists(json_path)
+    assert os.path.exists(manifest_of(json_path))
+
+
+def test_create_storage_refuses_json_after_split(tmp_path, monkeypatch):
+    """Depois da divisão, o JSON não é aberto sem BOOKING_PARTITIONED."""
+    monkeypatch.setattr(config, "STORAGE_BACKEND", "json")
+    monkeypatch.setattr(config, "BINARY_ENTITIES", ())
+    json_path = str(tmp_path / "reservations.json")
+    JsonFileStorage(json_path).write_all(RESERVATIONS)
+    split(json_path)
+
+    monkeypatch.setattr(config, "PARTITIONED_ENTITIES", ())
+    with pytest.raises(ValueError, match="BOOKING_PARTITIONED"):
+        create_storage(json_path)
+    monkeypatch.setattr(config, "PARTITIONED_ENTITIES", ("reservations",))
+    assert by_id(create_storage(json_path).read()) == RESERVATIONS
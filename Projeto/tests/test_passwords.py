@@ -0,0 +1,72 @@
+"""
+Testes do hash das passwords (models/passwords.py).
+
+Os custos são reduzidos para os testes serem rápidos.
+"""
+
+import pytest
+
+from models import config, passwords
+
+
+@pytest.fixture(autouse=True)
+def low_cost(monkeypatch):
+    """Usa custos baixos de scrypt e PBKDF2."""
+    monkeypatch.setattr(config, "SCRYPT_COST", 2 ** 4)
+    monkeypatch.setattr(config, "PBKDF2_ITERATIONS", 1000)
+    monkeypatch.setattr(config, "PASSWORD_SCHEME", "scrypt")
+
+
+@pytest.mark.parametrize("scheme", ["scrypt", "pbkdf2"])
+def test_verify_password(scheme):
+    """A password certa é aceite e uma errada é recusada."""
+    stored = passwords.hash_password("segredo123", scheme=scheme)
+    assert passwords.is_hashed(stored)
+    assert "segredo123" not in stored
+    assert passwords.verify_password("segredo123", stored)
+    assert not passwords.verify_password("segredo124", stored)
+    # A verificação memorizada não aceita outra password
+    assert passwords.verify_password("segredo123", stored)
+    assert not passwords.verify_password("", stored)
+
+
+def test_hash_uses_random_salt():
+    """A mesma password dá hashes diferentes (sal aleatório)."""
+    assert passwords.hash_password("segredo123") != passwords.hash_password("segredo123")
+
+
+def test_verify_plaintext_password():
+    """As passwords antigas em texto simples continuam a ser verificadas."""
+    assert passwords.verify_password("admin", "admin")
+    assert not passwords.verify_password("Admin", "admin")
+
+
+def test_needs_rehash_plaintext():
+    """Uma password em texto simples deve ser convertida."""
+    assert passwords.needs_rehash("admin")
+
+
+def test_needs_rehash_current():
+    """Uma password com o algoritmo e custo configurados não muda."""
+    assert not passwords.needs_rehash(passwords.hash_password("segredo123"))
+
+
+def test_needs_rehash_cost_changed(monkeypatch):
+    """Uma password com um custo diferente do configurado deve ser convertida."""
+    stored = passwords.hash_password("segredo123")
+    monkeypatch.setattr(config, "SCRYPT_COST", 2 ** 5)
+    assert passwords.needs_rehash(stored)
+
+
+def test_needs_rehash_scheme_changed(monkeypatch):
+    """Uma password com outro algoritmo deve ser convertida."""
+    stored = passwords.hash_password("segredo123", scheme="scrypt")
+    monkeypatch.setattr(config, "PASSWORD_SCHEME", "pbkdf2")
+    assert passwords.needs_rehash(stored)
+    assert not passwords.needs_rehash(passwords.hash_password("segredo123"))
+
+
+def test_unknown_scheme():
+    """Um algoritmo desconhecido é recusado."""
+    with pytest.raises(ValueError):
+        passwords.hash_password("segredo123", scheme="md5")
@@ -0,0 +1,153 @@
+"""
+Testes do repositório partilhado (models/repository.py).
+
+Dois repositórios sobre o mesmo ficheiro simulam dois processos.
+"""
+
+import threading
+
+import pytest
+
+from models.repository import ConflictError, Repository
+from models.storage import JsonFileStorage
+from models.unit_of_work import transaction
+
+
+class Entity:
+    """Objeto mínimo de um modelo, criado a partir de um registo."""
+
+    def __init__(self, record: dict):
+        self.id = record["id"]
+        self.name = record["name"]
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "name": self.name}
+
+
+def open_repository(path) -> Repository:
+    """Cria um repositório independente (como outro processo) sobre um ficheiro."""
+    return Repository(str(path), JsonFileStorage(str(path)))
+
+
+@pytest.fixture
+def path(tmp_path):
+    """Ficheiro com dois registos já gravados."""
+    path = tmp_path / "items.json"
+    open_repository(path).save([{"id": 1, "name": "Bola"}, {"id": 2, "name": "Raquete"}])
+    return path
+
+
+def test_upsert_increments_version(path):
+    """Cada gravação incrementa a versão do registo e do objeto."""
+    repository = open_repository(path)
+    entity = repository.find(1, Entity)
+    entity.name = "Bola de Praia"
+    repository.upsert(entity.to_dict(), entity)
+    assert entity._version == repository.get(1)["version"] == 1
+    assert open_repository(path).get(1) == {"id": 1, "name": "Bola de Praia", "version": 1}
+
+
+def test_stale_object_raises_conflict(path):
+    """Gravar um objeto lido antes de outra gravação do registo lança ConflictError."""
+    first, second = open_repository(path), open_repository(path)
+    stale = second.find(1, Entity)
+
+    entity = first.find(1, Entity)
+    entity.name = "Bola de Praia (posto 1)"
+    first.upsert(entity.to_dict(), entity)
+
+    stale.name = "Bola de Basquetebol (posto 2)"
+    with pytest.raises(ConflictError) as error:
+        second.upsert(stale.to_dict(), stale)
+    assert error.value.record_id == 1
+    assert open_repository(path).get(1)["name"] == "Bola de Praia (posto 1)"
+
+
+def test_external_changes_are_merged(path):
+    """Alterações externas a outros registos são juntadas, não perdidas."""
+    first, second = open_repository(path), open_repository(path)
+    second.load()
+    first.upsert({"id": 1, "name": "Bola de Praia"})
+    second.upsert({"id": 2, "name": "Raquete de Padel"})
+
+    names = {r["id"]: r["name"] for r in open_repository(path).load()}
+    assert names == {1: "Bola de Praia", 2: "Raquete de Padel"}
+
+
+def test_next_ids_unique_across_repositories(path):
+    """Repositórios concorrentes nunca recebem o mesmo ID."""
+    repositories = [open_repository(path) for _ in range(4)]
+    allocated = []
+
+    def allocate(repository):
+        for _ in range(25):
+            allocated.extend(repository.next_ids())
+
+    threads = [threading.Thread(target=allocate, args=(r,)) for r in repositories]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(allocated) == list(range(3, 103))
+
+
+# ==================== TRANSAÇÕES ====================
+
+def in_other_thread(function):
+    """Executa uma função noutra thread (fora da transação ativa) e espera."""
+    thread = threading.Thread(target=function)
+    thread.start()
+    thread.join()
+
+
+def test_transaction_commits_all_repositories(tmp_path, path):
+    """No fim da transação, todos os repositórios alterados são escritos."""
+    items, other = open_repository(path), open_repository(tmp_path / "other.json")
+    with transaction():
+        items.upsert({"id": 3, "name": "Prancha"})
+        other.upsert({"id": 1, "name": "Capacete"})
+        assert open_repository(path).get(3) is None     # ainda pendente
+    assert open_repository(path).get(3)["name"] == "Prancha"
+    assert open_repository(tmp_path / "other.json").get(1)["name"] == "Capacete"
+
+
+def test_transaction_rollback(tmp_path, path):
+    """Uma exceção desfaz a transação: cache e ficheiros ficam como antes."""
+    items, other = open_repository(path), open_repository(tmp_path / "other.json")
+    entity = items.find(1, Entity)
+    before = items.load()
+
+    with pytest.raises(RuntimeError):
+        with transaction():
+            entity.name = "Bola de Praia"
+            items.upsert(entity.to_dict(), entity)
+            items.remove(2)
+            other.upsert({"id": 1, "name": "Capacete"})
+            raise RuntimeError("falha a meio da transação")
+
+    assert items.load() == before
+    assert entity._version == 0
+    assert open_repository(path).load() == before
+    assert open_repository(tmp_path / "other.json").load() == []
+
+    # O objeto pode ser gravado de novo depois do rollback
+    items.upsert(entity.to_dict(), entity)
+    assert open_repository(path).get(1)["name"] == "Bola de Praia"
+
+
+def test_transaction_conflict_writes_nothing(tmp_path, path):
+    """Um conflito no commit desfaz a transação sem escrever nenhum repositório."""
+    items, other = open_repository(path), open_repository(tmp_path / "other.json")
+    entity = items.find(2, Entity)
+
+    with pytest.raises(ConflictError):
+        with transaction():
+            other.upsert({"id": 1, "name": "Capacete"})
+            entity.name = "Raquete de Ténis"
+            items.upsert(entity.to_dict(), entity)
+            # Outro posto grava o mesmo registo antes do commit
+            in_other_thread(lambda: open_repository(path).upsert({"id": 2, "name": "Raquete de Padel"}))
+
+    assert open_repository(path).get(2)["name"] == "Raquete de Padel"
+    assert open_repository(tmp_path / "other.json").load() == []
+    assert items.get(2)["name"] == "Raquete de Padel"
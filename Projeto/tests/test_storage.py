@@ -0,0 +1,102 @@
+"""
+Testes dos armazenamentos persistentes (models/storage.py).
+"""
+
+import json
+import os
+
+import pytest
+
+from models import config
+from models.storage import JournalStorage, JsonFileStorage, SqliteStorage
+
+RECORDS = [
+    {"id": 1, "name": "Bola de Futebol", "price_per_hour": 2.5, "version": 1},
+    {"id": 2, "name": "Raquete de Ténis", "price_per_hour": 4.0, "version": 1},
+]
+
+
+@pytest.fixture(params=["json", "journal", "sqlite"])
+def storage(request, tmp_path):
+    """Armazenamento vazio de cada tipo, numa pasta temporária."""
+    if request.param == "json":
+        return JsonFileStorage(str(tmp_path / "items.json"))
+    if request.param == "journal":
+        return JournalStorage(str(tmp_path / "items.json"))
+    return SqliteStorage(str(tmp_path / "booking.db"), "items")
+
+
+def by_id(records) -> list:
+    """Converte os registos lidos em dicionários ordenados pelo ID."""
+    return sorted((dict(r) for r in records), key=lambda r: r["id"])
+
+
+def test_read_empty(storage):
+    """Um armazenamento novo não tem registos."""
+    assert storage.read() == []
+
+
+def test_write_all_round_trip(storage):
+    """Os registos escritos de uma vez são lidos iguais."""
+    storage.write_all(RECORDS)
+    assert by_id(storage.read()) == RECORDS
+
+
+def test_write_changes_round_trip(storage):
+    """Um lote de alterações (gravar, remover, inserir) é lido igual."""
+    storage.write_all(RECORDS)
+    changed = dict(RECORDS[0], name="Bola de Praia", version=2)
+    added = {"id": 3, "name": "Prancha", "price_per_hour": 6.0, "version": 1}
+    storage.write_changes([("put", changed), ("del", 2), ("put", added)], [changed, added])
+    assert by_id(storage.read()) == [changed, added]
+
+
+def test_sequence_round_trip(storage):
+    """A sequência de IDs começa vazia e guarda o último valor escrito."""
+    assert storage.read_sequence() is None
+    storage.write_sequence(41)
+    assert storage.read_sequence() == 41
+
+
+
+def test_journal_appends_without_rewriting_snapshot(tmp_path):
+    """As alterações vão para o diário e são lidas por outra instância."""
+    path = str(tmp_path / "reservations.json")
+    storage = JournalStorage(path)
+    storage.write_all(RECORDS)
+    with open(path, "rb") as f:
+        snapshot = f.read()
+
+    changed = dict(RECORDS[1], name="Raquete de Padel", version=2)
+    storage.write_changes([("put", changed), ("del", 1)], [changed])
+
+    with open(path, "rb") as f:
+        assert f.read() == snapshot
+    assert by_id(JournalStorage(path).read()) == [changed]
+
+
+def test_journal_ignores_incomplete_last_line(tmp_path):
+    """Uma última linha incompleta do diário (escrita interrompida) é ignorada."""
+    path = str(tmp_path / "reservations.json")
+    storage = JournalStorage(path)
+    storage.write_all(RECORDS)
+    with open(storage.journal_path, "ab") as f:
+        f.write(json.dumps({"op": "del", "id": 1}).encode("utf-8"))
+    assert by_id(JournalStorage(path).read()) == RECORDS
+
+
+def test_journal_compaction(tmp_path, monkeypatch):
+    """Ao atingir o limite de entradas, é escrito um snapshot e o diário esvazia."""
+    monkeypatch.setattr(config, "JOURNAL_COMPACT_EVERY", 3)
+    path = str(tmp_path / "reservations.json")
+    storage = JournalStorage(path)
+    storage.write_all([])
+    records = []
+    for record in RECORDS + [{"id": 3, "name": "Prancha", "price_per_hour": 6.0, "version": 1}]:
+        records.append(record)
+        storage.write_changes([("put", record)], list(records))
+
+    assert os.path.getsize(storage.journal_path) == 0
+    with open(path, "r", encoding="utf-8") as f:
+        assert by_id(json.load(f)) == records
+    assert by_id(JournalStorage(path).read()) == records